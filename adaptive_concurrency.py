@@ -0,0 +1,171 @@
+"""
+Control adaptativo de concurrencia (AIMD) para la extracción de páginas de detalle
+
+El límite crece de uno en uno mientras la latencia p95 y la tasa de fallos de
+la última ventana se mantienen sanas, y se reduce a la mitad en cuanto aparecen
+timeouts, respuestas 503/429 o páginas de "robot check".
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+# Resultados posibles de una página de detalle
+OUTCOME_OK = "ok"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_BLOCKED = "blocked"  # 503/429 o página de captcha/robot check
+OUTCOME_HTTP_ERROR = "http_error"
+OUTCOME_ERROR = "error"
+
+# Resultados que indican saturación del servidor: provocan reducción inmediata
+BACKOFF_OUTCOMES = {OUTCOME_TIMEOUT, OUTCOME_BLOCKED}
+
+DEFAULT_INITIAL_LIMIT = 5
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 16
+DEFAULT_TARGET_P95 = 8.0  # segundos
+DEFAULT_MAX_FAILURE_RATE = 0.1
+DEFAULT_WINDOW_SIZE = 10
+
+
+def classify_status(status: int) -> str:
+    """Clasifica un código HTTP de la página de detalle"""
+    if status in (429, 503):
+        return OUTCOME_BLOCKED
+    if status >= 400:
+        return OUTCOME_HTTP_ERROR
+    return OUTCOME_OK
+
+
+def percentile(values: list, pct: float) -> float:
+    """Percentil por rango más cercano (values no vacío)"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class AdaptiveLimiter:
+    """Semáforo cuyo límite se ajusta con AIMD según latencia y errores"""
+
+    def __init__(self, initial: int = DEFAULT_INITIAL_LIMIT, min_limit: int = DEFAULT_MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT, target_p95: float = DEFAULT_TARGET_P95,
+                 max_failure_rate: float = DEFAULT_MAX_FAILURE_RATE, window_size: int = DEFAULT_WINDOW_SIZE):
+        """
+        Args:
+            initial: Límite inicial de tareas simultáneas
+            min_limit: Límite mínimo
+            max_limit: Límite máximo
+            target_p95: Latencia p95 (s) por encima de la cual no se sigue creciendo
+            max_failure_rate: Tasa de fallos máxima de la ventana para poder crecer
+            window_size: Resultados por ventana de evaluación
+        """
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = min(self.max_limit, max(min_limit, initial))
+        self.target_p95 = target_p95
+        self.max_failure_rate = max_failure_rate
+        self.window_size = window_size
+
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._window = []  # [(latencia, resultado)]
+        self._last_decrease = 0.0
+        self._saturated = False  # Si se llegó a usar todo el límite durante la ventana
+        self.started_at = time.time()
+        self.outcomes = {}
+        self.history = [{"t": 0.0, "limit": self.limit, "reason": "inicio"}]
+
+    async def acquire(self):
+        """Espera hasta que haya hueco por debajo del límite actual"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self._saturated = True
+
+    async def release(self, outcome: str = None, latency: float = None):
+        """Libera un hueco y registra el resultado (si se indica) para ajustar el límite"""
+        async with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if outcome is not None:
+                self._record(outcome, latency)
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hueco de concurrencia como context manager. El bloque puede fijar
+        slot_info["outcome"]; si lanza una excepción se registra como error.
+        """
+        await self.acquire()
+        slot_info = {"outcome": OUTCOME_OK}
+        start = time.perf_counter()
+        try:
+            yield slot_info
+        except Exception:
+            slot_info["outcome"] = OUTCOME_ERROR
+            raise
+        finally:
+            await self.release(slot_info["outcome"], time.perf_counter() - start)
+
+    def _record(self, outcome: str, latency: float):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self._window.append((latency or 0.0, outcome))
+
+        if outcome in BACKOFF_OUTCOMES:
+            # Reducción multiplicativa, como mucho una vez por ventana de latencias
+            now = time.time()
+            if now - self._last_decrease >= min(self.target_p95, 5.0):
+                self._set_limit(max(self.min_limit, self.limit // 2), f"backoff ({outcome})")
+                self._last_decrease = now
+                self._window.clear()
+            return
+
+        if len(self._window) >= self.window_size:
+            latencies = [lat for lat, _ in self._window]
+            failures = sum(1 for _, result in self._window if result != OUTCOME_OK)
+            p95 = percentile(latencies, 95)
+            failure_rate = failures / len(self._window)
+            saturated = self._saturated
+            self._window.clear()
+            self._saturated = False
+
+            if p95 > self.target_p95:
+                self._set_limit(max(self.min_limit, self.limit - 1), f"p95 alto ({p95:.1f}s)")
+            elif failure_rate <= self.max_failure_rate and saturated and self.limit < self.max_limit:
+                # Crecimiento aditivo solo si la concurrencia actual se está aprovechando
+                self._set_limit(self.limit + 1, f"sano (p95 {p95:.1f}s, fallos {failure_rate:.0%})")
+
+    def _set_limit(self, new_limit: int, reason: str):
+        if new_limit != self.limit:
+            self.limit = new_limit
+            self.history.append({
+                "t": round(time.time() - self.started_at, 1),
+                "limit": new_limit,
+                "reason": reason
+            })
+
+    def summary(self) -> dict:
+        """Resumen de la concurrencia elegida a lo largo de la ejecución"""
+        limits = [entry["limit"] for entry in self.history]
+        return {
+            "final_limit": self.limit,
+            "max_limit_reached": max(limits),
+            "min_limit_reached": min(limits),
+            "outcomes": dict(self.outcomes),
+            "history": list(self.history),
+        }
+
+    def print_summary(self):
+        """Imprime la evolución de la concurrencia"""
+        summary = self.summary()
+        print(f"\n📈 Concurrencia adaptativa: final {summary['final_limit']} "
+              f"(rango {summary['min_limit_reached']}-{summary['max_limit_reached']})", flush=True)
+        history = summary["history"]
+        if len(history) > 20:
+            print(f"   ... {len(history) - 20} cambios anteriores omitidos", flush=True)
+        for entry in history[-20:]:
+            print(f"   t={entry['t']:>6.1f}s → {entry['limit']} ({entry['reason']})", flush=True)
+        if summary["outcomes"]:
+            outcomes = ", ".join(f"{name}: {count}" for name, count in sorted(summary["outcomes"].items()))
+            print(f"   Resultados: {outcomes}", flush=True)
@@ -0,0 +1,250 @@
+"""
+Scraping de Amazon por lotes: varios términos de búsqueda en un único proceso
+
+Todos los términos comparten una instancia de Playwright, un pool de
+navegadores/contextos calientes y un límite global de páginas de detalle
+simultáneas (AdaptiveLimiter compartido). Cada término se guarda en el mismo
+fichero que generaría main.py: data/extractions/amazon/amazon_<término>.jsonl
+
+Uso:
+    python batch_scrape.py "leche entera" "cafe molido" [--products=30]
+    python batch_scrape.py --terms-file=terminos.txt [--concurrency=4] [--browsers=1]
+    Opciones de main.py admitidas: --headless --basic --legacy-extract --lean
+        --block-profile=... --pipeline --parallel-pages[=N] --fixed-concurrency --http-details --cache --cache-ttl=HORAS --refresh
+        --max-rate=PETICIONES_POR_SEGUNDO --no-governor --max-attempts=N --deadline=90m --priority=reviews
+        --profile=NOMBRE --profile-cache-mb=N (en el lote solo se comparten cookies y consentimiento)
+        --capture (HTML de cada página para re-extraer sin red con reextract.py)
+        --network-stats (peticiones de red por tipo de página y host, junto a cada extracción)
+        --context-pages=N --max-browser-mb=N --no-memory-guard (renovación del contexto de detalle de cada término)
+"""
+import asyncio
+import sys
+import time
+
+from adaptive_concurrency import AdaptiveLimiter
+from browser_pool import BrowserPool
+from browser_profile import BrowserProfile
+from checkpoint import RunCheckpoint
+from cli_options import (
+    get_block_profile, get_browser_profile, get_cli_option, get_deadline, get_memory_limits, get_priority
+)
+from delta_refresh import PreviousExtraction
+from detail_cache import DetailCache
+from html_capture import CaptureStore
+from main import DEFAULT_ITERATIONS, amazon_output_path, get_parallel_pages, save_to_json, scrape_amazon_products
+from network_accounting import NetworkRecorder
+from retry_queue import DEFAULT_MAX_ATTEMPTS, RetryQueue
+from scrape_budget import MISSING_DEADLINE, ScrapeBudget
+from throughput_governor import AMAZON_DOMAIN, DEFAULT_MAX_RATE, DomainGovernor
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BROWSERS = 1
+
+# Opciones que pueden llevar su valor en el argumento siguiente ("--products 30")
+VALUE_OPTIONS = {"products", "terms-file", "concurrency", "browsers", "block-profile", "cache-ttl", "max-rate",
+                 "max-attempts", "deadline", "priority",
+                 "profile-cache-mb", "context-pages", "max-browser-mb"}
+
+
+def load_terms(argv: list = None) -> list:
+    """
+    Términos de búsqueda de la línea de comandos y/o de --terms-file (uno por
+    línea, se ignoran líneas vacías y comentarios con #). Sin duplicados y en orden.
+    """
+    argv = sys.argv if argv is None else argv
+    terms = []
+    skip_next = False
+    for arg in argv[1:]:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg.startswith("--"):
+            skip_next = "=" not in arg and arg[2:] in VALUE_OPTIONS
+            continue
+        terms.append(arg)
+
+    terms_file = get_cli_option("terms-file", argv=argv)
+    if terms_file:
+        with open(terms_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    terms.append(line)
+
+    unique_terms = []
+    for term in terms:
+        term = term.strip()
+        if term and term not in unique_terms:
+            unique_terms.append(term)
+    return unique_terms
+
+
+async def scrape_terms(terms: list, max_products: int = DEFAULT_ITERATIONS, concurrency: int = DEFAULT_CONCURRENCY,
+                       browsers: int = DEFAULT_BROWSERS, headless: bool = True, detailed: bool = True,
+                       adaptive_concurrency: bool = True, detail_cache: DetailCache = None, refresh: bool = False,
+                       max_attempts: int = DEFAULT_MAX_ATTEMPTS, deadline: float = None,
+                       profile: BrowserProfile = None, capture: bool = False, network_stats: bool = False,
+                       **scrape_options):
+    """
+    Scrapea varios términos a la vez dentro de un único proceso de Playwright.
+
+    Args:
+        terms: Términos de búsqueda
+        max_products: Productos por término
+        concurrency: Términos procesándose a la vez
+        browsers: Procesos Chromium del pool compartido
+        headless: Modo headless de los navegadores
+        detailed: Si es True, visita la página de detalle de cada producto
+        adaptive_concurrency: Límite global de páginas de detalle adaptativo (AIMD) o fijo en 5
+        detail_cache: DetailCache compartida por todos los términos (opcional)
+        refresh: Si es True, cada término solo visita los productos nuevos o cambiados respecto a
+            su extracción anterior y guarda los cambios como versión nueva
+        max_attempts: Intentos por página de detalle; los productos que los agotan se guardan en el
+            .deadletter.json de cada término
+        deadline: Segundos para todo el lote (None: sin límite); cada término recibe el tiempo que
+            queda y los que no llegan a empezar se saltan
+        profile: BrowserProfile opcional; los contextos del pool cargan y guardan sus cookies y su
+            consentimiento (storage state: varios contextos no pueden compartir un directorio de usuario)
+        capture: Si es True, guarda el HTML de las páginas de cada término (una ejecución por término)
+        network_stats: Si es True, guarda las peticiones de red de cada término junto a su extracción
+        **scrape_options: Resto de opciones de scrape_amazon_products (pipelined, block_profile...)
+
+    Returns:
+        dict {término: ruta del fichero guardado, o None si falló}
+    """
+    # Límite global de páginas de detalle simultáneas, compartido por todos los términos
+    limiter = AdaptiveLimiter() if adaptive_concurrency else AdaptiveLimiter(initial=5, min_limit=5, max_limit=5)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = {}
+    start = time.perf_counter()
+    budget = ScrapeBudget.from_seconds(deadline)
+
+    print(f"📚 Lote de {len(terms)} términos ({concurrency} a la vez, {browsers} navegador(es))", flush=True)
+
+    if profile is not None:
+        profile.acquire(can_persist=False)
+    async with BrowserPool(max_browsers=browsers, headless=headless, launch_args=[], profile=profile) as pool:
+
+        async def run_term(term):
+            async with semaphore:
+                if budget.expired():
+                    print(f"⏳ [{term}] Deadline del lote alcanzado: término sin empezar", flush=True)
+                    results[term] = None
+                    return
+                checkpoint = RunCheckpoint.create("amazon", term, {"max_products": max_products, "detailed": detailed})
+                filename = amazon_output_path(term)
+                previous = PreviousExtraction.load(filename) if refresh and detailed else None
+                retry_queue = RetryQueue(max_attempts=max_attempts)
+                capture_store = CaptureStore("amazon", term, run_id=checkpoint.run_id) if capture else None
+                network = NetworkRecorder("amazon") if network_stats else None
+                try:
+                    products = await scrape_amazon_products(
+                        term, max_products=max_products, detailed=detailed, headless=headless, pool=pool,
+                        detail_cache=detail_cache, checkpoint=checkpoint, limiter=limiter, previous=previous,
+                        retry_queue=retry_queue,
+                        deadline=budget.remaining() if budget.expires_at is not None else None,
+                        capture=capture_store, network=network, **scrape_options
+                    )
+                except Exception as e:
+                    print(f"❌ [{term}] Error: {e} (reanudar con: python main.py --resume {checkpoint.run_id})",
+                          flush=True)
+                    results[term] = None
+                    return
+                finally:
+                    if capture_store is not None:
+                        capture_store.close()
+
+                save_to_json(products, filename, replace=refresh, previous=previous)
+                if detailed:
+                    retry_queue.save_dead_letters(filename)
+                if network is not None:
+                    network.save(filename)
+                # Con productos sin detalles por el deadline, el checkpoint se conserva para completarlos
+                deadline_skipped = any(product.get("details_missing") == MISSING_DEADLINE for product in products)
+                if checkpoint.pagination_done and not deadline_skipped:
+                    checkpoint.finish()
+                elif deadline_skipped:
+                    print(f"⏳ [{term}] Productos sin detalles por el deadline. "
+                          f"Complétalos con: python main.py --resume {checkpoint.run_id}", flush=True)
+                results[term] = filename
+                print(f"✅ [{term}] {len(products)} productos → {filename}", flush=True)
+
+        await asyncio.gather(*[run_term(term) for term in terms])
+        pool_summary = pool.summary()
+
+    elapsed = time.perf_counter() - start
+    succeeded = [term for term in terms if results.get(term)]
+    print(f"\n📚 Lote completado: {len(succeeded)}/{len(terms)} términos en {elapsed:.1f}s "
+          f"({len(succeeded) / elapsed * 60 if elapsed else 0:.1f} términos/min)", flush=True)
+    print(f"   Pool: {pool_summary['browsers_launched']} navegador(es) lanzado(s), "
+          f"{pool_summary['contexts_created']} contextos creados, {pool_summary['contexts_reused']} reutilizados",
+          flush=True)
+    failed = [term for term in terms if not results.get(term)]
+    if failed:
+        print(f"   ⚠️ Términos con error: {', '.join(failed)}", flush=True)
+    return results
+
+
+async def main():
+    """Función principal"""
+    print("📚 Amazon Batch Scraper")
+    print("=" * 50)
+
+    terms = load_terms()
+    if not terms:
+        print("❌ Debes indicar al menos un término de búsqueda (argumentos o --terms-file=fichero)")
+        print('📝 Uso: python batch_scrape.py "leche" "cafe molido" [--products=30] [--concurrency=4] [--headless]')
+        sys.exit(1)
+
+    max_products = int(get_cli_option("products", DEFAULT_ITERATIONS))
+    concurrency = int(get_cli_option("concurrency", DEFAULT_CONCURRENCY))
+    browsers = int(get_cli_option("browsers", DEFAULT_BROWSERS))
+    detailed = "--basic" not in sys.argv
+    use_cache = "--cache" in sys.argv
+    cache_ttl_hours = float(get_cli_option("cache-ttl", 24))
+
+    detail_cache = DetailCache(ttl_seconds=cache_ttl_hours * 3600) if use_cache and detailed else None
+    profile = get_browser_profile("amazon")
+    context_pages, max_browser_mb = get_memory_limits()
+    # Un único gobernador de amazon.es para todos los términos (y compartido con otros procesos)
+    governor = None
+    if "--no-governor" not in sys.argv:
+        governor = DomainGovernor(AMAZON_DOMAIN, max_rate=float(get_cli_option("max-rate", DEFAULT_MAX_RATE)))
+    try:
+        await scrape_terms(
+            terms,
+            max_products=max_products,
+            concurrency=concurrency,
+            browsers=browsers,
+            headless="--headless" in sys.argv,
+            detailed=detailed,
+            adaptive_concurrency="--fixed-concurrency" not in sys.argv,
+            detail_cache=detail_cache,
+            refresh="--refresh" in sys.argv,
+            max_attempts=int(get_cli_option("max-attempts", DEFAULT_MAX_ATTEMPTS)),
+            deadline=get_deadline(),
+            priority=get_priority(),
+            fast_extract="--legacy-extract" not in sys.argv,
+            block_profile=get_block_profile(),
+            pipelined="--pipeline" in sys.argv,
+            parallel_pages=get_parallel_pages(),
+            http_details="--http-details" in sys.argv,
+            governor=governor,
+            profile=profile,
+            capture="--capture" in sys.argv,
+            network_stats="--network-stats" in sys.argv,
+            context_pages=context_pages,
+            max_browser_mb=max_browser_mb,
+        )
+    finally:
+        if profile is not None:
+            profile.close()
+            profile.print_summary()
+        if detail_cache:
+            detail_cache.close()
+        if governor is not None:
+            governor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
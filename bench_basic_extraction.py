@@ -0,0 +1,129 @@
+"""
+Benchmark de la extracción de información básica (FASE 2) de main.py
+
+Compara el modo clásico (extract_product_basic_info, ~30 consultas por tarjeta
+en lotes de 10) con el modo rápido (extract_products_from_page, un único
+page.evaluate por página) sobre una página de resultados sintética, sin red.
+
+Uso: python bench_basic_extraction.py [num_tarjetas] [repeticiones]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from playwright.async_api import async_playwright
+
+from main import SEARCH_RESULT_SELECTOR, extract_product_basic_info, extract_products_from_page
+
+DEFAULT_CARDS = 60
+DEFAULT_REPEATS = 5
+
+
+def build_card_html(idx: int) -> str:
+    """Genera una tarjeta de resultado con la misma estructura que Amazon.es"""
+    prime = '<i class="a-icon a-icon-prime" aria-label="Amazon Prime"></i>' if idx % 2 == 0 else ""
+    coupon = '<span class="s-coupon-unclipped">Ahorra 5% con cupón</span>' if idx % 3 == 0 else ""
+    return f"""
+    <div data-component-type="s-search-result" data-asin="B0BENCH{idx:04d}">
+      <div class="a-section a-spacing-small">
+        <div class="a-row"><span>Marca: Marca{idx % 7}</span></div>
+        <div class="a-row"><span>Color: Negro</span></div>
+      </div>
+      <h2 class="a-size-mini"><a class="a-link-normal" href="/dp/B0BENCH{idx:04d}"><span>Producto de prueba número {idx}</span></a></h2>
+      <span class="a-price"><span class="a-offscreen">{10 + idx},99€</span></span>
+      <span class="a-price a-text-price"><span class="a-offscreen">{20 + idx},99€</span></span>
+      <i class="a-icon a-icon-star"><span class="a-icon-alt">4,{idx % 10} de 5 estrellas</span></i>
+      <span class="a-size-base s-underline-text">{1000 + idx * 13}</span>
+      <img class="s-image" src="https://m.media-amazon.com/images/I/bench{idx}.jpg">
+      {prime}
+      <span aria-label="Envío GRATIS">Envío GRATIS</span>
+      <span class="a-size-base a-color-secondary">Vendido por Tienda de prueba</span>
+      <span class="a-size-base a-color-success">En stock</span>
+      {coupon}
+      <span class="a-button-text">Negro</span><span class="a-button-text">Blanco</span>
+    </div>
+    """
+
+
+def build_results_page(num_cards: int) -> str:
+    """Genera una página de resultados completa con num_cards tarjetas"""
+    cards = "\n".join(build_card_html(i) for i in range(1, num_cards + 1))
+    return f"<html><body><div class='s-main-slot'>{cards}</div></body></html>"
+
+
+async def run_legacy(page, search_term: str):
+    """Reproduce la FASE 2 clásica: handles + lotes de 10 con asyncio.gather"""
+    elements = await page.query_selector_all(SEARCH_RESULT_SELECTOR)
+    products = []
+    batch_size = 10
+    for i in range(0, len(elements), batch_size):
+        batch = elements[i:i + batch_size]
+        tasks = [
+            extract_product_basic_info(element, search_term, i + idx + 1)
+            for idx, element in enumerate(batch)
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        products.extend(r for r in results if r and not isinstance(r, Exception))
+    return products
+
+
+async def run_fast(page, search_term: str):
+    """FASE 2 rápida: una sola llamada page.evaluate para toda la página"""
+    cards = await extract_products_from_page(page, search_term, 1, 10_000)
+    return [card for card in cards if card]
+
+
+async def time_mode(page, runner, repeats: int):
+    """Ejecuta runner varias veces y devuelve (tiempos, último resultado)"""
+    timings = []
+    result = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = await runner(page, "benchmark")
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+async def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CARDS
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REPEATS
+
+    print("⏱️  Benchmark FASE 2 (información básica)")
+    print("=" * 50)
+    print(f"📦 Tarjetas por página: {num_cards} | 🔁 Repeticiones: {repeats}")
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content(build_results_page(num_cards))
+
+        legacy_times, legacy_products = await time_mode(page, run_legacy, repeats)
+        fast_times, fast_products = await time_mode(page, run_fast, repeats)
+
+        await browser.close()
+
+    legacy_median = statistics.median(legacy_times)
+    fast_median = statistics.median(fast_times)
+
+    print(f"\n🐢 Clásico (query_selector por campo): {legacy_median * 1000:.1f} ms "
+          f"({len(legacy_products) / legacy_median:.0f} productos/s)")
+    print(f"⚡ Rápido (un page.evaluate):          {fast_median * 1000:.1f} ms "
+          f"({len(fast_products) / fast_median:.0f} productos/s)")
+    print(f"🚀 Aceleración: x{legacy_median / fast_median:.1f}")
+
+    # Verificar que ambos modos producen exactamente los mismos datos
+    differences = 0
+    for legacy, fast in zip(legacy_products, fast_products):
+        for key in legacy:
+            if legacy[key] != fast.get(key):
+                differences += 1
+                print(f"   ≠ posición {legacy['position']} campo '{key}': {legacy[key]!r} vs {fast.get(key)!r}")
+    if len(legacy_products) != len(fast_products):
+        differences += 1
+        print(f"   ≠ número de productos: {len(legacy_products)} vs {len(fast_products)}")
+
+    print(f"\n{'✅ Salidas idénticas' if differences == 0 else f'❌ {differences} diferencias'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Benchmark de memoria de la FASE 1 (extracción página a página)
+
+Sirve páginas de resultados sintéticas (mismas tarjetas que bench_basic_extraction.py,
+ASIN distintos en cada página) desde un servidor local y las recorre navegando
+en una misma pestaña, como la paginación real. Tras cada página mide el RSS del
+proceso Python y de sus procesos hijos (driver de Playwright + Chromium) leyendo
+/proc, para comprobar que la memoria se mantiene plana con 1.000+ productos.
+
+Modos:
+    retener: comportamiento anterior, los handles de todas las tarjetas se conservan
+    clasico: extract_page_cards(fast_extract=False), tarjetas de una en una con
+             HandleScope y como máximo MAX_INFLIGHT_CARDS a la vez
+    rapido:  extract_page_cards(fast_extract=True), un page.evaluate por página
+
+Uso: python bench_memory.py [productos] [tarjetas_por_pagina] [modo ...]   (solo Linux)
+"""
+import asyncio
+import gc
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from bench_basic_extraction import build_card_html
+from bench_replay import serve_fixtures
+from main import SEARCH_RESULT_SELECTOR, extract_page_cards, extract_product_basic_info
+from memory_guard import children_rss_mb, rss_kb
+
+DEFAULT_PRODUCTS = 1200
+DEFAULT_CARDS_PER_PAGE = 60
+MODES = ("retener", "clasico", "rapido")
+
+
+def python_rss_mb() -> float:
+    """RSS (MB) de este proceso"""
+    return rss_kb("self") / 1024
+
+
+def write_pages(directory: Path, num_pages: int, cards_per_page: int):
+    """Genera page_1.html ... page_N.html con ASIN distintos en cada página"""
+    for page_num in range(1, num_pages + 1):
+        first = (page_num - 1) * cards_per_page + 1
+        cards = "\n".join(build_card_html(idx) for idx in range(first, first + cards_per_page))
+        (directory / f"page_{page_num}.html").write_text(
+            f"<html><body><div class='s-main-slot'>{cards}</div></body></html>", encoding="utf-8"
+        )
+
+
+async def extract_retaining(page, search_term: str, start_position: int, limit: int, retained: list):
+    """Comportamiento anterior: query_selector_all y los handles se conservan hasta el final"""
+    elements = (await page.query_selector_all(SEARCH_RESULT_SELECTOR))[:limit]
+    retained.extend(elements)
+    results = await asyncio.gather(*[
+        extract_product_basic_info(element, search_term, start_position + idx)
+        for idx, element in enumerate(elements)
+    ], return_exceptions=True)
+    return [result if not isinstance(result, Exception) else None for result in results]
+
+
+async def run_mode(p, mode: str, base_url: str, num_pages: int, cards_per_page: int) -> dict:
+    """Recorre todas las páginas con un navegador nuevo y devuelve las muestras de RSS"""
+    browser = await p.chromium.launch(headless=True)
+    page = await browser.new_page()
+    retained = []
+    products = []
+    samples = []
+    try:
+        for page_num in range(1, num_pages + 1):
+            await page.goto(f"{base_url}/page_{page_num}.html", wait_until="domcontentloaded")
+            start_position = len(products) + 1
+            if mode == "retener":
+                cards = await extract_retaining(page, "benchmark", start_position, cards_per_page, retained)
+            else:
+                cards = await extract_page_cards(page, "benchmark", start_position, cards_per_page,
+                                                 fast_extract=(mode == "rapido"))
+            products.extend(card for card in cards if card)
+            gc.collect()
+            samples.append((children_rss_mb(), python_rss_mb()))
+    finally:
+        await browser.close()
+    return {"mode": mode, "products": len(products), "samples": samples}
+
+
+def print_mode(result: dict):
+    """Imprime RSS inicial, máximo, final y crecimiento por cada 1.000 productos"""
+    samples = result["samples"]
+    warmup = max(1, len(samples) // 10)
+    print(f"\n📊 {result['mode']}: {result['products']} productos, {len(samples)} páginas", flush=True)
+    for label, values in (("Chromium + driver", [s[0] for s in samples]), ("Python", [s[1] for s in samples])):
+        baseline = statistics.median(values[:warmup])
+        growth = values[-1] - baseline
+        per_thousand = growth * 1000 / result["products"] if result["products"] else 0.0
+        print(f"   {label:<18} inicio {baseline:7.1f} MB | pico {max(values):7.1f} MB | final {values[-1]:7.1f} MB "
+              f"| crecimiento {growth:+6.1f} MB ({per_thousand:+.1f} MB/1.000 productos)", flush=True)
+
+
+async def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    numbers = [int(arg) for arg in args if arg.isdigit()]
+    modes = [arg for arg in args if arg in MODES] or list(MODES)
+    num_products = numbers[0] if numbers else DEFAULT_PRODUCTS
+    cards_per_page = numbers[1] if len(numbers) > 1 else DEFAULT_CARDS_PER_PAGE
+    num_pages = -(-num_products // cards_per_page)
+
+    print("🧠 Benchmark de memoria FASE 1 (página a página)")
+    print("=" * 50)
+    print(f"📦 {num_pages} páginas x {cards_per_page} tarjetas | Modos: {', '.join(modes)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        write_pages(directory, num_pages, cards_per_page)
+        server, base_url = serve_fixtures(directory)
+        try:
+            async with async_playwright() as p:
+                for mode in modes:
+                    print_mode(await run_mode(p, mode, base_url, num_pages, cards_per_page))
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,386 @@
+"""
+Benchmark de los extractores sobre páginas capturadas, sin red
+
+Sirve los fixtures de capture_fixtures.py (data/fixtures/<sitio>/<nombre>/)
+desde un servidor HTTP local y ejecuta sobre ellos los extractores reales:
+
+    amazon:       extract_product_basic_info, extract_products_from_page,
+                  extract_detailed_product_info (consulta a consulta), extract_details_from_page
+    corte_ingles: extract_product_tiles (bucle de tarjetas de scrape_corte_ingles)
+
+Para cada uno informa de productos/s (en los de detalle, solo el tiempo de
+extracción por producto, sin la navegación), de la latencia por campo (tiempo de los
+selectores de cada campo, medido envolviendo los handles de Playwright) y de
+las diferencias frente a la salida de referencia (golden/<extractor>.json).
+Cualquier petición fuera del servidor local se aborta.
+
+Uso:
+    python bench_replay.py [carpeta_fixture ...] [--repeats=3] [--update-golden] [--json=informe.json] [--headed]
+"""
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from bench_basic_extraction import run_legacy
+from capture_fixtures import FIXTURES_DIR
+from cli_options import get_cli_option
+from main import (SEARCH_RESULT_SELECTOR, extract_detailed_product_info, extract_product_basic_info,
+                  extract_products_from_page)
+from scraper_temu import extract_product_tiles
+from search_card_selectors import CARD_SELECTORS, FREE_SHIPPING_QUERY
+from wait_strategy import AMAZON, CORTE_INGLES, WaitEngine
+
+DEFAULT_REPEATS = 3
+GOLDEN_DIR = "golden"
+MAX_DIFFS_SHOWN = 10
+
+# Campo al que se atribuye el tiempo de cada selector. Los handles devueltos heredan
+# el campo, así que inner_text/get_attribute sobre ellos cuentan para el mismo campo.
+CARD_SELECTOR_FIELDS = {"link": "url", "price_whole": "price", "price_fraction": "price", "image": "image_url",
+                        "specs_container": "additional_specs", "specs_row": "additional_specs", "prime": "has_prime"}
+AMAZON_BASIC_FIELDS = {
+    **{selector: CARD_SELECTOR_FIELDS.get(name, name)
+       for name, selectors in CARD_SELECTORS.items() if name != "free_shipping"
+       for selector in ([selectors] if isinstance(selectors, str) else selectors)},
+    FREE_SHIPPING_QUERY: "free_shipping",
+}
+AMAZON_BASIC_METHODS = {"get_attribute": "asin", "inner_html": "debug"}
+
+AMAZON_DETAIL_FIELDS = {
+    "#productOverview_feature_div table tr, #poExpander table tr": "product_overview",
+    **dict.fromkeys(["table.a-keyvalue tr", "#productDetails_techSpec_section_1 tr",
+                     "#productDetails_detailBullets_sections1 tr", "#productDetails_db_sections tr",
+                     "table.prodDetTable tr", "div.a-section.table-padding table tbody tr"], "specifications"),
+    **dict.fromkeys(["#feature-bullets ul li span.a-list-item", ".a-unordered-list.a-vertical li span"], "features"),
+    "#productDescription p": "description",
+    **dict.fromkeys(["#nutritionalInfoAndIngredients_feature_div .a-expander-header, a.a-expander-header",
+                     ".a-expander-content-expanded", "#nic-eu-nutrition-facts-energy",
+                     "#nic-eu-nutrition-facts-nutrients tbody tr"], "nutrition_facts"),
+    "#ingredients_feature_div .a-section, #important-information .content": "ingredients",
+}
+AMAZON_DETAIL_METHODS = {"goto": "navigation", "evaluate": "robot_check", "wait_for_selector": "nutrition_facts"}
+
+CORTE_INGLES_TILE_FIELDS = {
+    **dict.fromkeys(["article.product_tile", ".product-item", '[data-test="product-tile"]',
+                     'article[class*="product"]', "div.product-grid-item"], "tiles"),
+    **dict.fromkeys(["h3", "h2", ".product-title", '[data-test="product-title"]', 'a[class*="title"]',
+                     ".product-name"], "title"),
+    **dict.fromkeys([".price", '[data-test="product-price"]', '[class*="price"]', 'span[class*="amount"]',
+                     ".product-price"], "price"),
+    **dict.fromkeys(['[class*="rating"]', '[data-test="product-rating"]', ".stars", '[class*="star"]'], "rating"),
+    **dict.fromkeys(['[class*="review"]', '[data-test="reviews-count"]', ".reviews-count", '[class*="opinion"]'],
+                    "reviews_count"),
+    **dict.fromkeys(['a[href*="/p/"]', "a.product-link", 'a[class*="product"]', "a[href]"], "url"),
+    "img": "image_url",
+    '[class*="brand"], [data-test="brand"]': "brand",
+}
+
+# Métodos de Playwright cuyo tiempo se mide (además de las consultas por selector)
+TIMED_METHODS = {"get_attribute", "inner_text", "inner_html", "click", "goto", "evaluate", "wait_for_selector"}
+
+
+class FieldTimer:
+    """Acumula el tiempo de las llamadas a Playwright por campo extraído"""
+
+    def __init__(self, fields: dict, method_fields: dict = None):
+        """
+        Args:
+            fields: {selector: campo}
+            method_fields: {método: campo} para llamadas sobre handles sin campo (ej: goto)
+        """
+        self.fields = fields
+        self.method_fields = method_fields or {}
+        self.seconds = {}
+        self.calls = {}
+
+    async def run(self, field: str, awaitable):
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.seconds[field] = self.seconds.get(field, 0.0) + time.perf_counter() - start
+            self.calls[field] = self.calls.get(field, 0) + 1
+
+    def summary(self, products: int) -> list:
+        """[(campo, ms por producto, llamadas por producto)] de mayor a menor tiempo"""
+        products = max(1, products)
+        return [
+            (field, seconds * 1000 / products, self.calls[field] / products)
+            for field, seconds in sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+
+class TimedHandle:
+    """Envuelve una página o ElementHandle y atribuye el tiempo de cada llamada a un campo"""
+
+    def __init__(self, target, timer: FieldTimer, field: str = None):
+        self._target = target
+        self._timer = timer
+        self._field = field
+
+    def _field_for(self, selector: str) -> str:
+        return self._timer.fields.get(selector) or self._field or "other"
+
+    async def query_selector(self, selector: str):
+        field = self._field_for(selector)
+        result = await self._timer.run(field, self._target.query_selector(selector))
+        return TimedHandle(result, self._timer, field) if result else None
+
+    async def query_selector_all(self, selector: str):
+        field = self._field_for(selector)
+        results = await self._timer.run(field, self._target.query_selector_all(selector))
+        return [TimedHandle(result, self._timer, field) for result in results]
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in TIMED_METHODS:
+            return attr
+        field = self._field or self._timer.method_fields.get(name, "other")
+
+        async def timed(*args, **kwargs):
+            return await self._timer.run(field, attr(*args, **kwargs))
+        return timed
+
+
+class TimedContext:
+    """Contexto cuyas páginas nuevas se envuelven con TimedHandle"""
+
+    def __init__(self, context, timer: FieldTimer):
+        self._context = context
+        self._timer = timer
+
+    async def new_page(self):
+        return TimedHandle(await self._context.new_page(), self._timer)
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory: Path):
+    """Servidor HTTP local en un hilo que sirve la carpeta de fixtures. Returns (servidor, URL base)"""
+    handler = functools.partial(QuietHandler, directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Cada extractor: async (context, page, base_url, manifest, timer) -> (productos, segundos de extracción).
+# Con timer, los handles se envuelven para medir por campo y los productos se procesan de uno en uno.
+
+async def run_amazon_basic(context, page, base_url: str, manifest: dict, timer: FieldTimer = None):
+    await page.goto(f"{base_url}/{manifest['search_page']}", wait_until="domcontentloaded")
+    start = time.perf_counter()
+    if timer is None:
+        products = await run_legacy(page, manifest["search_term"])
+    else:
+        elements = await page.query_selector_all(SEARCH_RESULT_SELECTOR)
+        products = []
+        for idx, element in enumerate(elements):
+            product = await extract_product_basic_info(TimedHandle(element, timer), manifest["search_term"], idx + 1)
+            if product:
+                products.append(product)
+    return products, time.perf_counter() - start
+
+
+async def run_amazon_fast(context, page, base_url: str, manifest: dict, timer: FieldTimer = None):
+    await page.goto(f"{base_url}/{manifest['search_page']}", wait_until="domcontentloaded")
+    start = time.perf_counter()
+    products = [p for p in await extract_products_from_page(page, manifest["search_term"], 1, 10_000) if p]
+    return products, time.perf_counter() - start
+
+
+async def run_amazon_detail(context, page, base_url: str, manifest: dict, timer: FieldTimer = None,
+                            fast_extract: bool = False):
+    waits = WaitEngine(AMAZON)
+    detail_context = context if timer is None else TimedContext(context, timer)
+    products = []
+    extract_seconds = 0.0
+    for detail in manifest["details"]:
+        outcome = {}
+        details = await extract_detailed_product_info(detail_context, f"{base_url}/{detail['file']}", outcome, waits,
+                                                      fast_extract=fast_extract)
+        extract_seconds += outcome.get("extract_seconds", 0.0)
+        products.append({"id": detail["id"], "outcome": outcome.get("kind"), **details})
+    return products, extract_seconds
+
+
+async def run_amazon_detail_fast(context, page, base_url: str, manifest: dict, timer: FieldTimer = None):
+    return await run_amazon_detail(context, page, base_url, manifest, fast_extract=True)
+
+
+async def run_corte_ingles_tiles(context, page, base_url: str, manifest: dict, timer: FieldTimer = None):
+    await page.goto(f"{base_url}/{manifest['search_page']}", wait_until="domcontentloaded")
+    start = time.perf_counter()
+    target = page if timer is None else TimedHandle(page, timer)
+    products = await extract_product_tiles(target, manifest["search_term"], 10_000)
+    return products, time.perf_counter() - start
+
+
+# {sitio: [(nombre, runner, selectores por campo, campos por método)]}
+EXTRACTORS = {
+    AMAZON: [
+        ("extract_product_basic_info", run_amazon_basic, AMAZON_BASIC_FIELDS, AMAZON_BASIC_METHODS),
+        ("extract_products_from_page", run_amazon_fast, None, None),
+        ("extract_detailed_product_info", run_amazon_detail, AMAZON_DETAIL_FIELDS, AMAZON_DETAIL_METHODS),
+        ("extract_details_from_page", run_amazon_detail_fast, None, None),
+    ],
+    CORTE_INGLES: [
+        ("extract_product_tiles", run_corte_ingles_tiles, CORTE_INGLES_TILE_FIELDS, None),
+    ],
+}
+
+# Extractores rápidos que deben producir lo mismo que uno clásico: se comparan con la referencia
+# de este (no tienen una propia) y se informa de la mejora (antes/después) por producto
+SAME_OUTPUT_AS = {"extract_details_from_page": "extract_detailed_product_info"}
+
+
+def diff_products(expected: list, actual: list) -> list:
+    """Diferencias campo a campo entre la salida de referencia y la actual"""
+    diffs = []
+    if len(expected) != len(actual):
+        diffs.append(f"número de productos: {len(expected)} esperados, {len(actual)} obtenidos")
+    for idx, (old, new) in enumerate(zip(expected, actual)):
+        key = old.get("asin") or old.get("id") or old.get("product_id") or idx + 1
+        for field in sorted(set(old) | set(new)):
+            if old.get(field) != new.get(field):
+                diffs.append(f"{key} campo '{field}': {old.get(field)!r} → {new.get(field)!r}")
+    return diffs
+
+
+async def bench_fixture(browser, directory: Path, repeats: int, update_golden: bool) -> list:
+    """Ejecuta los extractores del sitio sobre un conjunto de fixtures"""
+    with open(directory / "manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    server, base_url = serve_fixtures(directory)
+    results = []
+
+    print(f"\n📂 {directory} ({manifest['site']}, '{manifest['search_term']}', "
+          f"{len(manifest['details'])} páginas de detalle)", flush=True)
+
+    context = await browser.new_context()
+    # Reproducible y sin red: solo se sirve lo capturado
+    await context.route("**/*", lambda route: route.continue_() if route.request.url.startswith(base_url)
+                        else route.abort())
+    page = await context.new_page()
+    try:
+        for name, runner, fields, method_fields in EXTRACTORS[manifest["site"]]:
+            timings = []
+            products = []
+            # Los extractores imprimen progreso por producto: se silencia durante las mediciones
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(repeats):
+                    products, seconds = await runner(context, page, base_url, manifest)
+                    timings.append(seconds)
+                timer = None
+                if fields is not None:
+                    timer = FieldTimer(fields, method_fields)
+                    await runner(context, page, base_url, manifest, timer)
+
+            median = statistics.median(timings)
+            rate = len(products) / median if median else 0.0
+            print(f"\n⏱️  {name}: {len(products)} productos, mediana {median * 1000:.1f} ms "
+                  f"({rate:.1f} productos/s)", flush=True)
+            baseline = next((result for result in results if result["extractor"] == SAME_OUTPUT_AS.get(name)), None)
+            if baseline and products and median:
+                before_ms = baseline["median_seconds"] * 1000 / baseline["products"] if baseline["products"] else 0.0
+                after_ms = median * 1000 / len(products)
+                print(f"   {before_ms:.1f} ms/producto con {baseline['extractor']} → {after_ms:.1f} ms/producto "
+                      f"(x{before_ms / after_ms:.1f})", flush=True)
+
+            field_latency = timer.summary(len(products)) if timer else []
+            for field, ms, calls in field_latency:
+                print(f"   {field:<18} {ms:8.2f} ms/producto  ({calls:.1f} llamadas)", flush=True)
+
+            golden_path = directory / GOLDEN_DIR / f"{SAME_OUTPUT_AS.get(name, name)}.json"
+            diffs = None
+            if update_golden and name not in SAME_OUTPUT_AS:
+                golden_path.parent.mkdir(exist_ok=True)
+                with open(golden_path, "w", encoding="utf-8") as f:
+                    json.dump(products, f, ensure_ascii=False, indent=2)
+                print(f"   📝 Referencia actualizada: {golden_path}", flush=True)
+            elif golden_path.exists():
+                with open(golden_path, "r", encoding="utf-8") as f:
+                    diffs = diff_products(json.load(f), products)
+                if diffs:
+                    print(f"   ❌ {len(diffs)} diferencias con {golden_path.name}", flush=True)
+                    for diff in diffs[:MAX_DIFFS_SHOWN]:
+                        print(f"      ≠ {diff}", flush=True)
+                else:
+                    print(f"   ✅ Salida idéntica a {golden_path.name}", flush=True)
+            else:
+                print(f"   ⚠️ Sin referencia (genera con --update-golden)", flush=True)
+
+            results.append({
+                "fixture": str(directory),
+                "extractor": name,
+                "products": len(products),
+                "median_seconds": round(median, 4),
+                "products_per_second": round(rate, 2),
+                "field_ms_per_product": {field: round(ms, 3) for field, ms, _ in field_latency},
+                "golden_diffs": diffs,
+            })
+    finally:
+        await context.close()
+        server.shutdown()
+    return results
+
+
+def find_fixtures(paths: list) -> list:
+    """Carpetas con manifest.json indicadas o todas las de data/fixtures/<sitio>/"""
+    if paths:
+        return [Path(path) for path in paths]
+    return sorted(path.parent for path in Path(FIXTURES_DIR).glob("*/*/manifest.json"))
+
+
+async def main():
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    repeats = int(get_cli_option("repeats", DEFAULT_REPEATS))
+    update_golden = "--update-golden" in sys.argv
+    report_path = get_cli_option("json")
+
+    print("⏱️  Benchmark de extractores sobre páginas capturadas")
+    print("=" * 50)
+
+    fixtures = find_fixtures(paths)
+    if not fixtures:
+        print(f"❌ No hay fixtures en {FIXTURES_DIR}. Captura alguno con: "
+              f"python capture_fixtures.py amazon \"leche entera\"")
+        sys.exit(1)
+
+    results = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless="--headed" not in sys.argv)
+        try:
+            for directory in fixtures:
+                results.extend(await bench_fixture(browser, directory, repeats, update_golden))
+        finally:
+            await browser.close()
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Informe guardado en: {report_path}")
+
+    failed = [result for result in results if result["golden_diffs"]]
+    if failed:
+        print(f"\n❌ {len(failed)} extractor(es) con diferencias frente a la referencia")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
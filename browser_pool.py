@@ -0,0 +1,400 @@
+"""
+Pool de navegadores Chromium de larga duración compartido entre trabajos de scraping
+
+- BrowserPool: mantiene navegadores calientes (lanzados o conectados por CDP) y
+  presta contextos; un contexto se recicla tras servir N páginas.
+- BrowserService: ejecuta un BrowserPool en un hilo propio para que un proceso
+  de larga duración (sql_frontend.py) preste endpoints CDP a los subprocesos de
+  scraping, acotando el número total de procesos Chromium vivos.
+
+Con un BrowserProfile (browser_profile.py) el pool arranca en caliente: lanza
+un contexto persistente sobre el directorio de usuario del perfil o, si no
+puede, carga y guarda su storage state en cada contexto.
+"""
+import asyncio
+import socket
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from playwright.async_api import async_playwright
+
+from browser_profile import MODE_PERSISTENT, BrowserProfile
+
+DEFAULT_MAX_BROWSERS = 2
+DEFAULT_PAGES_PER_CONTEXT = 100
+DEFAULT_MAX_IDLE_CONTEXTS = 2
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox'
+]
+
+
+def _free_port() -> int:
+    """Reserva un puerto TCP libre en localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BrowserSlot:
+    """Un proceso Chromium del pool con sus préstamos activos"""
+
+    def __init__(self, browser, endpoint: str = None):
+        self.browser = browser
+        self.endpoint = endpoint
+        self.leases = 0
+        self.contexts_created = 0
+        self.started_at = time.time()
+
+    def is_alive(self) -> bool:
+        return self.browser.is_connected()
+
+
+class PersistentBrowser:
+    """Contexto persistente (launch_persistent_context) con la interfaz de navegador que usa el pool"""
+
+    def __init__(self, context):
+        self.context = context
+        self._closed = False
+        context.on("close", lambda _: setattr(self, "_closed", True))
+
+    def is_connected(self) -> bool:
+        return not self._closed
+
+    async def close(self):
+        await self.context.close()
+
+
+class PooledContext:
+    """
+    Contexto de Playwright prestado por el pool.
+
+    Se comporta como un BrowserContext (delegando atributos) y cuenta las
+    páginas abiertas para que el pool lo recicle tras pages_per_context páginas.
+    """
+
+    def __init__(self, slot: BrowserSlot, context, options_key):
+        self.slot = slot
+        self.context = context
+        self.options_key = options_key
+        self.pages_served = 0
+        self.broken = False
+
+    async def new_page(self):
+        self.pages_served += 1
+        try:
+            return await self.context.new_page()
+        except Exception:
+            self.broken = True
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
+class BrowserPool:
+    """Pool de navegadores y contextos calientes reutilizables"""
+
+    def __init__(self, max_browsers: int = DEFAULT_MAX_BROWSERS,
+                 pages_per_context: int = DEFAULT_PAGES_PER_CONTEXT,
+                 headless: bool = True, launch_args: list = None,
+                 browser_endpoint: str = None, remote_debugging: bool = False,
+                 launch_fallback: bool = False,
+                 max_idle_contexts: int = DEFAULT_MAX_IDLE_CONTEXTS, profile: BrowserProfile = None):
+        """
+        Args:
+            max_browsers: Máximo de procesos Chromium vivos a la vez
+            pages_per_context: Páginas que sirve un contexto antes de reciclarse
+            headless: Modo headless de los navegadores lanzados
+            launch_args: Argumentos extra de Chromium
+            browser_endpoint: Si se indica, se conecta por CDP a un navegador ya
+                arrancado (ej: el de BrowserService) en lugar de lanzar uno propio
+            remote_debugging: Si es True, los navegadores lanzados exponen un
+                endpoint CDP para que otros procesos puedan conectarse
+            launch_fallback: Si falla el lanzamiento, reintentar con el modo
+                headless invertido
+            max_idle_contexts: Contextos ociosos que se conservan por configuración
+            profile: BrowserProfile opcional; en modo persistente el pool sirve un único contexto
+                sobre su directorio de usuario, en modo storage state carga y guarda sus cookies
+        """
+        self.max_browsers = max(1, max_browsers)
+        self.pages_per_context = pages_per_context
+        self.headless = headless
+        self.launch_args = launch_args if launch_args is not None else list(BROWSER_ARGS)
+        self.browser_endpoint = browser_endpoint
+        self.remote_debugging = remote_debugging
+        self.launch_fallback = launch_fallback
+        self.max_idle_contexts = max_idle_contexts
+        self.profile = profile
+
+        self._playwright_manager = None
+        self._playwright = None
+        self._slots = []
+        self._idle = {}  # {options_key: [PooledContext, ...]}
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "browsers_launched": 0,
+            "contexts_created": 0,
+            "contexts_reused": 0,
+            "contexts_recycled": 0,
+        }
+
+    async def start(self):
+        """Arranca Playwright (los navegadores se lanzan bajo demanda)"""
+        if self._playwright is None:
+            self._playwright_manager = async_playwright()
+            self._playwright = await self._playwright_manager.start()
+            if self.profile is not None:
+                # Un directorio de usuario solo admite un contexto y un navegador lanzado aquí
+                self.profile.acquire(can_persist=not self.browser_endpoint and self.max_browsers == 1)
+        return self
+
+    async def stop(self):
+        """Cierra todos los contextos, navegadores y Playwright"""
+        for contexts in self._idle.values():
+            for pooled in contexts:
+                await self._close_context(pooled)
+        self._idle.clear()
+        for slot in self._slots:
+            try:
+                await slot.browser.close()
+            except Exception:
+                pass
+        self._slots.clear()
+        if self._playwright_manager is not None:
+            await self._playwright_manager.__aexit__(None, None, None)
+            self._playwright_manager = None
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _launch(self) -> BrowserSlot:
+        """Lanza (o conecta) un nuevo navegador"""
+        await self.start()
+        chromium = self._playwright.chromium
+
+        if self.browser_endpoint:
+            print(f"🔌 Conectando a navegador caliente: {self.browser_endpoint}", flush=True)
+            browser = await chromium.connect_over_cdp(self.browser_endpoint)
+            return BrowserSlot(browser, self.browser_endpoint)
+
+        args = list(self.launch_args)
+        endpoint = None
+        if self.remote_debugging:
+            port = _free_port()
+            args.append(f"--remote-debugging-port={port}")
+            endpoint = f"http://127.0.0.1:{port}"
+
+        try:
+            browser = await chromium.launch(headless=self.headless, args=args)
+        except Exception as e:
+            if not self.launch_fallback:
+                raise
+            print(f"❌ Error al iniciar navegador en modo {'headless' if self.headless else 'visible'}: {e}", flush=True)
+            print(f"🔄 Intentando con modo {'visible' if self.headless else 'headless'}...", flush=True)
+            browser = await chromium.launch(headless=not self.headless, args=args)
+
+        self.stats["browsers_launched"] += 1
+        return BrowserSlot(browser, endpoint)
+
+    async def _launch_persistent(self, context_options: dict) -> BrowserSlot:
+        """Lanza Chromium sobre el directorio de usuario del perfil (cookies, consentimiento y caché de disco)"""
+        await self.start()
+        chromium = self._playwright.chromium
+        args = list(self.launch_args) + self.profile.launch_args()
+        user_data_dir = str(self.profile.user_data_dir)
+        try:
+            context = await chromium.launch_persistent_context(user_data_dir, headless=self.headless, args=args,
+                                                               **context_options)
+        except Exception as e:
+            if not self.launch_fallback:
+                raise
+            print(f"❌ Error al iniciar navegador en modo {'headless' if self.headless else 'visible'}: {e}", flush=True)
+            print(f"🔄 Intentando con modo {'visible' if self.headless else 'headless'}...", flush=True)
+            context = await chromium.launch_persistent_context(user_data_dir, headless=not self.headless, args=args,
+                                                               **context_options)
+        self.stats["browsers_launched"] += 1
+        return BrowserSlot(PersistentBrowser(context))
+
+    async def acquire_browser(self) -> BrowserSlot:
+        """Devuelve el navegador menos cargado, lanzando otro si no se ha alcanzado el límite"""
+        async with self._lock:
+            self._slots = [slot for slot in self._slots if slot.is_alive()]
+            idle_slots = [slot for slot in self._slots if slot.leases == 0]
+            if idle_slots:
+                slot = idle_slots[0]
+            elif len(self._slots) < self.max_browsers:
+                slot = await self._launch()
+                self._slots.append(slot)
+            else:
+                slot = min(self._slots, key=lambda s: s.leases)
+            slot.leases += 1
+            return slot
+
+    def release_browser(self, slot: BrowserSlot):
+        slot.leases = max(0, slot.leases - 1)
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """
+        Presta un contexto caliente con las opciones indicadas.
+
+        Al devolverlo se reutiliza (cookies y rutas limpias) salvo que haya
+        servido pages_per_context páginas o haya fallado, en cuyo caso se cierra.
+        """
+        options_key = repr(sorted(context_options.items()))
+        pooled = await self._borrow_context(options_key, context_options)
+        try:
+            yield pooled
+        except Exception:
+            pooled.broken = True
+            raise
+        finally:
+            await self._return_context(pooled)
+
+    async def _borrow_context(self, options_key, context_options) -> PooledContext:
+        idle = self._idle.get(options_key, [])
+        while idle:
+            pooled = idle.pop()
+            if pooled.slot.is_alive():
+                pooled.slot.leases += 1
+                self.stats["contexts_reused"] += 1
+                return pooled
+
+        if self.profile is not None and self.profile.mode == MODE_PERSISTENT:
+            async with self._lock:
+                if any(slot.is_alive() for slot in self._slots):
+                    raise RuntimeError(f"El perfil persistente {self.profile.name} solo admite un contexto a la vez")
+                slot = await self._launch_persistent(context_options)
+                self._slots.append(slot)
+            slot.leases += 1
+            context = slot.browser.context
+        else:
+            if self.profile is not None:
+                context_options = self.profile.context_options(context_options)
+            slot = await self.acquire_browser()
+            try:
+                context = await slot.browser.new_context(**context_options)
+            except Exception:
+                self.release_browser(slot)
+                raise
+        slot.contexts_created += 1
+        self.stats["contexts_created"] += 1
+        return PooledContext(slot, context, options_key)
+
+    async def _return_context(self, pooled: PooledContext):
+        self.release_browser(pooled.slot)
+        if self.profile is not None and not pooled.broken:
+            # Antes de limpiar el contexto: cookies y localStorage para la próxima ejecución
+            await self.profile.save_state(pooled.context)
+        persistent = isinstance(pooled.slot.browser, PersistentBrowser)
+
+        reusable = (
+            not pooled.broken
+            and pooled.pages_served < self.pages_per_context
+            and pooled.slot.is_alive()
+            and hasattr(pooled.context, "unroute_all")
+            and len(self._idle.get(pooled.options_key, [])) < self.max_idle_contexts
+        )
+        if reusable:
+            try:
+                for page in list(pooled.context.pages):
+                    await page.close()
+                # El contexto persistente conserva sus cookies: son las del perfil
+                if not persistent:
+                    await pooled.context.clear_cookies()
+                await pooled.context.unroute_all(behavior="ignoreErrors")
+                self._idle.setdefault(pooled.options_key, []).append(pooled)
+                return
+            except Exception:
+                pass
+
+        self.stats["contexts_recycled"] += 1
+        await self._close_context(pooled)
+
+    async def _close_context(self, pooled: PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    def endpoints(self) -> list:
+        """Endpoints CDP de los navegadores vivos (solo con remote_debugging)"""
+        return [slot.endpoint for slot in self._slots if slot.endpoint and slot.is_alive()]
+
+    def summary(self) -> dict:
+        """Estadísticas del pool"""
+        return dict(self.stats, live_browsers=len([s for s in self._slots if s.is_alive()]))
+
+
+class BrowserService:
+    """
+    Servicio de navegadores calientes para procesos de larga duración.
+
+    Mantiene un BrowserPool con remote_debugging en un hilo con su propio bucle
+    asyncio y presta endpoints CDP a los subprocesos de scraping, que se
+    conectan con --browser-endpoint en lugar de lanzar Chromium en frío.
+    """
+
+    def __init__(self, max_browsers: int = DEFAULT_MAX_BROWSERS, headless: bool = True):
+        self.pool = BrowserPool(max_browsers=max_browsers, headless=headless, remote_debugging=True)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._endpoint_leases = {}
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def start(self):
+        """Arranca el hilo del servicio (idempotente)"""
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, name="browser-service", daemon=True)
+                self._thread.start()
+                self._call(self.pool.start())
+        return self
+
+    def _call(self, coro, timeout: float = 60):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def stop(self):
+        """Cierra los navegadores y detiene el hilo"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._call(self.pool.stop())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    @contextmanager
+    def lease_endpoint(self):
+        """
+        Presta el endpoint CDP del navegador menos cargado durante el bloque.
+        Si el servicio no puede arrancar Chromium devuelve None (arranque en frío).
+        """
+        try:
+            self.start()
+            slot = self._call(self.pool.acquire_browser())
+        except Exception as e:
+            print(f"⚠️  Servicio de navegadores no disponible: {e}", flush=True)
+            yield None
+            return
+        try:
+            yield slot.endpoint
+        finally:
+            self._loop.call_soon_threadsafe(self.pool.release_browser, slot)
+
+    def summary(self) -> dict:
+        if self._thread is None:
+            return {"running": False}
+        return dict(self.pool.summary(), running=True)
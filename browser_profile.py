@@ -0,0 +1,214 @@
+"""
+Perfil de navegador persistente entre ejecuciones (arranques en caliente)
+
+Sin perfil, cada ejecución empieza con un contexto vacío: banner de cookies,
+negociación de idioma y caché HTTP fría para CSS/JS/imágenes. Con un perfil se
+reutilizan entre ejecuciones:
+
+- Modo persistente (navegador propio): directorio de usuario de Chromium
+  (launch_persistent_context) con cookies, consentimiento, localStorage y la
+  caché de disco, limitada con --disk-cache-size y podada al cerrar si se pasa.
+- Modo storage state (pool compartido, --browser-endpoint o perfil en uso por
+  otro proceso): solo cookies y localStorage, que se cargan con
+  new_context(storage_state=...) y se guardan al devolver el contexto.
+
+Cada nombre de perfil es un directorio independiente
+(data/cache/profiles/<sitio>/<nombre>): los trabajos que deban aislarse usan
+nombres distintos. Un fichero de bloqueo impide que dos procesos abran a la vez
+el mismo directorio de usuario.
+"""
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+DEFAULT_PROFILES_DIR = "data/cache/profiles"
+DEFAULT_PROFILE_NAME = "default"
+DEFAULT_CACHE_MB = 200
+
+MODE_PERSISTENT = "persistent"
+MODE_STATE = "state"
+
+# Cachés del directorio de usuario que se pueden borrar sin perder cookies ni consentimiento
+CACHE_DIRS = ("Default/Cache", "Default/Code Cache", "Default/GPUCache", "Default/Service Worker/CacheStorage")
+
+
+def _dir_size_mb(path: Path) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BrowserProfile:
+    """Directorio de perfil de un sitio: directorio de usuario de Chromium, storage state y metadatos"""
+
+    def __init__(self, site: str, name: str = DEFAULT_PROFILE_NAME, root: str = DEFAULT_PROFILES_DIR,
+                 max_cache_mb: float = DEFAULT_CACHE_MB, persistent: bool = True):
+        """
+        Args:
+            site: Sitio del perfil ("amazon", "corte_ingles")
+            name: Nombre del perfil; cada nombre es un perfil aislado del resto
+            root: Directorio raíz de los perfiles
+            max_cache_mb: Tamaño máximo de la caché de disco de Chromium (MB)
+            persistent: Si es False solo se guardan cookies y localStorage (storage state)
+        """
+        self.site = site
+        self.name = re.sub(r"[^\w.-]+", "_", name) or DEFAULT_PROFILE_NAME
+        self.directory = Path(root) / site / self.name
+        self.user_data_dir = self.directory / "chromium"
+        self.state_path = self.directory / "storage_state.json"
+        self.meta_path = self.directory / "profile.json"
+        self.lock_path = self.directory / "profile.lock"
+        self.max_cache_mb = max_cache_mb
+        self.persistent = persistent
+        self.mode = None
+        self._locked = False
+
+        self.meta = {}
+        if self.meta_path.exists():
+            try:
+                self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self.meta = {}
+        self.stats = {"run": self.meta.get("runs", 0) + 1, "first_load_seconds": None,
+                      "previous_first_load_seconds": self.meta.get("first_load_seconds"),
+                      "state_saves": 0, "cache_pruned_mb": 0.0}
+
+    def acquire(self, can_persist: bool = True) -> str:
+        """
+        Decide el modo del perfil para esta ejecución y bloquea el directorio de usuario si es persistente.
+
+        Args:
+            can_persist: False si el navegador no se lanza aquí (CDP) o hay que servir varios contextos
+                a la vez (pool compartido): solo se puede usar el storage state
+
+        Returns:
+            MODE_PERSISTENT o MODE_STATE
+        """
+        if self.mode is not None:
+            return self.mode
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.persistent and can_persist:
+            if self._lock():
+                self.mode = MODE_PERSISTENT
+            else:
+                print(f"⚠️  Perfil {self.site}/{self.name} en uso por otro proceso: solo se cargan sus cookies "
+                      f"(usa --profile=OTRO_NOMBRE para aislar este trabajo)", flush=True)
+                self.mode = MODE_STATE
+        else:
+            self.mode = MODE_STATE
+        return self.mode
+
+    def _lock(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    pid = int(self.lock_path.read_text().strip() or 0)
+                except (OSError, ValueError):
+                    pid = 0
+                if pid and _pid_alive(pid):
+                    return False
+                # Bloqueo de un proceso que ya no existe
+                self.lock_path.unlink(missing_ok=True)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            self._locked = True
+            return True
+        return False
+
+    def launch_args(self) -> list:
+        """Argumentos de Chromium del modo persistente (límite de la caché de disco)"""
+        return [f"--disk-cache-size={int(self.max_cache_mb * 1024 * 1024)}"]
+
+    def context_options(self, options: dict) -> dict:
+        """Opciones de new_context con las cookies y el localStorage guardados (modo storage state)"""
+        if self.state_path.exists():
+            return {**options, "storage_state": str(self.state_path)}
+        return options
+
+    async def save_state(self, context):
+        """Guarda cookies y localStorage del contexto para la próxima ejecución"""
+        try:
+            await context.storage_state(path=str(self.state_path))
+            self.stats["state_saves"] += 1
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar el estado del perfil {self.site}/{self.name}: {e}", flush=True)
+
+    def record_first_load(self, seconds: float):
+        """Anota el tiempo de carga de la primera página de la ejecución"""
+        if self.stats["first_load_seconds"] is None:
+            self.stats["first_load_seconds"] = seconds
+
+    def cache_size_mb(self) -> float:
+        """Tamaño de las cachés del directorio de usuario (MB)"""
+        return sum(_dir_size_mb(self.user_data_dir / cache_dir) for cache_dir in CACHE_DIRS)
+
+    def enforce_cache_cap(self):
+        """
+        Borra las cachés si superan max_cache_mb. --disk-cache-size solo limita la caché HTTP;
+        la caché de código y la de service workers crecen aparte. Llamar con el navegador cerrado.
+        """
+        size = self.cache_size_mb()
+        if size <= self.max_cache_mb:
+            return
+        for cache_dir in CACHE_DIRS:
+            shutil.rmtree(self.user_data_dir / cache_dir, ignore_errors=True)
+        self.stats["cache_pruned_mb"] = round(size, 1)
+
+    def close(self):
+        """Guarda los metadatos, poda la caché y libera el bloqueo (tras cerrar el navegador)"""
+        if self.mode is None:
+            return
+        if self.mode == MODE_PERSISTENT:
+            self.enforce_cache_cap()
+        self.meta["runs"] = self.stats["run"]
+        self.meta["last_run_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if self.stats["first_load_seconds"] is not None:
+            self.meta["first_load_seconds"] = round(self.stats["first_load_seconds"], 3)
+        try:
+            self.meta_path.write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+        except OSError:
+            pass
+        if self._locked:
+            self.lock_path.unlink(missing_ok=True)
+            self._locked = False
+
+    def summary(self) -> dict:
+        """Modo, ejecución nº, carga de la primera página (esta y la anterior) y tamaño de la caché"""
+        return {**self.stats, "site": self.site, "name": self.name, "mode": self.mode,
+                "cache_mb": round(self.cache_size_mb(), 1), "max_cache_mb": self.max_cache_mb}
+
+    def print_summary(self):
+        """Imprime las estadísticas del perfil"""
+        if self.mode is None:
+            return
+        summary = self.summary()
+        mode = "persistente" if summary["mode"] == MODE_PERSISTENT else "solo cookies"
+        first_load = ""
+        if summary["first_load_seconds"] is not None:
+            first_load = f", primera página {summary['first_load_seconds']:.2f}s"
+            if summary["previous_first_load_seconds"] is not None:
+                first_load += f" (ejecución anterior {summary['previous_first_load_seconds']:.2f}s)"
+        pruned = f", caché podada ({summary['cache_pruned_mb']:.0f} MB)" if summary["cache_pruned_mb"] else ""
+        print(f"\n👤 Perfil {self.site}/{self.name} ({mode}, ejecución nº {summary['run']}){first_load}, "
+              f"caché {summary['cache_mb']:.0f}/{summary['max_cache_mb']:.0f} MB{pruned}", flush=True)
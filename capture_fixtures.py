@@ -0,0 +1,148 @@
+"""
+Captura de páginas de Amazon / El Corte Inglés como fixtures para bench_replay.py
+
+Guarda la página de resultados de un término y las primeras páginas de detalle
+tal como quedan tras renderizarse (DOM serializado, sin <script>), junto a un
+manifest.json, en data/fixtures/<sitio>/<nombre>/. El benchmark las sirve luego
+desde un servidor local, sin red.
+
+Uso:
+    python capture_fixtures.py amazon "leche entera" [--details=5] [--name=leche] [--headless]
+    python capture_fixtures.py corte_ingles "aceite de oliva" [--details=5]
+"""
+import asyncio
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from browser_pool import BrowserPool
+from cli_options import get_cli_option
+from html_capture import strip_scripts
+from main import BROWSER_USER_AGENT, extract_products_from_page, search_page_url
+from scraper_temu import search_product_tiles
+from wait_strategy import AMAZON, CORTE_INGLES, WaitEngine
+
+FIXTURES_DIR = "data/fixtures"
+DEFAULT_DETAILS = 5
+SITES = (AMAZON, CORTE_INGLES)
+
+
+def fixture_dir(site: str, name: str) -> Path:
+    """Carpeta de un conjunto de fixtures"""
+    return Path(FIXTURES_DIR) / site / re.sub(r"[^a-zA-Z0-9_]", "_", name.replace(" ", "_"))
+
+
+async def save_page(page, path: Path):
+    """Guarda el DOM renderizado de la página sin scripts"""
+    html = strip_scripts(await page.content())
+    path.write_text(html, encoding="utf-8")
+    print(f"   💾 {path.name} ({len(html) / 1024:.0f} KB)", flush=True)
+
+
+async def capture_amazon(context, page, search_term: str, details: int, target: Path) -> list:
+    """Captura la página de resultados y las primeras páginas de detalle de Amazon"""
+    waits = WaitEngine(AMAZON)
+    await page.goto(search_page_url(search_term), wait_until="domcontentloaded")
+    await waits.wait(page, "search_results")
+    await save_page(page, target / "search.html")
+
+    products = [p for p in await extract_products_from_page(page, search_term, 1, details) if p]
+    captured = []
+    for product in products:
+        detail_page = await context.new_page()
+        try:
+            await detail_page.goto(product["url"], timeout=20000, wait_until="domcontentloaded")
+            await waits.wait(detail_page, "nutrition_expanded")
+            filename = f"detail_{product['asin']}.html"
+            await save_page(detail_page, target / filename)
+            captured.append({"file": filename, "id": product["asin"], "url": product["url"]})
+        except Exception as e:
+            print(f"   ⚠️ No se pudo capturar {product['url'][:60]}: {e}", flush=True)
+        finally:
+            await detail_page.close()
+    return captured
+
+
+async def capture_corte_ingles(context, page, search_term: str, details: int, target: Path) -> list:
+    """Captura la página de resultados (tras el scroll) y las primeras páginas de detalle de El Corte Inglés"""
+    waits = WaitEngine(CORTE_INGLES)
+    products = await search_product_tiles(page, search_term, details, waits)
+    await save_page(page, target / "search.html")
+
+    captured = []
+    for idx, product in enumerate(products, 1):
+        if product["url"] == "N/A":
+            continue
+        detail_page = await context.new_page()
+        try:
+            await detail_page.goto(product["url"], timeout=20000, wait_until="domcontentloaded")
+            await waits.wait(detail_page, "detail_loaded")
+            filename = f"detail_{idx}.html"
+            await save_page(detail_page, target / filename)
+            captured.append({"file": filename, "id": product["product_id"], "url": product["url"]})
+        except Exception as e:
+            print(f"   ⚠️ No se pudo capturar {product['url'][:60]}: {e}", flush=True)
+        finally:
+            await detail_page.close()
+    return captured
+
+
+async def capture(site: str, search_term: str, details: int = DEFAULT_DETAILS, name: str = None,
+                  headless: bool = False) -> Path:
+    """
+    Captura un conjunto de fixtures.
+
+    Args:
+        site: AMAZON o CORTE_INGLES
+        search_term: Término de búsqueda
+        details: Número de páginas de detalle a capturar
+        name: Nombre de la carpeta (por defecto el término)
+        headless: Modo headless del navegador
+
+    Returns:
+        Carpeta con search.html, detail_*.html y manifest.json
+    """
+    target = fixture_dir(site, name or search_term)
+    target.mkdir(parents=True, exist_ok=True)
+    print(f"📸 Capturando {site} '{search_term}' en {target}", flush=True)
+
+    async with BrowserPool(max_browsers=1, headless=headless, launch_args=[]) as pool:
+        async with pool.context(user_agent=BROWSER_USER_AGENT) as context:
+            page = await context.new_page()
+            if site == AMAZON:
+                captured = await capture_amazon(context, page, search_term, details, target)
+            else:
+                captured = await capture_corte_ingles(context, page, search_term, details, target)
+
+    manifest = {
+        "site": site,
+        "search_term": search_term,
+        "captured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "search_page": "search.html",
+        "details": captured,
+    }
+    with open(target / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"✅ {len(captured)} páginas de detalle capturadas. Genera las salidas de referencia con: "
+          f"python bench_replay.py {target} --update-golden", flush=True)
+    return target
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) < 2 or args[0] not in SITES:
+        print(f"📝 Uso: python capture_fixtures.py {{{'|'.join(SITES)}}} \"término\" [--details=N] [--name=carpeta] "
+              f"[--headless]")
+        sys.exit(1)
+    asyncio.run(capture(
+        args[0], args[1],
+        details=int(get_cli_option("details", DEFAULT_DETAILS)),
+        name=get_cli_option("name"),
+        headless="--headless" in sys.argv,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Checkpoints de ejecuciones de scraping para poder reanudarlas (--resume <run_id>)
+
+Cada ejecución guarda en data/checkpoints/<run_id>/:
+- run.json: parámetros de la ejecución y cursor de paginación (escritura atómica)
+- cards.jsonl: información básica de los productos encontrados (una línea por producto)
+- completed.jsonl: productos terminados (con detalles si el modo es detallado)
+
+Los ficheros .jsonl solo se amplían con líneas completas, así que una caída a
+mitad de escritura pierde como mucho el último producto.
+"""
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+CHECKPOINTS_DIR = "data/checkpoints"
+
+
+def _append_jsonl(path: Path, record: dict):
+    """Añade una línea JSON y la fuerza a disco"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_jsonl(path: Path) -> list:
+    """Lee un .jsonl ignorando una posible última línea truncada"""
+    records = []
+    if not path.exists():
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+class RunCheckpoint:
+    """Estado persistente de una ejecución de scraping"""
+
+    def __init__(self, run_id: str, directory: str = CHECKPOINTS_DIR):
+        self.run_id = run_id
+        self.path = Path(directory) / run_id
+        self.meta = {}
+        self.cards = {}  # {posición: producto básico}
+        self.completed = {}  # {posición: producto terminado}
+
+    @classmethod
+    def create(cls, platform: str, search_term: str, params: dict, directory: str = CHECKPOINTS_DIR):
+        """
+        Crea el checkpoint de una ejecución nueva.
+
+        El run_id lleva un sufijo aleatorio: dos ejecuciones del mismo término que
+        empiezan en el mismo segundo (trabajos del frontend, términos de batch_scrape)
+        no comparten directorio ni capturas.
+        """
+        clean_term = re.sub(r"[^\w]+", "_", search_term.strip()).strip("_") or "run"
+        run_id = f"{platform}_{clean_term}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        checkpoint = cls(run_id, directory)
+        checkpoint.path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint.path.mkdir(exist_ok=False)
+        checkpoint.meta = {
+            "run_id": run_id,
+            "platform": platform,
+            "search_term": search_term,
+            "params": params,
+            "cursor": None,
+            "status": "running",
+            "created_at": time.time(),
+        }
+        checkpoint._write_meta()
+        return checkpoint
+
+    @classmethod
+    def load(cls, run_id: str, directory: str = CHECKPOINTS_DIR):
+        """Carga el checkpoint de una ejecución anterior"""
+        checkpoint = cls(run_id, directory)
+        meta_path = checkpoint.path / "run.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No existe el checkpoint {run_id} en {checkpoint.path}")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            checkpoint.meta = json.load(f)
+        checkpoint.cards = {card["position"]: card for card in _read_jsonl(checkpoint.path / "cards.jsonl")}
+        checkpoint.completed = {
+            product["position"]: product for product in _read_jsonl(checkpoint.path / "completed.jsonl")
+        }
+        return checkpoint
+
+    def _write_meta(self):
+        """Escribe run.json de forma atómica (fichero temporal + rename)"""
+        self.meta["updated_at"] = time.time()
+        tmp_path = self.path / "run.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path / "run.json")
+
+    @property
+    def cursor(self):
+        return self.meta.get("cursor")
+
+    @property
+    def params(self) -> dict:
+        return self.meta.get("params", {})
+
+    @property
+    def search_term(self) -> str:
+        return self.meta["search_term"]
+
+    @property
+    def pagination_done(self) -> bool:
+        return bool(self.cursor and self.cursor.get("done"))
+
+    def record_page(self, cards: list, cursor: dict):
+        """Guarda los productos de una página de resultados y el cursor de paginación"""
+        for card in cards:
+            if card["position"] not in self.cards:
+                self.cards[card["position"]] = card
+                _append_jsonl(self.path / "cards.jsonl", card)
+        self.meta["cursor"] = dict(cursor, done=False)
+        self._write_meta()
+
+    def mark_pagination_done(self):
+        """Marca la paginación como terminada"""
+        self.meta["cursor"] = dict(self.cursor or {}, done=True)
+        self._write_meta()
+
+    def record_completed(self, product: dict):
+        """Guarda un producto terminado"""
+        self.completed[product["position"]] = product
+        _append_jsonl(self.path / "completed.jsonl", product)
+
+    def is_completed(self, product: dict) -> bool:
+        return product.get("position") in self.completed
+
+    def pending_cards(self) -> list:
+        """Productos encontrados que aún no se han terminado, por posición"""
+        return [card for position, card in sorted(self.cards.items()) if position not in self.completed]
+
+    def merged_products(self) -> list:
+        """Todos los productos conocidos, usando la versión terminada cuando existe"""
+        positions = sorted(set(self.cards) | set(self.completed))
+        return [self.completed.get(position, self.cards.get(position)) for position in positions]
+
+    def finish(self, remove: bool = True):
+        """Marca la ejecución como terminada y, por defecto, borra el checkpoint"""
+        if remove:
+            shutil.rmtree(self.path, ignore_errors=True)
+        else:
+            self.meta["status"] = "finished"
+            self._write_meta()
+
+    def print_resume_info(self):
+        """Imprime el estado recuperado al reanudar"""
+        if self.pagination_done:
+            pagination = "completa"
+        else:
+            pagination = f"en página {(self.cursor or {}).get('page_num', 1)}"
+        print(f"♻️  Reanudando {self.run_id}: {len(self.cards)} productos encontrados, "
+              f"{len(self.completed)} terminados, paginación {pagination}", flush=True)
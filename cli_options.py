@@ -0,0 +1,89 @@
+"""
+Utilidades para leer opciones de línea de comandos de los scrapers
+"""
+import sys
+
+from browser_profile import DEFAULT_CACHE_MB, DEFAULT_PROFILE_NAME, BrowserProfile
+from memory_guard import DEFAULT_CONTEXT_PAGES, DEFAULT_MAX_BROWSER_MB
+from scrape_budget import PRIORITIES, PRIORITY_POSITION
+
+
+def get_cli_option(name: str, default=None, argv: list = None):
+    """
+    Lee el valor de una opción "--name=valor" o "--name valor" de sys.argv.
+
+    Args:
+        name: Nombre de la opción sin guiones (ej: "block-profile")
+        default: Valor devuelto si la opción no aparece
+        argv: Lista de argumentos (por defecto sys.argv)
+
+    Returns:
+        str con el valor de la opción o default
+    """
+    argv = sys.argv if argv is None else argv
+    flag = f"--{name}"
+    for idx, arg in enumerate(argv):
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+        if arg == flag and idx + 1 < len(argv) and not argv[idx + 1].startswith("--"):
+            return argv[idx + 1]
+    return default
+
+
+def get_block_profile(argv: list = None):
+    """Perfil de bloqueo de recursos pedido por CLI (--lean o --block-profile=...)"""
+    argv = sys.argv if argv is None else argv
+    profile = get_cli_option("block-profile", argv=argv)
+    if profile:
+        return profile
+    return "lean" if "--lean" in argv else None
+
+
+def parse_duration(value: str) -> float:
+    """Duración "90", "90s", "45m" o "2h" en segundos"""
+    value = value.strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def get_deadline(argv: list = None):
+    """Presupuesto de tiempo pedido con --deadline=90m (segundos, o None si no se pide)"""
+    value = get_cli_option("deadline", argv=argv)
+    return parse_duration(value) if value else None
+
+
+def get_priority(argv: list = None, default: str = PRIORITY_POSITION):
+    """Orden de la extracción de detalles pedido con --priority=position|reviews|uncached"""
+    priority = get_cli_option("priority", default, argv=argv)
+    if priority not in PRIORITIES:
+        print(f"⚠️  --priority={priority} no válido (opciones: {', '.join(PRIORITIES)}); se usa {default}", flush=True)
+        return default
+    return priority
+
+
+def get_browser_profile(site: str, argv: list = None):
+    """
+    Perfil de navegador pedido con --profile[=NOMBRE] (None si no se pide).
+    --profile-cache-mb=N limita la caché de disco y --profile-state-only guarda solo cookies y localStorage.
+    """
+    argv = sys.argv if argv is None else argv
+    name = get_cli_option("profile", argv=argv)
+    if not name and "--profile" not in argv and "--profile-state-only" not in argv:
+        return None
+    max_cache_mb = float(get_cli_option("profile-cache-mb", DEFAULT_CACHE_MB, argv=argv))
+    return BrowserProfile(site, name or DEFAULT_PROFILE_NAME, max_cache_mb=max_cache_mb,
+                          persistent="--profile-state-only" not in argv)
+
+
+def get_memory_limits(argv: list = None) -> tuple:
+    """
+    Umbrales de renovación del contexto de detalle: (--context-pages=N, --max-browser-mb=N).
+    0 desactiva cada umbral; --no-memory-guard los desactiva los dos (solo se mide la memoria).
+    """
+    argv = sys.argv if argv is None else argv
+    if "--no-memory-guard" in argv:
+        return 0, 0
+    return (int(get_cli_option("context-pages", DEFAULT_CONTEXT_PAGES, argv=argv)),
+            float(get_cli_option("max-browser-mb", DEFAULT_MAX_BROWSER_MB, argv=argv)))
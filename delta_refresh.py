@@ -0,0 +1,113 @@
+"""
+Refresco incremental: solo se revisitan los productos cuyo listado cambió
+
+Compara cada tarjeta recién extraída con la extracción anterior del mismo
+término (almacén .jsonl). Si el ASIN ya existía, tenía detalles y sus campos
+clave del listado (precio, valoración, reseñas...) no han cambiado, se
+reutilizan sus detalles anteriores en lugar de visitar la página de detalle.
+"""
+from extraction_store import ExtractionStore
+from http_detail_fetcher import empty_details, has_details
+
+# Campos de la tarjeta de resultados que, si cambian, obligan a volver a visitar el detalle
+REFRESH_KEY_FIELDS = ("title", "price", "original_price", "rating", "reviews_count", "availability")
+DETAIL_FIELDS = tuple(empty_details())
+# Campos que deciden si un producto refrescado es igual al guardado (la URL lleva parámetros de cada búsqueda
+# y la posición cambia aunque el producto no)
+CONTENT_FIELDS = REFRESH_KEY_FIELDS + DETAIL_FIELDS + ("details_missing",)
+
+
+def _normalize(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+class PreviousExtraction:
+    """Productos de la extracción anterior de un término, por ASIN"""
+
+    def __init__(self, products: list):
+        """
+        Args:
+            products: Productos guardados en la extracción anterior
+        """
+        self.by_asin = {product["asin"]: product for product in products if product.get("asin")}
+        self.stats = {"unchanged": 0, "changed": 0, "new": 0, "no_details": 0}
+        self.changed_fields = {}  # {campo: nº de productos en los que cambió}
+        self.restored = 0  # Productos cuya nueva visita falló y conservan los detalles anteriores
+
+    @classmethod
+    def load(cls, path) -> "PreviousExtraction":
+        """Carga la extracción anterior (vacía si el término no se había extraído)"""
+        previous = cls(ExtractionStore(path).read())
+        print(f"🔁 Modo refresco: {len(previous.by_asin)} productos en la extracción anterior", flush=True)
+        return previous
+
+    def _has_previous_details(self, previous: dict) -> bool:
+        # Detalles completos y obtenidos en una visita correcta (no recuperados tras un fallo)
+        return (all(field in previous for field in DETAIL_FIELDS) and has_details(previous)
+                and not previous.get("details_missing"))
+
+    def carry_forward(self, product_data: dict) -> bool:
+        """
+        Si el producto no ha cambiado desde la extracción anterior, copia sus detalles
+        anteriores y devuelve True; si es nuevo o cambió, devuelve False (hay que visitarlo).
+        """
+        previous = self.by_asin.get(product_data.get("asin"))
+        if previous is None:
+            self.stats["new"] += 1
+            return False
+        if not self._has_previous_details(previous):
+            self.stats["no_details"] += 1
+            return False
+
+        changed = [field for field in REFRESH_KEY_FIELDS
+                   if _normalize(previous.get(field)) != _normalize(product_data.get(field))]
+        if changed:
+            self.stats["changed"] += 1
+            for field in changed:
+                self.changed_fields[field] = self.changed_fields.get(field, 0) + 1
+            return False
+
+        self.stats["unchanged"] += 1
+        product_data.update({field: previous[field] for field in DETAIL_FIELDS})
+        return True
+
+    def restore_failed(self, products: list) -> int:
+        """
+        Los productos cuyo listado cambió pero cuya nueva visita de detalle falló (details_missing)
+        recuperan los detalles de la extracción anterior, para que el reemplazo no los sustituya
+        por vacíos. details_missing se conserva: el siguiente refresco los vuelve a visitar.
+
+        Returns:
+            Productos recuperados
+        """
+        restored = 0
+        for product_data in products:
+            previous = self.by_asin.get(product_data.get("asin"))
+            if product_data.get("details_missing") and previous is not None and self._has_previous_details(previous):
+                product_data.update({field: previous[field] for field in DETAIL_FIELDS})
+                restored += 1
+        if restored:
+            print(f"🔁 {restored} productos sin detalles en esta ejecución conservan los de la extracción anterior",
+                  flush=True)
+        self.restored += restored
+        return restored
+
+    def summary(self) -> dict:
+        """Productos reutilizados y visitados, y campos que provocaron las visitas"""
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            "visits_saved_pct": round(self.stats["unchanged"] * 100 / total, 1) if total else 0.0,
+            "changed_fields": dict(self.changed_fields),
+            "restored": self.restored,
+        }
+
+    def print_summary(self):
+        """Imprime cuántas visitas de detalle se ahorraron"""
+        summary = self.summary()
+        print(f"\n🔁 Refresco: {summary['unchanged']} sin cambios (detalles reutilizados, "
+              f"{summary['visits_saved_pct']:.0f}% de visitas ahorradas), {summary['changed']} cambiados, "
+              f"{summary['new']} nuevos, {summary['no_details']} sin detalles previos", flush=True)
+        if summary["changed_fields"]:
+            fields = ", ".join(f"{field}: {count}" for field, count in sorted(summary["changed_fields"].items()))
+            print(f"   Campos cambiados: {fields}", flush=True)
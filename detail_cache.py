@@ -0,0 +1,159 @@
+"""
+Caché persistente de detalles de producto por ASIN (SQLite)
+
+Guarda la salida de extract_detailed_product_info para no volver a visitar
+páginas de producto ya extraídas recientemente. Las entradas caducan tras un
+TTL configurable y la caché se limita a un número máximo de entradas (se
+eliminan primero las menos usadas recientemente).
+"""
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = "data/cache/amazon_details.sqlite"
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 50_000
+LOCK_TIMEOUT = 0.05  # Espera máxima (s) por el bloqueo de SQLite: se hace dentro del bucle de eventos
+
+
+class DetailCache:
+    """Caché ASIN → detalles con TTL y expulsión LRU acotada por tamaño"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            path: Ruta del fichero SQLite
+            ttl_seconds: Antigüedad máxima de una entrada para considerarla válida
+            max_entries: Número máximo de entradas almacenadas
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "writes": 0, "evictions": 0, "lock_skips": 0}
+
+        # WAL permite que varios trabajos lean y escriban la misma caché a la vez
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                asin TEXT PRIMARY KEY,
+                details TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_details_accessed ON details (accessed_at)")
+        self.conn.commit()
+        # Tras crear la tabla, timeout corto: si otro trabajo (término del lote, shard) tiene la caché
+        # bloqueada, la escritura se omite en lugar de parar el bucle de eventos con las pestañas en vuelo
+        self.conn.execute(f"PRAGMA busy_timeout = {int(LOCK_TIMEOUT * 1000)}")
+
+    def _write(self, sql: str, params: tuple = ()):
+        """
+        Ejecuta una escritura y la confirma.
+
+        Returns:
+            El cursor, o None si otro trabajo tiene la caché bloqueada (la escritura se omite)
+        """
+        try:
+            cursor = self.conn.execute(sql, params)
+            self.conn.commit()
+            return cursor
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            self.conn.rollback()
+            self.stats["lock_skips"] += 1
+            return None
+
+    def get(self, asin: str):
+        """
+        Devuelve los detalles cacheados de un ASIN, o None si no existen o han caducado.
+        """
+        if not asin or asin == "N/A":
+            return None
+
+        row = self.conn.execute("SELECT details, fetched_at FROM details WHERE asin = ?", (asin,)).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+
+        details, fetched_at = row
+        now = time.time()
+        if now - fetched_at > self.ttl_seconds:
+            self.stats["stale"] += 1
+            return None
+
+        # Con la caché bloqueada solo se pierde la marca de uso (orden de expulsión)
+        self._write("UPDATE details SET accessed_at = ? WHERE asin = ?", (now, asin))
+        self.stats["hits"] += 1
+        return json.loads(details)
+
+    def has(self, asin: str) -> bool:
+        """Si hay una entrada vigente para el ASIN (sin contar como acierto ni refrescar su uso)"""
+        if not asin or asin == "N/A":
+            return False
+        row = self.conn.execute("SELECT fetched_at FROM details WHERE asin = ?", (asin,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def put(self, asin: str, details: dict):
+        """Guarda (o refresca) los detalles de un ASIN (se omite si otro trabajo tiene la caché bloqueada)"""
+        if not asin or asin == "N/A":
+            return
+
+        now = time.time()
+        cursor = self._write(
+            "INSERT OR REPLACE INTO details (asin, details, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (asin, json.dumps(details, ensure_ascii=False), now, now)
+        )
+        if cursor is None:
+            return
+        self.stats["writes"] += 1
+        if self.stats["writes"] % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Elimina entradas caducadas y las menos usadas si se supera max_entries
+        (con la caché bloqueada se deja para la siguiente)
+        """
+        cursor = self._write("DELETE FROM details WHERE fetched_at < ?", (time.time() - self.ttl_seconds,))
+        if cursor is None:
+            return
+        evicted = cursor.rowcount
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM details").fetchone()
+        if count > self.max_entries:
+            cursor = self._write("""
+                DELETE FROM details WHERE asin IN (
+                    SELECT asin FROM details ORDER BY accessed_at ASC LIMIT ?
+                )
+            """, (count - self.max_entries,))
+            evicted += cursor.rowcount if cursor is not None else 0
+        self.stats["evictions"] += evicted
+
+    def close(self):
+        """Aplica la expulsión pendiente y cierra la conexión"""
+        self.evict()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def summary(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+        return dict(self.stats, hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
+
+    def print_summary(self):
+        """Imprime los contadores de la caché"""
+        summary = self.summary()
+        print(f"\n🗃️  Caché de detalles: {summary['hits']} aciertos, {summary['misses']} fallos, "
+              f"{summary['stale']} caducados ({summary['hit_rate']:.0%} de aciertos), "
+              f"{summary['writes']} guardados, {summary['evictions']} expulsados", flush=True)
+        if summary["lock_skips"]:
+            print(f"   🔒 {summary['lock_skips']} escrituras omitidas (caché bloqueada por otro trabajo)", flush=True)
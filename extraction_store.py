@@ -0,0 +1,381 @@
+"""
+Almacén de extracciones en JSON Lines con índice de ASIN
+
+Cada término se guarda en data/extractions/<plataforma>/<plataforma>_<término>.jsonl
+(un producto por línea) junto a un índice compacto <fichero>.jsonl.idx con una
+línea "ASIN<TAB>offset" por producto. Guardar nuevos productos solo añade
+líneas al final (no se reescribe el histórico), bajo un bloqueo de fichero para
+que dos trabajos puedan escribir el mismo término a la vez.
+
+Si un producto se vuelve a añadir con replace=True, o trae los detalles que le
+faltaban a la versión guardada, la versión más reciente es la que cuenta;
+`python extraction_store.py compact` elimina las versiones antiguas, las líneas
+corruptas y convierte los .json antiguos a .jsonl.
+"""
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sin bloqueo entre procesos
+    fcntl = None
+
+STORE_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+LOCK_SUFFIX = ".lock"
+DEAD_LETTER_SUFFIX = ".deadletter.json"  # Productos sin detalles de la última ejecución (retry_queue.py)
+NETWORK_STATS_SUFFIX = ".network.json"  # Peticiones de red de la última ejecución (network_accounting.py)
+EXTRACTIONS_DIR = "data/extractions"
+
+# Marca de los productos guardados sin detalles (deadline, reintentos agotados; scrape_budget.py)
+MISSING_FIELD = "details_missing"
+
+# Campos de la ejecución que no cuentan como cambio al comparar un reemplazo con la versión guardada
+RUN_FIELDS = ("position",)
+
+
+def _valid_asin(asin) -> bool:
+    return bool(asin) and asin != "N/A"
+
+
+def _content(product: dict, fields: tuple = None) -> dict:
+    """Parte del producto que decide si un reemplazo es idéntico (fields, o todo salvo RUN_FIELDS)"""
+    if fields is None:
+        return {key: value for key, value in product.items() if key not in RUN_FIELDS}
+    return {field: product.get(field) for field in fields}
+
+
+class ExtractionStore:
+    """Fichero .jsonl de productos de solo-añadir con índice ASIN → offset"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Ruta del .jsonl (si se pasa un .json se usa el .jsonl equivalente
+                y el .json antiguo se importa en la primera escritura)
+        """
+        path = Path(path)
+        self.legacy_path = path if path.suffix == ".json" else path.with_suffix(".json")
+        self.path = path.with_suffix(STORE_SUFFIX)
+        self.index_path = Path(str(self.path) + INDEX_SUFFIX)
+        self.lock_path = Path(str(self.path) + LOCK_SUFFIX)
+
+    @contextmanager
+    def _locked(self):
+        """Bloqueo exclusivo entre procesos mientras se escribe"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _scan(self, start: int = 0):
+        """Recorre las líneas completas y válidas desde start: yields (offset, producto)"""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    break  # Última línea a medio escribir
+                try:
+                    yield line_offset, json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def _read_index(self) -> dict:
+        """Lee el índice tal cual está en disco: {asin: offset}"""
+        index = {}
+        if not self.index_path.exists():
+            return index
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 2 and parts[1].isdigit():
+                    index[parts[0]] = int(parts[1])
+        return index
+
+    def _line_end(self, offset: int):
+        """Offset del final de la línea que empieza en offset, o None si no es válida"""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
+        return offset + len(line)
+
+    def load_index(self, repair: bool = False) -> dict:
+        """
+        Índice {asin: offset de su versión más reciente}.
+
+        Si el .jsonl tiene líneas posteriores a la última indexada (un trabajo se
+        interrumpió entre escribir el producto y el índice), se indexan; con
+        repair=True además se añaden al fichero de índice.
+        """
+        if not self.path.exists():
+            return {}
+        index = self._read_index()
+        tail_start = 0
+        if index:
+            last_offset = max(index.values())
+            tail_start = self._line_end(last_offset) if last_offset < self.path.stat().st_size else None
+            if tail_start is None:
+                # Índice inconsistente con el .jsonl: reconstruir desde cero
+                index, tail_start = {}, 0
+                if repair:
+                    self.index_path.unlink(missing_ok=True)
+
+        recovered = []
+        for offset, product in self._scan(tail_start):
+            asin = product.get("asin")
+            if _valid_asin(asin):
+                index[asin] = offset
+                recovered.append(f"{asin}\t{offset}\n")
+        if repair and recovered:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write("".join(recovered))
+                f.flush()
+                os.fsync(f.fileno())
+        return index
+
+    def _ensure_newline(self):
+        """Si la última línea quedó a medio escribir, cerrarla para no pegarle la siguiente"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _import_legacy(self):
+        """Importa el .json antiguo (lista de productos) la primera vez que se escribe"""
+        if self.path.exists() or not self.legacy_path.exists():
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                legacy_products = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  No se pudo importar {self.legacy_path}: {e}", flush=True)
+            return
+        self._append_unlocked(legacy_products, replace=False, index={})
+        self.legacy_path.rename(self.legacy_path.with_suffix(".json.migrated"))
+        print(f"📦 {len(legacy_products)} productos importados de {self.legacy_path.name}", flush=True)
+
+    def _read_at(self, offset: int):
+        """Producto de la línea que empieza en offset (None si no es válida)"""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            line = f.readline()
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+    def _completes(self, offset: int, product: dict) -> bool:
+        """Si product trae los detalles que le faltaban a la versión guardada (ej: --resume tras un deadline)"""
+        if product.get(MISSING_FIELD):
+            return False
+        stored = self._read_at(offset)
+        return stored is not None and bool(stored.get(MISSING_FIELD))
+
+    def _append_unlocked(self, products: list, replace: bool, index: dict, compare_fields: tuple = None):
+        lines = []
+        added = []
+        added_asins = set()
+        skipped = 0
+        for product in products:
+            asin = product.get("asin")
+            if (not _valid_asin(asin) or asin in added_asins
+                    or (asin in index and not replace and not self._completes(index[asin], product))):
+                skipped += 1
+                continue
+            # Reemplazo idéntico a la versión guardada: no hace falta otra línea
+            if asin in index:
+                stored = self._read_at(index[asin])
+                if stored is not None and _content(stored, compare_fields) == _content(product, compare_fields):
+                    skipped += 1
+                    continue
+            lines.append(json.dumps(product, ensure_ascii=False).encode("utf-8") + b"\n")
+            added.append(asin)
+            added_asins.add(asin)
+
+        if not lines:
+            return 0, skipped
+
+        # Una única escritura en modo O_APPEND: las líneas de otro proceso no se intercalan
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            start = os.lseek(fd, 0, os.SEEK_END)
+            os.write(fd, b"".join(lines))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        index_lines = []
+        offset = start
+        for asin, line in zip(added, lines):
+            index[asin] = offset
+            index_lines.append(f"{asin}\t{offset}\n")
+            offset += len(line)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write("".join(index_lines))
+            f.flush()
+            os.fsync(f.fileno())
+        return len(added), skipped
+
+    def append(self, products: list, replace: bool = False, compare_fields: tuple = None):
+        """
+        Añade productos al final del fichero.
+
+        Args:
+            products: Productos a guardar (los que no tienen ASIN se descartan)
+            replace: Si es True, los ASIN ya guardados se añaden como versión nueva
+                (salvo que sean idénticos a la guardada); si es False (por defecto)
+                se omiten como duplicados, salvo que la versión guardada no tuviera
+                detalles (details_missing) y la nueva sí
+            compare_fields: Campos que se comparan para decidir si un reemplazo es idéntico
+                (None: todos salvo RUN_FIELDS, como la posición en la búsqueda)
+
+        Returns:
+            (añadidos, omitidos)
+        """
+        with self._locked():
+            self._import_legacy()
+            self._ensure_newline()
+            index = self.load_index(repair=True)
+            return self._append_unlocked(products, replace, index, compare_fields)
+
+    def count(self) -> int:
+        """Número de productos distintos (sin leer el .jsonl completo)"""
+        return len(self.load_index())
+
+    def read(self) -> list:
+        """Productos guardados: la versión más reciente de cada ASIN, en orden de primera aparición"""
+        products = {}
+        for _, product in self._scan():
+            asin = product.get("asin")
+            if _valid_asin(asin):
+                products[asin] = product
+        return list(products.values())
+
+    def compact(self):
+        """
+        Reescribe el .jsonl con una línea por ASIN (versión más reciente),
+        sin líneas corruptas, y regenera el índice.
+
+        Returns:
+            (líneas antes, líneas después)
+        """
+        with self._locked():
+            self._import_legacy()
+            if not self.path.exists():
+                return 0, 0
+            with open(self.path, "rb") as f:
+                lines_before = sum(1 for _ in f)
+            products = self.read()
+
+            tmp_path = Path(str(self.path) + ".tmp")
+            tmp_index = Path(str(self.index_path) + ".tmp")
+            offset = 0
+            with open(tmp_path, "wb") as data_file, open(tmp_index, "w", encoding="utf-8") as index_file:
+                for product in products:
+                    line = json.dumps(product, ensure_ascii=False).encode("utf-8") + b"\n"
+                    data_file.write(line)
+                    index_file.write(f"{product['asin']}\t{offset}\n")
+                    offset += len(line)
+                data_file.flush()
+                os.fsync(data_file.fileno())
+                index_file.flush()
+                os.fsync(index_file.fileno())
+            os.replace(tmp_path, self.path)
+            os.replace(tmp_index, self.index_path)
+            return lines_before, len(products)
+
+
+def read_products(path) -> list:
+    """Lee un fichero de extracción en cualquiera de los dos formatos (.jsonl o .json)"""
+    path = Path(path)
+    if path.suffix == STORE_SUFFIX:
+        return ExtractionStore(path).read()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def count_products(path) -> int:
+    """Número de productos de un fichero de extracción (.jsonl usa el índice)"""
+    path = Path(path)
+    if path.suffix == STORE_SUFFIX:
+        return ExtractionStore(path).count()
+    return len(read_products(path))
+
+
+def list_extraction_files(directory) -> list:
+    """
+    Ficheros de extracción de un directorio: los .jsonl y los .json antiguos que
+    aún no tienen .jsonl equivalente (sin las listas de fallidos .deadletter.json ni las estadísticas
+    de red .network.json).
+    """
+    directory = Path(directory)
+    jsonl_files = sorted(directory.glob(f"*{STORE_SUFFIX}"))
+    stems = {path.stem for path in jsonl_files}
+    legacy_files = [path for path in sorted(directory.glob("*.json"))
+                    if path.stem not in stems
+                    and not path.name.endswith((DEAD_LETTER_SUFFIX, NETWORK_STATS_SUFFIX))]
+    return jsonl_files + legacy_files
+
+
+def find_extraction_file(path):
+    """Dada una ruta sin extensión (o con ella), devuelve el .jsonl o .json existente, o None"""
+    path = Path(path)
+    base = path.with_suffix("") if path.suffix in (STORE_SUFFIX, ".json") else path
+    for candidate in (Path(str(base) + STORE_SUFFIX), Path(str(base) + ".json")):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def compact_all(paths: list = None):
+    """Compacta los ficheros indicados o todos los de data/extractions/<plataforma>/"""
+    if not paths:
+        paths = []
+        base_path = Path(EXTRACTIONS_DIR)
+        if base_path.exists():
+            for platform_dir in sorted(base_path.iterdir()):
+                if platform_dir.is_dir():
+                    paths.extend(list_extraction_files(platform_dir))
+
+    for path in paths:
+        path = Path(path)
+        if path.suffix == ".json":
+            try:
+                products = read_products(path)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️  {path.name}: no se pudo leer ({e})", flush=True)
+                continue
+            if not products or not any(_valid_asin(p.get("asin")) for p in products if isinstance(p, dict)):
+                print(f"⏭️  {path.name}: sin ASIN, se deja en formato .json", flush=True)
+                continue
+        before, after = ExtractionStore(path).compact()
+        print(f"🗜️  {path.stem}: {before} líneas → {after} productos", flush=True)
+
+
+def main():
+    """Uso: python extraction_store.py compact [fichero ...]"""
+    if len(sys.argv) < 2 or sys.argv[1] != "compact":
+        print("📝 Uso: python extraction_store.py compact [fichero.jsonl ...]")
+        sys.exit(1)
+    compact_all(sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Ámbito de ElementHandles para la extracción consulta a consulta
+
+extract_product_basic_info crea una treintena de ElementHandle por tarjeta
+(un query_selector por campo). Cada handle mantiene vivo su nodo en Chromium
+hasta que se libera o la página navega. HandleScope envuelve la tarjeta,
+registra todos los handles que se crean a partir de ella y los libera en
+cuanto termina su extracción.
+"""
+import asyncio
+
+
+class HandleScope:
+    """Registra los handles creados a partir de un ElementHandle para liberarlos juntos"""
+
+    def __init__(self, element, handles: list = None):
+        """
+        Args:
+            element: ElementHandle raíz (la tarjeta)
+            handles: Lista compartida de handles del ámbito (interno, para los hijos)
+        """
+        self._element = element
+        self._handles = handles if handles is not None else [element]
+
+    async def query_selector(self, selector: str):
+        handle = await self._element.query_selector(selector)
+        if handle is None:
+            return None
+        self._handles.append(handle)
+        return HandleScope(handle, self._handles)
+
+    async def query_selector_all(self, selector: str):
+        handles = await self._element.query_selector_all(selector)
+        self._handles.extend(handles)
+        return [HandleScope(handle, self._handles) for handle in handles]
+
+    def __getattr__(self, name):
+        return getattr(self._element, name)
+
+    @property
+    def size(self) -> int:
+        """Handles vivos en el ámbito"""
+        return len(self._handles)
+
+    async def dispose(self):
+        """Libera todos los handles del ámbito (los ya invalidados por una navegación se ignoran)"""
+        handles, self._handles[:] = list(self._handles), []
+        await asyncio.gather(*[handle.dispose() for handle in handles], return_exceptions=True)
@@ -0,0 +1,207 @@
+"""
+Almacén de capturas del HTML de las páginas visitadas (para re-extraer sin red)
+
+En modo captura (--capture) cada página de resultados y de detalle se guarda
+tal como quedó (DOM renderizado sin <script>, o el HTML descargado por el motor
+HTTP). El contenido se comprime con gzip y se guarda una sola vez por hash
+(sha256): las páginas idénticas no ocupan espacio de nuevo. Un índice SQLite
+relaciona cada captura (URL, instante, ejecución, tipo, página, ASIN) con su
+contenido:
+
+    data/captures/<sitio>/index.sqlite
+    data/captures/<sitio>/blobs/<2 primeros caracteres del hash>/<hash>.html.gz
+
+reextract.py vuelve a parsear las páginas guardadas y reconstruye la extracción.
+"""
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CAPTURE_DIR = "data/captures"
+KIND_SEARCH = "search"
+KIND_DETAIL = "detail"
+
+SCRIPT_TAG_RE = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
+ASIN_IN_URL_RE = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]+)")
+
+
+def strip_scripts(html: str) -> str:
+    """Quita los <script> del DOM capturado: al reproducirlo o re-parsearlo no se vuelve a ejecutar nada"""
+    return SCRIPT_TAG_RE.sub("", html)
+
+
+def asin_from_url(url: str):
+    """ASIN de una URL de producto de Amazon (/dp/ASIN o /gp/product/ASIN), o None"""
+    match = ASIN_IN_URL_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def _write_blob(path: Path, html: str) -> tuple:
+    """Comprime y guarda el HTML si no existe ya (se ejecuta en un hilo). Devuelve (bytes, comprimidos, nuevo)"""
+    data = html.encode("utf-8")
+    if path.exists():
+        return len(data), path.stat().st_size, False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    compressed = gzip.compress(data, compresslevel=6)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(compressed)
+    os.replace(tmp_path, path)
+    return len(data), len(compressed), True
+
+
+class CaptureStore:
+    """Capturas de HTML comprimidas y deduplicadas por contenido, indexadas por URL e instante"""
+
+    def __init__(self, site: str = "amazon", search_term: str = None, run_id: str = None,
+                 root: str = DEFAULT_CAPTURE_DIR):
+        """
+        Args:
+            site: Sitio de las páginas ("amazon")
+            search_term: Término de búsqueda al que pertenecen las capturas de esta ejecución
+            run_id: Identificador de la ejecución (el del checkpoint); agrupa las capturas para re-extraerlas
+            root: Directorio raíz de las capturas
+        """
+        self.site = site
+        self.search_term = search_term
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+        self.directory = Path(root) / site
+        self.blobs_dir = self.directory / "blobs"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stats = {"pages": 0, "search": 0, "detail": 0, "duplicates": 0, "bytes": 0, "stored_bytes": 0,
+                      "errors": 0}
+
+        # Varios procesos (shards, términos de batch_scrape) escriben en el mismo índice
+        self.conn = sqlite3.connect(str(self.directory / "index.sqlite"), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS captures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                search_term TEXT,
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL,
+                asin TEXT,
+                page_num INTEGER,
+                captured_at REAL NOT NULL,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS captures_run ON captures (search_term, run_id, kind)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS captures_asin ON captures (asin, captured_at)")
+        self.conn.commit()
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blobs_dir / sha256[:2] / f"{sha256}.html.gz"
+
+    def read_html(self, sha256: str) -> str:
+        """HTML de una captura"""
+        return read_blob(self.blob_path(sha256))
+
+    async def capture_page(self, page, kind: str, page_num: int = None):
+        """Guarda el DOM renderizado de una pestaña de Playwright (sin <script>)"""
+        try:
+            html = await page.content()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"    ⚠️ No se pudo capturar {page.url[:60]}: {e}", flush=True)
+            return
+        await self.capture_html(page.url, kind, strip_scripts(html), page_num)
+
+    async def capture_html(self, url: str, kind: str, html: str, page_num: int = None):
+        """
+        Guarda el HTML de una página.
+
+        Args:
+            url: URL de la página
+            kind: KIND_SEARCH (página de resultados) o KIND_DETAIL (página de producto)
+            html: Contenido de la página
+            page_num: Número de página de resultados (solo KIND_SEARCH)
+        """
+        sha256 = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        try:
+            # Compresión y escritura fuera del bucle de eventos
+            size, stored, new = await asyncio.to_thread(_write_blob, self.blob_path(sha256), html)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"    ⚠️ No se pudo guardar la captura de {url[:60]}: {e}", flush=True)
+            return
+        self.conn.execute(
+            "INSERT INTO captures (run_id, search_term, kind, url, asin, page_num, captured_at, sha256, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, self.search_term, kind, url, asin_from_url(url) if kind == KIND_DETAIL else None,
+             page_num, time.time(), sha256, size)
+        )
+        self.conn.commit()
+        self.stats["pages"] += 1
+        self.stats[kind] = self.stats.get(kind, 0) + 1
+        self.stats["bytes"] += size
+        if new:
+            self.stats["stored_bytes"] += stored
+        else:
+            self.stats["duplicates"] += 1
+
+    def runs(self, search_term: str) -> list:
+        """Ejecuciones con capturas de un término: [(run_id, páginas de resultados, páginas de detalle, inicio)]"""
+        return self.conn.execute(
+            "SELECT run_id, SUM(kind = ?), SUM(kind = ?), MIN(captured_at) FROM captures "
+            "WHERE search_term = ? GROUP BY run_id ORDER BY MIN(captured_at)",
+            (KIND_SEARCH, KIND_DETAIL, search_term)
+        ).fetchall()
+
+    def search_pages(self, search_term: str, run_id: str) -> list:
+        """Páginas de resultados de una ejecución en orden: [(page_num, url, sha256)] (la última captura de cada página)"""
+        rows = self.conn.execute(
+            "SELECT page_num, url, sha256 FROM captures WHERE search_term = ? AND run_id = ? AND kind = ? "
+            "ORDER BY page_num, captured_at",
+            (search_term, run_id, KIND_SEARCH)
+        ).fetchall()
+        latest = {}
+        for page_num, url, sha256 in rows:
+            latest[page_num] = (page_num, url, sha256)
+        return [latest[num] for num in sorted(latest, key=lambda num: num or 0)]
+
+    def latest_details(self, asins: list, run_id: str = None) -> dict:
+        """
+        Última captura de la página de detalle de cada ASIN: {asin: (url, sha256)}.
+        Se prefieren las de la ejecución run_id; si no hay, la más reciente de cualquier ejecución.
+        """
+        found = {}
+        for asin in asins:
+            row = self.conn.execute(
+                "SELECT url, sha256 FROM captures WHERE asin = ? AND kind = ? "
+                "ORDER BY run_id = ? DESC, captured_at DESC LIMIT 1",
+                (asin, KIND_DETAIL, run_id)
+            ).fetchone()
+            if row is not None:
+                found[asin] = row
+        return found
+
+    def summary(self) -> dict:
+        """Páginas capturadas por tipo, duplicadas y tamaño original / guardado"""
+        return dict(self.stats)
+
+    def print_summary(self):
+        """Imprime las estadísticas de captura"""
+        stats = self.stats
+        if not stats["pages"] and not stats["errors"]:
+            return
+        errors = f", {stats['errors']} errores" if stats["errors"] else ""
+        print(f"\n📼 Capturas ({self.run_id}): {stats['pages']} páginas ({stats['search']} de resultados, "
+              f"{stats['detail']} de detalle), {stats['duplicates']} ya guardadas, "
+              f"{stats['bytes'] / 1024 / 1024:.1f} MB → {stats['stored_bytes'] / 1024 / 1024:.1f} MB en disco"
+              f"{errors}", flush=True)
+
+    def close(self):
+        self.conn.close()
+
+
+def read_blob(path) -> str:
+    """Descomprime una captura (función de módulo: la usan los procesos de reextract.py)"""
+    with gzip.open(path, "rb") as f:
+        return f.read().decode("utf-8")
@@ -0,0 +1,291 @@
+"""
+Motor HTTP para páginas de detalle de Amazon (sin navegador)
+
+La información de producto (product overview, viñetas, tablas de especificaciones
+y tabla nutricional) viene en el HTML renderizado por el servidor, así que se
+puede descargar con un cliente HTTP asíncrono con pool de conexiones y parsear
+con un parser HTML rápido. Si la página necesita JavaScript o el parseo sale
+vacío, el llamador debe recurrir a Playwright (extract_detailed_product_info).
+
+Dependencias opcionales: httpx y selectolax (pip install "scrapper-amazon[http]")
+"""
+import re
+import time
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - dependencia opcional
+    httpx = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # pragma: no cover - dependencia opcional
+    HTMLParser = None
+
+from adaptive_concurrency import OUTCOME_BLOCKED, OUTCOME_ERROR, OUTCOME_OK, OUTCOME_TIMEOUT, classify_status
+from html_capture import KIND_DETAIL
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-ES,es;q=0.9",
+}
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_TIMEOUT = 15.0
+
+SPEC_SELECTORS = [
+    "table.a-keyvalue tr",
+    "#productDetails_techSpec_section_1 tr",
+    "#productDetails_detailBullets_sections1 tr",
+    "#productDetails_db_sections tr",
+    "table.prodDetTable tr",
+    "div.a-section.table-padding table tbody tr"
+]
+FEATURE_SELECTORS = [
+    "#feature-bullets ul li span.a-list-item",
+    "#productDescription p",
+    ".a-unordered-list.a-vertical li span"
+]
+
+
+def empty_details() -> dict:
+    """Estructura de detalles vacía (mismo formato que extract_detailed_product_info)"""
+    return {
+        "brand": "N/A",
+        "specifications": [],
+        "product_overview": {},
+        "nutrition_facts": {},
+        "ingredients": "N/A",
+        "description": "N/A",
+        "features": [],
+        "dimensions": "N/A",
+        "weight": "N/A"
+    }
+
+
+def _text(node) -> str:
+    """Texto visible aproximado de un nodo (espacios normalizados como innerText)"""
+    if node is None:
+        return ""
+    return re.sub(r"\s+", " ", node.text(separator=" ")).strip()
+
+
+def is_robot_check_html(tree) -> bool:
+    """True si el HTML es una página de captcha / robot check"""
+    title = _text(tree.css_first("title")).lower()
+    return (tree.css_first("form[action*='validateCaptcha'], #captchacharacters") is not None
+            or "robot check" in title or "captcha" in title)
+
+
+def has_details(details: dict) -> bool:
+    """True si el parseo obtuvo algún dato útil"""
+    return bool(details["product_overview"] or details["specifications"] or details["features"]
+                or details["description"] != "N/A" or details["nutrition_facts"])
+
+
+def parse_detail_html(html: str) -> dict:
+    """
+    Parsea el HTML de una página de producto de Amazon al mismo dict `details`
+    que produce extract_detailed_product_info.
+    """
+    if HTMLParser is None:
+        raise ImportError("selectolax no está instalado: pip install selectolax")
+    return parse_detail_tree(HTMLParser(html))
+
+
+def parse_detail_tree(tree) -> dict:
+    """Como parse_detail_html pero sobre un árbol de selectolax ya parseado"""
+    details = empty_details()
+
+    # PRODUCT OVERVIEW (marca y características principales)
+    for row in tree.css("#productOverview_feature_div table tr, #poExpander table tr"):
+        label = _text(row.css_first("td.a-span3, th"))
+        value = _text(row.css_first("td.a-span9, td:not(.a-span3)"))
+        if label and value:
+            if "brand" in label.lower() or "marca" in label.lower():
+                details["brand"] = value
+            details["product_overview"][label] = value
+
+    # ESPECIFICACIONES TÉCNICAS
+    spec_rows = []
+    for selector in SPEC_SELECTORS:
+        rows = tree.css(selector)
+        if rows:
+            spec_rows.extend(rows)
+            if len(spec_rows) > 15:
+                break
+
+    for row in spec_rows[:15]:
+        label_node = row.css_first("td:nth-child(1), th")
+        value_node = row.css_first("td:nth-child(2)")
+        if label_node is None or value_node is None:
+            label_node = row.css_first("th, td.a-span3")
+            value_node = row.css_first("td:not(.a-span3)")
+        label = _text(label_node)
+        value = _text(value_node)
+        if not (label and value):
+            continue
+        if any(spec["label"] == label for spec in details["specifications"]):
+            continue
+        details["specifications"].append({"label": label, "value": value})
+        label_lower = label.lower()
+        if ("marca" in label_lower or "brand" in label_lower) and details["brand"] == "N/A":
+            details["brand"] = value
+        if "dimensiones" in label_lower or "dimensions" in label_lower:
+            details["dimensions"] = value
+        if "peso" in label_lower or "weight" in label_lower:
+            details["weight"] = value
+
+    # VIÑETAS / CARACTERÍSTICAS
+    for selector in FEATURE_SELECTORS:
+        nodes = tree.css(selector)
+        if nodes:
+            for node in nodes[:10]:
+                text = _text(node)
+                if len(text) > 10:
+                    details["features"].append(text)
+            if details["features"]:
+                break
+
+    # DESCRIPCIÓN
+    description = tree.css_first("#productDescription p")
+    if description is not None:
+        details["description"] = _text(description)
+
+    # INFORMACIÓN NUTRICIONAL (en el HTML aunque el desplegable esté cerrado)
+    energy_row = tree.css_first("#nic-eu-nutrition-facts-energy")
+    if energy_row is not None:
+        energy_label = _text(energy_row.css_first("td:nth-child(1) span"))
+        energy_value = _text(energy_row.css_first("td:nth-child(2) span"))
+        if energy_label and energy_value:
+            details["nutrition_facts"][energy_label] = energy_value
+
+    for row in tree.css("#nic-eu-nutrition-facts-nutrients tbody tr"):
+        label_spans = row.css("td:nth-child(1) span")
+        value_node = row.css_first("td:nth-child(2) span")
+        if label_spans and value_node is not None:
+            label = _text(label_spans[-1])
+            value = _text(value_node)
+            if label and value and label not in ["—", "-"]:
+                details["nutrition_facts"][label] = value
+
+    ingredients = tree.css_first("#ingredients_feature_div .a-section, #important-information .content")
+    if ingredients is not None and _text(ingredients):
+        details["ingredients"] = _text(ingredients)
+
+    return details
+
+
+class HttpDetailEngine:
+    """
+    Descarga páginas de detalle por HTTP con un pool de conexiones y las parsea
+    sin navegador. fetch_details devuelve None cuando hay que usar Playwright.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT,
+                 headers: dict = None, capture=None, network=None):
+        """
+        Args:
+            max_connections: Conexiones HTTP simultáneas máximas del pool
+            timeout: Timeout por petición (segundos)
+            headers: Cabeceras adicionales
+            capture: CaptureStore opcional donde se guarda el HTML de las páginas resueltas por HTTP
+            network: NetworkRecorder opcional donde se anota cada descarga (como las peticiones del navegador)
+        """
+        if httpx is None or HTMLParser is None:
+            raise ImportError('El motor HTTP necesita httpx y selectolax: pip install "scrapper-amazon[http]"')
+
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.capture = capture
+        self.network = network
+        self.client = None
+        self.stats = {"http_ok": 0, "fallbacks": 0, "errors": 0, "fetch_seconds": 0.0, "parse_seconds": 0.0}
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+        self.client = None
+
+    async def fetch_details(self, product_url: str, outcome: dict = None):
+        """
+        Descarga y parsea una página de detalle.
+
+        Args:
+            product_url: URL del producto
+            outcome: Dict opcional que se rellena con "kind" y "status" (como en
+                extract_detailed_product_info)
+
+        Returns:
+            dict de detalles, o None si la página requiere navegador (JS, captcha,
+            error HTTP o parseo vacío)
+        """
+        if outcome is None:
+            outcome = {}
+        outcome["engine"] = "http"
+
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(product_url)
+        except httpx.TimeoutException as e:
+            outcome.update(kind=OUTCOME_TIMEOUT, error=str(e))
+            self.stats["errors"] += 1
+            self._record(product_url, None, 0, start)
+            return None
+        except httpx.HTTPError as e:
+            outcome.update(kind=OUTCOME_ERROR, error=str(e))
+            self.stats["errors"] += 1
+            self._record(product_url, None, 0, start)
+            return None
+        finally:
+            self.stats["fetch_seconds"] += time.perf_counter() - start
+        self._record(product_url, response.status_code, response.num_bytes_downloaded, start)
+
+        outcome["status"] = response.status_code
+        outcome["kind"] = classify_status(response.status_code)
+        if outcome["kind"] != OUTCOME_OK:
+            self.stats["fallbacks"] += 1
+            return None
+
+        start = time.perf_counter()
+        tree = HTMLParser(response.text)
+        if is_robot_check_html(tree):
+            outcome["kind"] = OUTCOME_BLOCKED
+            self.stats["fallbacks"] += 1
+            return None
+        details = parse_detail_tree(tree)
+        self.stats["parse_seconds"] += time.perf_counter() - start
+
+        if not has_details(details):
+            # Probablemente contenido generado con JavaScript: usar el navegador
+            self.stats["fallbacks"] += 1
+            outcome["engine"] = "http->browser"
+            return None
+
+        self.stats["http_ok"] += 1
+        if self.capture is not None:
+            await self.capture.capture_html(product_url, KIND_DETAIL, response.text)
+        return details
+
+    def _record(self, url: str, status, size: int, start: float):
+        """Anota la descarga en el NetworkRecorder (página de detalle, recurso "document", bytes comprimidos)"""
+        if self.network is not None:
+            self.network.record(url, KIND_DETAIL, "document", status, size, (time.perf_counter() - start) * 1000,
+                                failed=status is None)
+
+    def print_summary(self):
+        """Imprime cuántas páginas se resolvieron por HTTP y cuántas necesitaron navegador"""
+        stats = self.stats
+        print(f"\n⚡ Motor HTTP: {stats['http_ok']} páginas por HTTP, {stats['fallbacks']} con respaldo "
+              f"de navegador, {stats['errors']} errores (descarga {stats['fetch_seconds']:.1f}s, "
+              f"parseo {stats['parse_seconds']:.2f}s)", flush=True)
@@ -9,6 +9,8 @@ from pathlib import Path
 from typing import Any, Dict, List, Set
 import re
 
+from extraction_store import list_extraction_files, read_products
+
 DB_CONFIG = {
     'host': 'localhost',
     'port': 5434,
@@ -146,12 +148,11 @@ def insert_data(cursor, table_name: str, data: List[Dict], columns: Dict[str, st
     return inserted, skipped
 
 def load_json_file(json_path: Path):
-    """Carga un archivo JSON y crea su tabla correspondiente"""
+    """Carga un archivo JSON o JSON Lines y crea su tabla correspondiente"""
     print(f"\n📂 Procesando: {json_path.name}", flush=True)
     
-    # Leer archivo JSON
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # Leer archivo (.json completo o .jsonl del almacén de extracciones)
+    data = read_products(json_path)
     
     if not data:
         print(f"⚠️  Archivo vacío, saltando...", flush=True)
@@ -204,7 +205,7 @@ def main():
     json_files = []
     for platform_dir in base_path.iterdir():
         if platform_dir.is_dir():
-            platform_files = list(platform_dir.glob("*.json"))
+            platform_files = list_extraction_files(platform_dir)
             json_files.extend(platform_files)
             print(f"📁 Plataforma: {platform_dir.name} - {len(platform_files)} archivos", flush=True)
     
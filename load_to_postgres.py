@@ -1,13 +1,14 @@
 """
 Script para cargar datos de JSON a PostgreSQL
 """
-import json
 import psycopg2
 from psycopg2.extras import execute_values
 from pathlib import Path
 from datetime import datetime
 import re
 
+from extraction_store import list_extraction_files, read_products
+
 
 class AmazonDataLoader:
     """Carga datos de productos de Amazon a PostgreSQL"""
@@ -191,11 +192,10 @@ class AmazonDataLoader:
             )
     
     def load_json_file(self, json_path):
-        """Cargar un archivo JSON completo"""
+        """Cargar un archivo JSON o JSON Lines completo"""
         print(f"\n📄 Cargando: {json_path.name}")
         
-        with open(json_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
+        products = read_products(json_path)
         
         loaded_count = 0
         error_count = 0
@@ -248,7 +248,7 @@ class AmazonDataLoader:
     def load_all_json_files(self, directory='data/extractions/amazon'):
         """Cargar todos los archivos JSON de un directorio"""
         data_dir = Path(directory)
-        json_files = list(data_dir.glob('*.json'))
+        json_files = list_extraction_files(data_dir)
         
         if not json_files:
             print(f"❌ No se encontraron archivos JSON en {directory}")
@@ -1,215 +1,695 @@
-import json
 import asyncio
+import math
+import os
 import sys
-from playwright.async_api import async_playwright
+import time
+from contextlib import AsyncExitStack
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from adaptive_concurrency import (
+    OUTCOME_BLOCKED, OUTCOME_ERROR, OUTCOME_OK, OUTCOME_TIMEOUT, AdaptiveLimiter, classify_status
+)
+from browser_pool import BrowserPool
+from browser_profile import BrowserProfile
+from checkpoint import RunCheckpoint
+from cli_options import (
+    get_block_profile, get_browser_profile, get_cli_option, get_deadline, get_memory_limits, get_priority
+)
+from delta_refresh import CONTENT_FIELDS, PreviousExtraction
+from detail_cache import DetailCache
+from extraction_store import ExtractionStore
+from handle_scope import HandleScope
+from html_capture import KIND_DETAIL, KIND_SEARCH, CaptureStore
+from http_detail_fetcher import HttpDetailEngine, empty_details, has_details
+from memory_guard import DEFAULT_CONTEXT_PAGES, DEFAULT_MAX_BROWSER_MB, RecyclingPagePool
+from network_accounting import NetworkRecorder
+from page_pool import PagePool
+from resource_blocker import ResourceBlocker
+from retry_queue import DEFAULT_MAX_ATTEMPTS, RetryQueue
+from scrape_budget import (
+    MISSING_DEADLINE, MISSING_FAILED, PRIORITY_POSITION, BudgetExhausted, ScrapeBudget, order_by_priority, priority_key
+)
+from search_card_selectors import (
+    AMAZON_BASE_URL, CARD_SELECTORS, FREE_SHIPPING_QUERY, FREE_SHIPPING_TEXT, MAX_BRAND_LENGTH, MAX_OPTIONS,
+    SEARCH_RESULT_SELECTOR, SPEC_BRAND_KEYS, absolute_url, is_brand_candidate, is_brand_key
+)
+from sharded_details import print_shard_summary, run_sharded_details
+from throughput_governor import AMAZON_DOMAIN, DEFAULT_MAX_RATE, DomainGovernor
+from wait_strategy import AMAZON, WaitEngine
 
 DEFAULT_ITERATIONS = 50
+DEFAULT_PAGE_CONCURRENCY = 4  # Pestañas de resultados simultáneas en modo --parallel-pages
+ESTIMATED_RESULTS_PER_PAGE = 48  # Estimación hasta conocer cuántas tarjetas trae la primera página
+MAX_INFLIGHT_CARDS = 10  # Tarjetas (con sus handles) extrayéndose a la vez en el modo clásico
+MAX_BLOCKED_RELOADS = 2  # Recargas de una página de resultados bloqueada (tras la pausa del gobernador)
+SEARCH_PAGE_ATTEMPTS = 3  # Intentos de cada página de resultados en modo --parallel-pages
+SEARCH_PAGE_RETRY_DELAY = 2.0  # Segundos antes del primer reintento de una página de resultados (se duplica)
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Script que se ejecuta dentro de la página de resultados y replica la lógica de
+# extract_product_basic_info para TODAS las tarjetas en un único viaje a Chromium.
+# Los selectores llegan como argumento (CARD_SELECTORS de search_card_selectors.py).
+# Devuelve una lista con un dict por tarjeta (o null si la tarjeta no tiene título).
+EXTRACT_SEARCH_RESULTS_JS = """
+({selector, selectors: S, rules, searchTerm, startPosition, limit}) => {
+    const text = (el) => (el ? (el.innerText || "") : null);
+    const strip = (value, fallback) => (value ? value.trim() : fallback);
+    const q = (root, sel) => root.querySelector(sel);
+
+    const extractCard = (element, position) => {
+        const asin = element.getAttribute("data-asin");
+
+        // Título - intentar múltiples selectores
+        let title = "N/A";
+        for (const sel of S.title) {
+            const titleElem = q(element, sel);
+            if (titleElem) {
+                title = text(titleElem);
+                if (title && title.trim()) break;
+            }
+        }
+
+        // URL del producto
+        let productUrl = "N/A";
+        let linkElem = null;
+        for (const sel of S.link) {
+            linkElem = q(element, sel);
+            if (linkElem) break;
+        }
+        if (linkElem) {
+            productUrl = linkElem.getAttribute("href");
+            if (productUrl && !productUrl.startsWith("http")) {
+                productUrl = rules.baseUrl + productUrl;
+            }
+        }
+
+        // Precio - capturar precio completo (euros + céntimos)
+        let price = "N/A";
+        const priceElem = q(element, S.price);
+        if (priceElem) {
+            price = text(priceElem).trim();
+        } else {
+            let priceWhole = "";
+            let priceFraction = "";
+            const wholeElem = q(element, S.price_whole);
+            if (wholeElem) {
+                priceWhole = text(wholeElem).replace(/\\n/g, "").replace(/,/g, ".").trim();
+            }
+            const fractionElem = q(element, S.price_fraction);
+            if (fractionElem) {
+                priceFraction = text(fractionElem).trim();
+            }
+            if (priceWhole) {
+                priceWhole = priceWhole.replace(/[.,]+$/, "");
+                price = priceFraction ? `${priceWhole},${priceFraction}€` : `${priceWhole}€`;
+            }
+        }
+
+        // Rating
+        const ratingElem = q(element, S.rating);
+        const rating = ratingElem ? text(ratingElem) : "N/A";
+
+        // Número de reseñas
+        let reviewsCount = "0";
+        for (const sel of S.reviews_count) {
+            const reviewsElem = q(element, sel);
+            if (reviewsElem) {
+                const reviewsText = text(reviewsElem);
+                if (reviewsText && /[0-9]/.test(reviewsText)) {
+                    reviewsCount = reviewsText;
+                    break;
+                }
+            }
+        }
+
+        // Imagen
+        const imgElem = q(element, S.image);
+        const imageUrl = imgElem ? imgElem.getAttribute("src") : "N/A";
+
+        // Marca
+        let brand = "N/A";
+        const additionalSpecs = {};
+        const detailsContainer = q(element, S.specs_container);
+        if (detailsContainer) {
+            for (const row of detailsContainer.querySelectorAll(S.specs_row)) {
+                const rowText = text(row);
+                if (rowText && rowText.includes(":")) {
+                    const idx = rowText.indexOf(":");
+                    const key = rowText.slice(0, idx).trim();
+                    const value = rowText.slice(idx + 1).trim();
+                    const keyLower = key.toLowerCase();
+                    if (rules.brandKeys.some((brandKey) => keyLower.includes(brandKey))) {
+                        brand = value;
+                    } else {
+                        additionalSpecs[key] = value;
+                    }
+                }
+            }
+        }
+
+        // Misma regla que is_brand_candidate
+        if (brand === "N/A") {
+            for (const sel of S.brand) {
+                const brandElem = q(element, sel);
+                if (brandElem) {
+                    const brandText = text(brandElem);
+                    if (brandText && brandText.trim()) {
+                        const brandClean = brandText.trim();
+                        if (brandClean.length < rules.maxBrandLength &&
+                            !/^[0-9]+$/.test(brandClean.replace(/[.,]/g, "")) &&
+                            !brandClean.includes("€") &&
+                            !brandClean.toLowerCase().includes("valoraciones")) {
+                            brand = brandClean;
+                            break;
+                        }
+                    }
+                }
+            }
+        }
+
+        // Prime
+        const hasPrime = !!q(element, S.prime);
+
+        // Envío gratis (equivalente a span:has-text('Envío GRATIS') de Playwright)
+        const freeShipping = !!q(element, S.free_shipping) ||
+            Array.from(element.querySelectorAll("span")).some(
+                (span) => (span.textContent || "").toLowerCase().includes(rules.freeShippingText)
+            );
+
+        // Disponibilidad
+        const availabilityElem = q(element, S.availability);
+        const availability = availabilityElem ? text(availabilityElem) : "N/A";
+
+        // Descuento/Cupón
+        const discountElem = q(element, S.discount);
+        const discount = discountElem ? text(discountElem) : "N/A";
+
+        // Precio anterior (tachado)
+        const originalPriceElem = q(element, S.original_price);
+        const originalPrice = originalPriceElem ? text(originalPriceElem) : "N/A";
+
+        // Vendedor/Seller
+        let seller = "N/A";
+        const sellerElem = q(element, S.seller);
+        if (sellerElem) {
+            const sellerText = text(sellerElem);
+            if (sellerText && sellerText.toLowerCase().includes("de ")) seller = sellerText;
+        }
+
+        // Opciones de color/tamaño disponibles
+        const options = [];
+        for (const optElem of Array.from(element.querySelectorAll(S.options)).slice(0, rules.maxOptions)) {
+            const optText = text(optElem);
+            if (optText && optText.trim()) options.push(optText.trim());
+        }
+
+        if (title === "N/A") return null;
+
+        return {
+            asin: asin || "N/A",
+            title: strip(title, "N/A"),
+            brand: strip(brand, "N/A"),
+            price: strip(price, "N/A"),
+            original_price: strip(originalPrice, "N/A"),
+            discount: strip(discount, "N/A"),
+            rating: strip(rating, "N/A"),
+            reviews_count: strip(reviewsCount, "0"),
+            has_prime: hasPrime,
+            free_shipping: freeShipping,
+            availability: strip(availability, "N/A"),
+            seller: strip(seller, "N/A"),
+            options: options,
+            additional_specs: additionalSpecs,
+            url: productUrl,
+            image_url: imageUrl,
+            search_term: searchTerm,
+            position: position
+        };
+    };
+
+    const cards = Array.from(document.querySelectorAll(selector)).slice(0, limit);
+    return cards.map((element, idx) => {
+        const position = startPosition + idx;
+        try {
+            return {product: extractCard(element, position)};
+        } catch (e) {
+            return {product: null, error: `Error extrayendo producto ${position}: ${e}`};
+        }
+    });
+}
+"""
+
+# Reglas de EXTRACT_SEARCH_RESULTS_JS que no son selectores
+CARD_RULES = {"baseUrl": AMAZON_BASE_URL, "brandKeys": list(SPEC_BRAND_KEYS), "maxBrandLength": MAX_BRAND_LENGTH,
+              "freeShippingText": FREE_SHIPPING_TEXT, "maxOptions": MAX_OPTIONS}
+
+ROBOT_CHECK_JS = """
+() => {
+    const title = (document.title || "").toLowerCase();
+    return !!document.querySelector("form[action*='validateCaptcha'], #captchacharacters") ||
+        title.includes("robot check") || title.includes("captcha");
+}
+"""
+
+
+# Selector del desplegable de información nutricional de la página de detalle
+NUTRITION_EXPANDER_SELECTOR = "#nutritionalInfoAndIngredients_feature_div .a-expander-header, a.a-expander-header"
+
+# Script que replica extract_details_by_queries dentro de la página de producto y
+# devuelve el dict de detalles completo en un único viaje a Chromium. "nutrition"
+# indica si la información nutricional se leyó ("extracted"), no existe ("none") o
+# está plegada ("collapsed": hay que desplegarla y volver a llamar con nutritionOnly).
+EXTRACT_DETAILS_JS = """
+({expanderSelector, nutritionOnly}) => {
+    const text = (el) => (el ? (el.innerText || "") : "");
+    const mentions = (label, words) => words.some((word) => label.toLowerCase().includes(word));
+    const details = {
+        brand: "N/A",
+        specifications: [],
+        product_overview: {},
+        nutrition_facts: {},
+        ingredients: "N/A",
+        description: "N/A",
+        features: [],
+        dimensions: "N/A",
+        weight: "N/A"
+    };
+
+    const extractNutrition = () => {
+        // Energía (fila especial)
+        const energyRow = document.querySelector("#nic-eu-nutrition-facts-energy");
+        if (energyRow) {
+            const label = text(energyRow.querySelector("td:nth-child(1) span"));
+            const value = text(energyRow.querySelector("td:nth-child(2) span"));
+            if (label && value) details.nutrition_facts[label.trim()] = value.trim();
+        }
+        // Resto de nutrientes: el último span de la primera celda tiene el nombre
+        for (const row of document.querySelectorAll("#nic-eu-nutrition-facts-nutrients tbody tr")) {
+            try {
+                const labelSpans = row.querySelectorAll("td:nth-child(1) span");
+                const valueElem = row.querySelector("td:nth-child(2) span");
+                if (!labelSpans.length || !valueElem) continue;
+                const label = text(labelSpans[labelSpans.length - 1]).trim();
+                const value = text(valueElem).trim();
+                if (label && value && label !== "—" && label !== "-") details.nutrition_facts[label] = value;
+            } catch (e) {}
+        }
+        const ingredients = text(document.querySelector(
+            "#ingredients_feature_div .a-section, #important-information .content")).trim();
+        if (ingredients) details.ingredients = ingredients;
+    };
+
+    if (nutritionOnly) {
+        extractNutrition();
+        return {details, nutrition: "extracted"};
+    }
+
+    // Product overview (marca y características principales)
+    for (const row of document.querySelectorAll("#productOverview_feature_div table tr, #poExpander table tr")) {
+        try {
+            const label = text(row.querySelector("td.a-span3, th"));
+            const value = text(row.querySelector("td.a-span9, td:not(.a-span3)"));
+            if (!label || !value) continue;
+            const labelClean = label.trim();
+            const valueClean = value.trim();
+            if (mentions(labelClean, ["brand", "marca"])) details.brand = valueClean;
+            details.product_overview[labelClean] = valueClean;
+        } catch (e) {}
+    }
 
-async def extract_detailed_product_info(context, product_url: str):
+    // Especificaciones técnicas: filas de las tablas conocidas, como máximo 15
+    const specSelectors = [
+        "table.a-keyvalue tr",
+        "#productDetails_techSpec_section_1 tr",
+        "#productDetails_detailBullets_sections1 tr",
+        "#productDetails_db_sections tr",
+        "table.prodDetTable tr",
+        "div.a-section.table-padding table tbody tr"
+    ];
+    let specRows = [];
+    for (const selector of specSelectors) {
+        const rows = Array.from(document.querySelectorAll(selector));
+        if (rows.length) {
+            specRows = specRows.concat(rows);
+            if (specRows.length > 15) break;
+        }
+    }
+    for (const row of specRows.slice(0, 15)) {
+        try {
+            let labelElem = row.querySelector("td:nth-child(1), th");
+            let valueElem = row.querySelector("td:nth-child(2)");
+            if (!labelElem || !valueElem) {
+                labelElem = row.querySelector("th, td.a-span3");
+                valueElem = row.querySelector("td:not(.a-span3)");
+            }
+            const label = text(labelElem);
+            const value = text(valueElem);
+            if (!label || !value) continue;
+            const labelClean = label.trim();
+            const valueClean = value.trim();
+            if (details.specifications.some((spec) => spec.label === labelClean)) continue;
+            details.specifications.push({label: labelClean, value: valueClean});
+            if (mentions(labelClean, ["marca", "brand"]) && details.brand === "N/A") details.brand = valueClean;
+            if (mentions(labelClean, ["dimensiones", "dimensions"])) details.dimensions = valueClean;
+            if (mentions(labelClean, ["peso", "weight"])) details.weight = valueClean;
+        } catch (e) {}
+    }
+
+    // Puntos de la descripción: primer selector con resultados, primeros 10 elementos
+    const featureSelectors = [
+        "#feature-bullets ul li span.a-list-item",
+        "#productDescription p",
+        ".a-unordered-list.a-vertical li span"
+    ];
+    for (const selector of featureSelectors) {
+        const elems = Array.from(document.querySelectorAll(selector)).slice(0, 10);
+        if (!elems.length) continue;
+        for (const elem of elems) {
+            const value = text(elem).trim();
+            if (value.length > 10) details.features.push(value);
+        }
+        if (details.features.length) break;
+    }
+
+    const descElem = document.querySelector("#productDescription p");
+    if (descElem) details.description = text(descElem);
+
+    // Información nutricional: solo si existe el desplegable
+    let nutrition = "none";
+    if (document.querySelector(expanderSelector)) {
+        if (document.querySelector(".a-expander-content-expanded")) {
+            extractNutrition();
+            nutrition = "extracted";
+        } else {
+            nutrition = "collapsed";
+        }
+    }
+    return {details, nutrition};
+}
+"""
+
+
+async def extract_detailed_product_info(context, product_url: str, outcome: dict = None, waits: WaitEngine = None,
+                                        page_pool: PagePool = None, fast_extract: bool = True,
+                                        capture: CaptureStore = None):
     """
     Extrae información detallada visitando la página del producto en una nueva pestaña.
     
     Args:
         context: Contexto del browser de Playwright
         product_url: URL del producto
+        outcome: Dict opcional que se rellena con el resultado de la visita:
+            "kind" (ok/timeout/blocked/http_error/error), "status" (código HTTP) y
+            "extract_seconds" (tiempo de extracción, sin contar la navegación)
+        waits: WaitEngine donde se registran las esperas (opcional)
+        page_pool: PagePool opcional del que tomar una pestaña reutilizable en lugar de abrir una nueva
+        fast_extract: Si es True, extrae todos los campos con un único page.evaluate
+            (extract_details_from_page); si es False, consulta a consulta (extract_details_by_queries)
+        capture: CaptureStore opcional donde se guarda el HTML de la página tras extraerla
     
     Returns:
         dict con información detallada
     """
-    details = {
-        "brand": "N/A",
-        "specifications": [],
-        "product_overview": {},
-        "nutrition_facts": {},
-        "ingredients": "N/A",
-        "description": "N/A",
-        "features": [],
-        "dimensions": "N/A",
-        "weight": "N/A"
-    }
+    if outcome is None:
+        outcome = {}
+    if waits is None:
+        waits = WaitEngine(AMAZON)
+    outcome["kind"] = OUTCOME_OK
+    
+    details = empty_details()
     
-    # Abrir en nueva página para no perder el contexto de la lista
-    detail_page = await context.new_page()
+    # Abrir en otra pestaña (del pool si lo hay) para no perder el contexto de la lista
+    detail_page = await page_pool.acquire() if page_pool is not None else await context.new_page()
     
     try:
-        await detail_page.goto(product_url, timeout=15000, wait_until="domcontentloaded")
+        response = await detail_page.goto(product_url, timeout=15000, wait_until="domcontentloaded")
+        if response is not None:
+            outcome["status"] = response.status
+            outcome["kind"] = classify_status(response.status)
         
-        # EXTRAER PRODUCT OVERVIEW (aquí está la marca y características principales)
-        overview_rows = await detail_page.query_selector_all("#productOverview_feature_div table tr, #poExpander table tr")
-        for row in overview_rows:
-            try:
-                # Buscar label y valor
-                label_elem = await row.query_selector("td.a-span3, th")
-                value_elem = await row.query_selector("td.a-span9, td:not(.a-span3)")
-                
-                if label_elem and value_elem:
-                    label = await label_elem.inner_text()
-                    value = await value_elem.inner_text()
-                    
-                    if label and value:
-                        label_clean = label.strip()
-                        value_clean = value.strip()
-                        
-                        # Si es la marca
-                        if "brand" in label_clean.lower() or "marca" in label_clean.lower():
-                            details["brand"] = value_clean
-                        
-                        # Guardar en product_overview
-                        details["product_overview"][label_clean] = value_clean
-            except:
-                continue
-        
-        # Características/Especificaciones técnicas (tabla más detallada)
-        # Selectores CSS que cubren diferentes formatos de tablas de Amazon
-        spec_selectors = [
-            "table.a-keyvalue tr",
-            "#productDetails_techSpec_section_1 tr",
-            "#productDetails_detailBullets_sections1 tr",
-            "#productDetails_db_sections tr",  # Tabla de detalles alternativa
-            "table.prodDetTable tr",  # Tabla de detalles de producto
-            "div.a-section.table-padding table tbody tr"  # Tabla genérica en sección
-        ]
-        
-        spec_rows = []
-        for selector in spec_selectors:
-            rows = await detail_page.query_selector_all(selector)
-            if rows:
-                spec_rows.extend(rows)
-                if len(spec_rows) > 15:  # Si ya tenemos suficientes, no seguir buscando
-                    break
+        # Página de captcha: no hay nada que extraer y conviene frenar
+        if await detail_page.evaluate(ROBOT_CHECK_JS):
+            outcome["kind"] = OUTCOME_BLOCKED
+            print(f"    🤖 Página de verificación (robot check) en: {product_url[:60]}", flush=True)
+            return details
         
-        for row in spec_rows[:15]:  # Limitar a 15 especificaciones
-            try:
-                # Intentar extraer usando td[1] y td[2] (key-value en celdas separadas)
-                label_elem = await row.query_selector("td:nth-child(1), th")
-                value_elem = await row.query_selector("td:nth-child(2)")
-                
-                # Si no funciona, intentar con clases específicas de Amazon
-                if not label_elem or not value_elem:
-                    label_elem = await row.query_selector("th, td.a-span3")
-                    value_elem = await row.query_selector("td:not(.a-span3)")
-                
-                if label_elem and value_elem:
-                    label = await label_elem.inner_text()
-                    value = await value_elem.inner_text()
-                    if label and value:
-                        label_clean = label.strip()
-                        value_clean = value.strip()
-                        
-                        # Evitar duplicados
-                        if not any(spec["label"] == label_clean for spec in details["specifications"]):
-                            details["specifications"].append({
-                                "label": label_clean,
-                                "value": value_clean
-                            })
-                            
-                            # Extraer marca si aparece aquí
-                            if "marca" in label_clean.lower() or "brand" in label_clean.lower():
-                                if details["brand"] == "N/A":
-                                    details["brand"] = value_clean
-                            
-                            # Buscar dimensiones y peso específicamente
-                            if "dimensiones" in label_clean.lower() or "dimensions" in label_clean.lower():
-                                details["dimensions"] = value_clean
-                            if "peso" in label_clean.lower() or "weight" in label_clean.lower():
-                                details["weight"] = value_clean
-            except:
-                continue
-        
-        # Descripción del producto
-        desc_selectors = [
-            "#feature-bullets ul li span.a-list-item",
-            "#productDescription p",
-            ".a-unordered-list.a-vertical li span"
-        ]
-        for selector in desc_selectors:
-            desc_elems = await detail_page.query_selector_all(selector)
-            if desc_elems:
-                for elem in desc_elems[:10]:  # Primeros 10 puntos
-                    try:
-                        text = await elem.inner_text()
-                        if text and text.strip() and len(text.strip()) > 10:
-                            details["features"].append(text.strip())
-                    except:
-                        continue
-                if details["features"]:
-                    break
-        
-        # Descripción completa
-        desc_elem = await detail_page.query_selector("#productDescription p")
-        if desc_elem:
-            details["description"] = await desc_elem.inner_text()
+        start = time.perf_counter()
+        if fast_extract:
+            details = await extract_details_from_page(detail_page, waits)
+        else:
+            await extract_details_by_queries(detail_page, details, waits)
+        outcome["extract_seconds"] = time.perf_counter() - start
+        if capture is not None and outcome["kind"] == OUTCOME_OK:
+            await capture.capture_page(detail_page, KIND_DETAIL)
         
-        # EXTRAER INFORMACIÓN NUTRICIONAL (para productos alimenticios)
+    except Exception as e:
+        outcome["kind"] = OUTCOME_TIMEOUT if isinstance(e, PlaywrightTimeoutError) else OUTCOME_ERROR
+        outcome["error"] = str(e)
+        print(f"    ⚠️ Error extrayendo detalles: {e}")
+    finally:
+        # Devolver la pestaña al pool (se recicla si la visita no fue correcta) o cerrarla
+        if page_pool is not None:
+            await page_pool.release(detail_page, failed=outcome["kind"] != OUTCOME_OK)
+        else:
+            await detail_page.close()
+    
+    return details
+
+
+async def extract_details_from_page(detail_page, waits: WaitEngine) -> dict:
+    """
+    Extrae los detalles de la página de producto cargada con un único page.evaluate
+    (EXTRACT_DETAILS_JS) en lugar de una consulta por fila y campo.
+    
+    Si la información nutricional está plegada, se despliega con un clic y se lee
+    con un segundo evaluate: en el peor caso son tres viajes a Chromium por
+    producto, independientemente del número de filas de las tablas.
+    
+    Returns:
+        dict con el mismo formato que extract_details_by_queries
+    """
+    result = await detail_page.evaluate(EXTRACT_DETAILS_JS, {"expanderSelector": NUTRITION_EXPANDER_SELECTOR,
+                                                             "nutritionOnly": False})
+    details = result["details"]
+    if result["nutrition"] == "collapsed":
         try:
-            # Intentar expandir la sección de información nutricional si existe
-            nutrition_expander = await detail_page.query_selector("#nutritionalInfoAndIngredients_feature_div .a-expander-header, a.a-expander-header")
-            if nutrition_expander:
-                # Verificar si ya está expandida
-                is_expanded = await detail_page.query_selector(".a-expander-content-expanded")
-                if not is_expanded:
-                    await nutrition_expander.click()
-                    await detail_page.wait_for_timeout(1000)  # Esperar a que se expanda
-                
-                # PASO 1: Extraer Energía (está en una fila especial)
-                energy_row = await detail_page.query_selector("#nic-eu-nutrition-facts-energy")
-                if energy_row:
-                    try:
-                        energy_label_elem = await energy_row.query_selector("td:nth-child(1) span")
-                        energy_value_elem = await energy_row.query_selector("td:nth-child(2) span")
-                        if energy_label_elem and energy_value_elem:
-                            energy_label = await energy_label_elem.inner_text()
-                            energy_value = await energy_value_elem.inner_text()
-                            if energy_label and energy_value:
-                                details["nutrition_facts"][energy_label.strip()] = energy_value.strip()
-                    except:
-                        pass
+            await detail_page.locator(NUTRITION_EXPANDER_SELECTOR).first.click()
+            await waits.wait(detail_page, "nutrition_expanded")  # Esperar a que se expanda
+            nutrition = await detail_page.evaluate(EXTRACT_DETAILS_JS, {"expanderSelector": NUTRITION_EXPANDER_SELECTOR,
+                                                                        "nutritionOnly": True})
+            details["nutrition_facts"] = nutrition["details"]["nutrition_facts"]
+            details["ingredients"] = nutrition["details"]["ingredients"]
+        except Exception:
+            # Si no hay información nutricional, simplemente continuar
+            pass
+    return details
+
+
+async def extract_details_by_queries(detail_page, details: dict, waits: WaitEngine):
+    """
+    Extrae los detalles de la página de producto cargada consulta a consulta
+    (query_selector + inner_text por fila y campo). Rellena `details` en el sitio.
+    """
+    # EXTRAER PRODUCT OVERVIEW (aquí está la marca y características principales)
+    overview_rows = await detail_page.query_selector_all("#productOverview_feature_div table tr, #poExpander table tr")
+    for row in overview_rows:
+        try:
+            # Buscar label y valor
+            label_elem = await row.query_selector("td.a-span3, th")
+            value_elem = await row.query_selector("td.a-span9, td:not(.a-span3)")
+            
+            if label_elem and value_elem:
+                label = await label_elem.inner_text()
+                value = await value_elem.inner_text()
                 
-                # PASO 2: Extraer el resto de nutrientes (están en tabla anidada)
-                nutrition_rows = await detail_page.query_selector_all("#nic-eu-nutrition-facts-nutrients tbody tr")
-                for row in nutrition_rows:
-                    try:
-                        # Buscar todos los spans en la primera celda (nombre del nutriente)
-                        # El segundo span suele tener el nombre del nutriente
-                        label_spans = await row.query_selector_all("td:nth-child(1) span")
-                        # El valor está en la segunda celda
-                        value_elem = await row.query_selector("td:nth-child(2) span")
+                if label and value:
+                    label_clean = label.strip()
+                    value_clean = value.strip()
+                    
+                    # Si es la marca
+                    if "brand" in label_clean.lower() or "marca" in label_clean.lower():
+                        details["brand"] = value_clean
+                    
+                    # Guardar en product_overview
+                    details["product_overview"][label_clean] = value_clean
+        except:
+            continue
+    
+    # Características/Especificaciones técnicas (tabla más detallada)
+    # Selectores CSS que cubren diferentes formatos de tablas de Amazon
+    spec_selectors = [
+        "table.a-keyvalue tr",
+        "#productDetails_techSpec_section_1 tr",
+        "#productDetails_detailBullets_sections1 tr",
+        "#productDetails_db_sections tr",  # Tabla de detalles alternativa
+        "table.prodDetTable tr",  # Tabla de detalles de producto
+        "div.a-section.table-padding table tbody tr"  # Tabla genérica en sección
+    ]
+    
+    spec_rows = []
+    for selector in spec_selectors:
+        rows = await detail_page.query_selector_all(selector)
+        if rows:
+            spec_rows.extend(rows)
+            if len(spec_rows) > 15:  # Si ya tenemos suficientes, no seguir buscando
+                break
+    
+    for row in spec_rows[:15]:  # Limitar a 15 especificaciones
+        try:
+            # Intentar extraer usando td[1] y td[2] (key-value en celdas separadas)
+            label_elem = await row.query_selector("td:nth-child(1), th")
+            value_elem = await row.query_selector("td:nth-child(2)")
+            
+            # Si no funciona, intentar con clases específicas de Amazon
+            if not label_elem or not value_elem:
+                label_elem = await row.query_selector("th, td.a-span3")
+                value_elem = await row.query_selector("td:not(.a-span3)")
+            
+            if label_elem and value_elem:
+                label = await label_elem.inner_text()
+                value = await value_elem.inner_text()
+                if label and value:
+                    label_clean = label.strip()
+                    value_clean = value.strip()
+                    
+                    # Evitar duplicados
+                    if not any(spec["label"] == label_clean for spec in details["specifications"]):
+                        details["specifications"].append({
+                            "label": label_clean,
+                            "value": value_clean
+                        })
+                        
+                        # Extraer marca si aparece aquí
+                        if "marca" in label_clean.lower() or "brand" in label_clean.lower():
+                            if details["brand"] == "N/A":
+                                details["brand"] = value_clean
+                        
+                        # Buscar dimensiones y peso específicamente
+                        if "dimensiones" in label_clean.lower() or "dimensions" in label_clean.lower():
+                            details["dimensions"] = value_clean
+                        if "peso" in label_clean.lower() or "weight" in label_clean.lower():
+                            details["weight"] = value_clean
+        except:
+            continue
+    
+    # Descripción del producto
+    desc_selectors = [
+        "#feature-bullets ul li span.a-list-item",
+        "#productDescription p",
+        ".a-unordered-list.a-vertical li span"
+    ]
+    for selector in desc_selectors:
+        desc_elems = await detail_page.query_selector_all(selector)
+        if desc_elems:
+            for elem in desc_elems[:10]:  # Primeros 10 puntos
+                try:
+                    text = await elem.inner_text()
+                    if text and text.strip() and len(text.strip()) > 10:
+                        details["features"].append(text.strip())
+                except:
+                    continue
+            if details["features"]:
+                break
+    
+    # Descripción completa
+    desc_elem = await detail_page.query_selector("#productDescription p")
+    if desc_elem:
+        details["description"] = await desc_elem.inner_text()
+    
+    # EXTRAER INFORMACIÓN NUTRICIONAL (para productos alimenticios)
+    try:
+        # Intentar expandir la sección de información nutricional si existe
+        nutrition_expander = await detail_page.query_selector(NUTRITION_EXPANDER_SELECTOR)
+        if nutrition_expander:
+            # Verificar si ya está expandida
+            is_expanded = await detail_page.query_selector(".a-expander-content-expanded")
+            if not is_expanded:
+                await nutrition_expander.click()
+                await waits.wait(detail_page, "nutrition_expanded")  # Esperar a que se expanda
+            
+            # PASO 1: Extraer Energía (está en una fila especial)
+            energy_row = await detail_page.query_selector("#nic-eu-nutrition-facts-energy")
+            if energy_row:
+                try:
+                    energy_label_elem = await energy_row.query_selector("td:nth-child(1) span")
+                    energy_value_elem = await energy_row.query_selector("td:nth-child(2) span")
+                    if energy_label_elem and energy_value_elem:
+                        energy_label = await energy_label_elem.inner_text()
+                        energy_value = await energy_value_elem.inner_text()
+                        if energy_label and energy_value:
+                            details["nutrition_facts"][energy_label.strip()] = energy_value.strip()
+                except:
+                    pass
+            
+            # PASO 2: Extraer el resto de nutrientes (están en tabla anidada)
+            nutrition_rows = await detail_page.query_selector_all("#nic-eu-nutrition-facts-nutrients tbody tr")
+            for row in nutrition_rows:
+                try:
+                    # Buscar todos los spans en la primera celda (nombre del nutriente)
+                    # El segundo span suele tener el nombre del nutriente
+                    label_spans = await row.query_selector_all("td:nth-child(1) span")
+                    # El valor está en la segunda celda
+                    value_elem = await row.query_selector("td:nth-child(2) span")
+                    
+                    if label_spans and value_elem:
+                        # Tomar el último span que suele tener el nombre real del nutriente
+                        label_elem = label_spans[-1] if len(label_spans) > 0 else None
                         
-                        if label_spans and value_elem:
-                            # Tomar el último span que suele tener el nombre real del nutriente
-                            label_elem = label_spans[-1] if len(label_spans) > 0 else None
+                        if label_elem:
+                            label = await label_elem.inner_text()
+                            value = await value_elem.inner_text()
                             
-                            if label_elem:
-                                label = await label_elem.inner_text()
-                                value = await value_elem.inner_text()
+                            if label and value and label.strip() and value.strip():
+                                label_clean = label.strip()
+                                value_clean = value.strip()
                                 
-                                if label and value and label.strip() and value.strip():
-                                    label_clean = label.strip()
-                                    value_clean = value.strip()
-                                    
-                                    # Filtrar textos vacíos o que sean solo guiones
-                                    if label_clean and value_clean and label_clean not in ["—", "-", ""]:
-                                        details["nutrition_facts"][label_clean] = value_clean
-                    except:
-                        continue
-                
-                # Extraer ingredientes si están disponibles
-                ingredients_elem = await detail_page.query_selector("#ingredients_feature_div .a-section, #important-information .content")
-                if ingredients_elem:
-                    ingredients_text = await ingredients_elem.inner_text()
-                    if ingredients_text and ingredients_text.strip():
-                        details["ingredients"] = ingredients_text.strip()
-        except Exception as e:
-            # Si no hay información nutricional, simplemente continuar
-            pass
-        
+                                # Filtrar textos vacíos o que sean solo guiones
+                                if label_clean and value_clean and label_clean not in ["—", "-", ""]:
+                                    details["nutrition_facts"][label_clean] = value_clean
+                except:
+                    continue
+            
+            # Extraer ingredientes si están disponibles
+            ingredients_elem = await detail_page.query_selector("#ingredients_feature_div .a-section, #important-information .content")
+            if ingredients_elem:
+                ingredients_text = await ingredients_elem.inner_text()
+                if ingredients_text and ingredients_text.strip():
+                    details["ingredients"] = ingredients_text.strip()
     except Exception as e:
-        print(f"    ⚠️ Error extrayendo detalles: {e}")
+        # Si no hay información nutricional, simplemente continuar
+        pass
+
+
+async def fetch_product_details(context, product_url: str, outcome: dict = None, http_engine: HttpDetailEngine = None,
+                                waits: WaitEngine = None, page_pool: PagePool = None, governor: DomainGovernor = None,
+                                fast_extract: bool = True, capture: CaptureStore = None):
+    """
+    Obtiene los detalles de un producto: primero por HTTP (si hay motor HTTP) y,
+    si la página necesita JavaScript o el parseo sale vacío, con Playwright
+    (un único page.evaluate por página salvo con fast_extract=False).
+    Con governor, cada petición espera su turno en el ritmo del dominio y le
+    comunica su resultado (un robot check pausa a todos los trabajos).
+    Con capture, se guarda el HTML de la página (el motor HTTP guarda el suyo).
+    """
+    if outcome is None:
+        outcome = {}
+    if http_engine is not None:
+        if governor is not None:
+            await governor.acquire()
+        details = await http_engine.fetch_details(product_url, outcome)
+        if governor is not None:
+            governor.report(outcome.get("kind"))
+        if details is not None:
+            return details
+    if governor is not None:
+        await governor.acquire()
+    try:
+        return await extract_detailed_product_info(context, product_url, outcome, waits, page_pool, fast_extract,
+                                                   capture)
     finally:
-        # Cerrar la página de detalles
-        await detail_page.close()
-    
-    return details
+        if governor is not None:
+            governor.report(outcome.get("kind"))
 
 
 async def extract_product_basic_info(element, search_term: str, position: int, debug: bool = False):
@@ -228,14 +708,7 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         
         # Título - intentar múltiples selectores
         title = "N/A"
-        title_selectors = [
-            "h2 a span",
-            "h2 span",
-            ".a-size-medium.a-color-base.a-text-normal",
-            ".a-size-base-plus.a-color-base.a-text-normal",
-            "h2.a-size-mini a span"
-        ]
-        for selector in title_selectors:
+        for selector in CARD_SELECTORS["title"]:
             title_elem = await element.query_selector(selector)
             if title_elem:
                 title = await title_elem.inner_text()
@@ -244,17 +717,17 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         
         # URL del producto
         product_url = "N/A"
-        link_elem = await element.query_selector("h2 a")
-        if not link_elem:
-            link_elem = await element.query_selector("a.a-link-normal")
+        link_elem = None
+        for selector in CARD_SELECTORS["link"]:
+            link_elem = await element.query_selector(selector)
+            if link_elem:
+                break
         if link_elem:
-            product_url = await link_elem.get_attribute("href")
-            if product_url and not product_url.startswith("http"):
-                product_url = f"https://www.amazon.es{product_url}"
+            product_url = absolute_url(await link_elem.get_attribute("href"))
         
         # Precio - capturar precio completo (euros + céntimos)
         price = "N/A"
-        price_elem = await element.query_selector(".a-price .a-offscreen")
+        price_elem = await element.query_selector(CARD_SELECTORS["price"])
         if price_elem:
             price = await price_elem.inner_text()
             price = price.strip()
@@ -263,12 +736,12 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
             price_whole = ""
             price_fraction = ""
             
-            whole_elem = await element.query_selector(".a-price-whole")
+            whole_elem = await element.query_selector(CARD_SELECTORS["price_whole"])
             if whole_elem:
                 price_whole = await whole_elem.inner_text()
                 price_whole = price_whole.replace("\n", "").replace(",", ".").strip()
             
-            fraction_elem = await element.query_selector(".a-price-fraction")
+            fraction_elem = await element.query_selector(CARD_SELECTORS["price_fraction"])
             if fraction_elem:
                 price_fraction = await fraction_elem.inner_text()
                 price_fraction = price_fraction.strip()
@@ -282,18 +755,13 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         
         # Rating
         rating = "N/A"
-        rating_elem = await element.query_selector(".a-icon-alt")
+        rating_elem = await element.query_selector(CARD_SELECTORS["rating"])
         if rating_elem:
             rating = await rating_elem.inner_text()
         
         # Número de reseñas
         reviews_count = "0"
-        reviews_selectors = [
-            "span.a-size-base.s-underline-text",
-            "span[aria-label*='valoraciones']",
-            ".a-size-base"
-        ]
-        for selector in reviews_selectors:
+        for selector in CARD_SELECTORS["reviews_count"]:
             reviews_elem = await element.query_selector(selector)
             if reviews_elem:
                 reviews_text = await reviews_elem.inner_text()
@@ -303,7 +771,7 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         
         # Imagen
         image_url = "N/A"
-        img_elem = await element.query_selector("img.s-image")
+        img_elem = await element.query_selector(CARD_SELECTORS["image"])
         if img_elem:
             image_url = await img_elem.get_attribute("src")
         
@@ -311,9 +779,9 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         brand = "N/A"
         additional_specs = {}
         
-        details_container = await element.query_selector("div.a-section.a-spacing-small")
+        details_container = await element.query_selector(CARD_SELECTORS["specs_container"])
         if details_container:
-            detail_rows = await details_container.query_selector_all("div.a-row")
+            detail_rows = await details_container.query_selector_all(CARD_SELECTORS["specs_row"])
             for row in detail_rows:
                 row_text = await row.inner_text()
                 if row_text and ":" in row_text:
@@ -321,65 +789,53 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
                     if len(parts) == 2:
                         key = parts[0].strip()
                         value = parts[1].strip()
-                        if "brand" in key.lower() or "marca" in key.lower():
+                        if is_brand_key(key):
                             brand = value
                         else:
                             additional_specs[key] = value
         
         if brand == "N/A":
-            brand_selectors = [
-                "h5 span.a-size-base.a-color-base",
-                "span.a-size-base-plus.a-color-base",
-                "div.a-row.a-size-base.a-color-secondary span.a-size-base.a-color-base",
-                ".s-line-clamp-1 .a-size-base-plus",
-                "span.a-color-base.puis-normal-weight-text"
-            ]
-            for selector in brand_selectors:
+            for selector in CARD_SELECTORS["brand"]:
                 brand_elem = await element.query_selector(selector)
                 if brand_elem:
                     brand_text = await brand_elem.inner_text()
-                    if brand_text and brand_text.strip():
-                        brand_clean = brand_text.strip()
-                        if (len(brand_clean) < 50 and 
-                            not brand_clean.replace(".", "").replace(",", "").isdigit() and
-                            "€" not in brand_clean and
-                            "valoraciones" not in brand_clean.lower()):
-                            brand = brand_clean
-                            break
+                    if brand_text and is_brand_candidate(brand_text.strip()):
+                        brand = brand_text.strip()
+                        break
         
         # Prime
         has_prime = False
-        prime_elem = await element.query_selector("i.a-icon-prime, span[aria-label='Amazon Prime']")
+        prime_elem = await element.query_selector(CARD_SELECTORS["prime"])
         if prime_elem:
             has_prime = True
         
         # Envío gratis
         free_shipping = False
-        shipping_elem = await element.query_selector("span[aria-label*='envío'], span:has-text('Envío GRATIS')")
+        shipping_elem = await element.query_selector(FREE_SHIPPING_QUERY)
         if shipping_elem:
             free_shipping = True
         
         # Disponibilidad
         availability = "N/A"
-        availability_elem = await element.query_selector(".a-size-base.a-color-price, .a-size-base.a-color-success")
+        availability_elem = await element.query_selector(CARD_SELECTORS["availability"])
         if availability_elem:
             availability = await availability_elem.inner_text()
         
         # Descuento/Cupón
         discount = "N/A"
-        discount_elem = await element.query_selector(".s-coupon-unclipped, .savingPriceOverride")
+        discount_elem = await element.query_selector(CARD_SELECTORS["discount"])
         if discount_elem:
             discount = await discount_elem.inner_text()
         
         # Precio anterior (tachado)
         original_price = "N/A"
-        original_price_elem = await element.query_selector(".a-price.a-text-price .a-offscreen")
+        original_price_elem = await element.query_selector(CARD_SELECTORS["original_price"])
         if original_price_elem:
             original_price = await original_price_elem.inner_text()
         
         # Vendedor/Seller
         seller = "N/A"
-        seller_elem = await element.query_selector(".a-size-base.a-color-secondary")
+        seller_elem = await element.query_selector(CARD_SELECTORS["seller"])
         if seller_elem:
             seller_text = await seller_elem.inner_text()
             if seller_text and "de " in seller_text.lower():
@@ -387,8 +843,8 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         
         # Opciones de color/tamaño disponibles
         options = []
-        options_elems = await element.query_selector_all(".a-button-text")
-        for opt_elem in options_elems[:5]:
+        options_elems = await element.query_selector_all(CARD_SELECTORS["options"])
+        for opt_elem in options_elems[:MAX_OPTIONS]:
             opt_text = await opt_elem.inner_text()
             if opt_text and opt_text.strip():
                 options.append(opt_text.strip())
@@ -420,7 +876,690 @@ async def extract_product_basic_info(element, search_term: str, position: int, d
         return None
 
 
-async def scrape_amazon_products(search_term: str, max_products: int = 50, debug: bool = False, detailed: bool = False, headless: bool = False):
+async def extract_products_from_page(page, search_term: str, start_position: int, limit: int, debug: bool = False):
+    """
+    Extrae la información básica de todas las tarjetas de la página de resultados
+    con una única llamada a page.evaluate (un solo viaje de ida y vuelta a Chromium).
+
+    Args:
+        page: Página de Playwright con los resultados de búsqueda cargados
+        search_term: Término de búsqueda
+        start_position: Posición asignada a la primera tarjeta de la página
+        limit: Número máximo de tarjetas a procesar
+        debug: Si es True, imprime el HTML de la primera tarjeta
+
+    Returns:
+        list con un elemento por tarjeta procesada: dict con el mismo formato que
+        extract_product_basic_info, o None si la tarjeta no era válida
+    """
+    if limit <= 0:
+        return []
+
+    if debug and start_position == 1:
+        first_card = await page.query_selector(SEARCH_RESULT_SELECTOR)
+        if first_card:
+            html = await first_card.inner_html()
+            print(f"\n🔍 DEBUG - HTML del primer producto:\n{html[:500]}...\n")
+
+    results = await page.evaluate(EXTRACT_SEARCH_RESULTS_JS, {
+        "selector": SEARCH_RESULT_SELECTOR,
+        "selectors": CARD_SELECTORS,
+        "rules": CARD_RULES,
+        "searchTerm": search_term,
+        "startPosition": start_position,
+        "limit": limit
+    })
+
+    products = []
+    for result in results:
+        if result.get("error"):
+            print(f"⚠️  {result['error']}", flush=True)
+        products.append(result.get("product"))
+    return products
+
+
+def merge_detailed_info(product_data: dict, detailed_info: dict):
+    """Combina la información de la página de detalle con la información básica del producto"""
+    # Actualizar marca si se encontró en la página de detalle
+    if detailed_info.get("brand") and detailed_info["brand"] != "N/A":
+        product_data["brand"] = detailed_info["brand"]
+    
+    # Añadir el resto de información detallada
+    product_data.update(detailed_info)
+
+
+def apply_cached_details(product_data: dict, detail_cache: DetailCache) -> bool:
+    """Si hay detalles vigentes en caché para el ASIN del producto, los aplica y devuelve True"""
+    if detail_cache is None:
+        return False
+    cached = detail_cache.get(product_data.get("asin"))
+    if cached is None:
+        return False
+    merge_detailed_info(product_data, cached)
+    return True
+
+
+def apply_previous_details(product_data: dict, previous: PreviousExtraction) -> bool:
+    """En modo refresco, si el listado no cambió desde la extracción anterior, reutiliza sus detalles y devuelve True"""
+    return previous is not None and previous.carry_forward(product_data)
+
+
+def details_known(product_data: dict, previous: PreviousExtraction = None, detail_cache: DetailCache = None) -> bool:
+    """Si ya hay detalles del producto sin visitarlo (extracción anterior o caché), para la prioridad 'uncached'"""
+    asin = product_data.get("asin")
+    return ((previous is not None and asin in previous.by_asin)
+            or (detail_cache is not None and detail_cache.has(asin)))
+
+
+def cache_detailed_info(detail_cache: DetailCache, product_data: dict, detailed_info: dict, outcome: dict):
+    """Guarda en caché los detalles solo si la visita fue correcta y obtuvo datos"""
+    if detail_cache is not None and outcome.get("kind") == OUTCOME_OK and has_details(detailed_info):
+        detail_cache.put(product_data.get("asin"), detailed_info)
+
+
+async def go_to_next_results_page(page, page_num: int, waits: WaitEngine = None,
+                                  governor: DomainGovernor = None) -> bool:
+    """
+    Pulsa el botón de siguiente página de resultados y espera a que la nueva
+    página tenga resultados (en lugar de una pausa fija).
+    
+    Returns:
+        True si se navegó a la página page_num + 1, False si no hay más páginas
+    """
+    next_button = await page.query_selector("a.s-pagination-next")
+    if not next_button:
+        print("   📍 No se encontró botón de siguiente página", flush=True)
+        return False
+    
+    is_disabled = await next_button.get_attribute("aria-disabled")
+    if is_disabled == "true":
+        print("   📍 No hay más páginas disponibles", flush=True)
+        return False
+    
+    if governor is not None:
+        await governor.acquire()
+    print(f"   ➡️  Navegando a página {page_num + 1}...", flush=True)
+    previous_url = page.url
+    # Con paginación por pushState la URL cambia antes que los resultados: se espera a que desaparezca
+    # el primer resultado actual para no extraer dos veces la misma página
+    previous_result = await page.query_selector(SEARCH_RESULT_SELECTOR)
+    await next_button.click()
+    try:
+        await (waits or WaitEngine(AMAZON)).wait(page, "next_page", previous_url=previous_url,
+                                                 previous_element=previous_result)
+    finally:
+        if previous_result is not None:
+            try:
+                await previous_result.dispose()
+            except Exception:
+                pass
+    return True
+
+
+async def search_page_blocked(page, governor: DomainGovernor = None, waits: WaitEngine = None) -> bool:
+    """
+    Comprueba si la página de resultados cargada es un robot check. Con governor,
+    avisa del bloqueo (se pausan y ralentizan todos los trabajos del dominio),
+    espera a que termine la pausa y recarga la página, hasta MAX_BLOCKED_RELOADS veces.
+    
+    Returns:
+        True si la página sigue bloqueada
+    """
+    for attempt in range(MAX_BLOCKED_RELOADS + 1):
+        if not await page.evaluate(ROBOT_CHECK_JS):
+            if governor is not None:
+                governor.report(OUTCOME_OK)
+            return False
+        print(f"   🤖 Página de verificación (robot check) en los resultados: {page.url[:80]}", flush=True)
+        if governor is None:
+            return True
+        governor.report(OUTCOME_BLOCKED)
+        if attempt == MAX_BLOCKED_RELOADS:
+            break
+        await governor.acquire()
+        print(f"   🔄 Recargando la página de resultados ({attempt + 1}/{MAX_BLOCKED_RELOADS})...", flush=True)
+        await page.reload(wait_until="domcontentloaded")
+        await (waits or WaitEngine(AMAZON)).wait(page, "search_results")
+    return True
+
+
+async def extract_page_cards(page, search_term: str, start_position: int, limit: int, fast_extract: bool = True,
+                             debug: bool = False):
+    """
+    Extrae las tarjetas de la página de resultados cargada en `page`, con un único
+    page.evaluate (fast_extract) o consulta a consulta sobre cada tarjeta.
+    
+    Returns:
+        list con un dict de producto (o None si la tarjeta no era válida) por tarjeta
+    """
+    if fast_extract:
+        return await extract_products_from_page(page, search_term, start_position, limit, debug)
+    
+    # Modo clásico: las tarjetas se piden de una en una (no todas con query_selector_all) y
+    # cada una libera sus handles al terminar, con un máximo de MAX_INFLIGHT_CARDS a la vez
+    cards = page.locator(SEARCH_RESULT_SELECTOR)
+    count = min(await cards.count(), limit)
+    semaphore = asyncio.Semaphore(MAX_INFLIGHT_CARDS)
+    
+    async def extract_card(idx):
+        async with semaphore:
+            element = await cards.nth(idx).element_handle()
+            scope = HandleScope(element)
+            try:
+                return await extract_product_basic_info(scope, search_term, start_position + idx, debug)
+            finally:
+                await scope.dispose()
+    
+    results = await asyncio.gather(*[extract_card(idx) for idx in range(count)], return_exceptions=True)
+    return [result if not isinstance(result, Exception) else None for result in results]
+
+
+def search_page_url(search_term: str, page_num: int = 1) -> str:
+    """URL de la página page_num de resultados de búsqueda"""
+    url = f"https://www.amazon.es/s?k={search_term.replace(' ', '+')}"
+    return url if page_num <= 1 else f"{url}&page={page_num}"
+
+
+async def iter_search_result_pages(page, search_term: str, max_products: int, fast_extract: bool = True, debug: bool = False,
+                                   checkpoint: RunCheckpoint = None, waits: WaitEngine = None,
+                                   governor: DomainGovernor = None, capture: CaptureStore = None):
+    """
+    Recorre las páginas de resultados y produce la información básica de cada
+    página en cuanto se carga, antes de navegar a la siguiente.
+
+    Con checkpoint, cada página se guarda en disco junto con el cursor de
+    paginación; al reanudar se producen primero los productos ya guardados y se
+    continúa desde la página siguiente a la última completada.
+
+    Con governor, cada navegación respeta el ritmo del dominio y las páginas de
+    robot check pausan la paginación (y el resto de trabajos) antes de recargarlas.
+
+    Con capture, el HTML de cada página se guarda antes de extraer sus tarjetas.
+
+    Yields:
+        list de dicts de producto válidos de cada página
+    """
+    collected = 0
+    page_num = 1
+
+    if checkpoint is not None and checkpoint.cursor:
+        cursor = checkpoint.cursor
+        collected = cursor["collected"]
+        page_num = cursor["page_num"]
+        recovered = [card for _, card in sorted(checkpoint.cards.items())]
+        if recovered:
+            print(f"♻️  {len(recovered)} productos recuperados del checkpoint", flush=True)
+            yield recovered
+        if cursor.get("done") or collected >= max_products:
+            return
+        # Volver a la última página completada y pasar a la siguiente
+        print(f"♻️  Retomando la paginación tras la página {page_num}...", flush=True)
+        if governor is not None:
+            await governor.acquire()
+        await page.goto(cursor["url"], wait_until="domcontentloaded")
+        await page.wait_for_selector(SEARCH_RESULT_SELECTOR, timeout=10000)
+        if not await go_to_next_results_page(page, page_num, waits, governor):
+            checkpoint.mark_pagination_done()
+            return
+        page_num += 1
+
+    while collected < max_products:
+        print(f"📄 Página {page_num}...", flush=True)
+        if await search_page_blocked(page, governor, waits):
+            print(f"   ⛔ Página {page_num} bloqueada: fin de la paginación", flush=True)
+            break
+        await page.wait_for_selector(SEARCH_RESULT_SELECTOR, timeout=10000)
+        if capture is not None:
+            await capture.capture_page(page, KIND_SEARCH, page_num)
+        
+        cards = await extract_page_cards(page, search_term, collected + 1, max_products - collected, fast_extract, debug)
+        
+        collected += len(cards)
+        print(f"   Extraídos {len(cards)} productos (total acumulado: {collected}/{max_products})", flush=True)
+        valid_cards = [card for card in cards if card]
+        if checkpoint is not None:
+            checkpoint.record_page(valid_cards, {"url": page.url, "page_num": page_num, "collected": collected})
+        yield valid_cards
+
+        if collected >= max_products or not await go_to_next_results_page(page, page_num, waits, governor):
+            break
+        page_num += 1
+
+    if checkpoint is not None:
+        checkpoint.mark_pagination_done()
+
+
+async def iter_search_result_pages_by_url(context, page, search_term: str, max_products: int, fast_extract: bool = True,
+                                          debug: bool = False, checkpoint: RunCheckpoint = None,
+                                          waits: WaitEngine = None, page_concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+                                          governor: DomainGovernor = None, capture: CaptureStore = None):
+    """
+    Como iter_search_result_pages, pero en lugar de pulsar "siguiente" construye
+    las URLs &page=N y carga varias páginas de resultados a la vez en pestañas
+    separadas.
+    
+    Las páginas se producen en orden, las posiciones se numeran de forma
+    consecutiva y los ASIN repetidos entre páginas (patrocinados) se descartan.
+    
+    Args:
+        context: Contexto del browser donde abrir las pestañas
+        page: Página con la primera página de resultados ya cargada
+        page_concurrency: Páginas de resultados cargándose a la vez
+        governor: DomainGovernor opcional que marca el ritmo de las cargas y detecta robot checks
+        capture: CaptureStore opcional donde se guarda el HTML de cada página de resultados
+    
+    Yields:
+        list de dicts de producto válidos y no repetidos de cada página
+    """
+    if waits is None:
+        waits = WaitEngine(AMAZON)
+    collected = 0
+    page_num = 0  # Última página ya producida
+    seen_asins = set()
+    per_page = ESTIMATED_RESULTS_PER_PAGE
+    duplicates = 0
+
+    if checkpoint is not None and checkpoint.cursor:
+        cursor = checkpoint.cursor
+        collected = cursor["collected"]
+        page_num = cursor["page_num"]
+        recovered = [card for _, card in sorted(checkpoint.cards.items())]
+        seen_asins = {card.get("asin") for card in recovered}
+        if recovered:
+            print(f"♻️  {len(recovered)} productos recuperados del checkpoint", flush=True)
+            yield recovered
+        if cursor.get("done") or collected >= max_products:
+            return
+        print(f"♻️  Retomando la paginación en la página {page_num + 1}...", flush=True)
+
+    semaphore = asyncio.Semaphore(max(1, page_concurrency))
+    attempt_counts = {}  # {página: intentos hechos}; la 1 se vuelve a cargar en `page` al reintentar
+
+    async def load_page(num):
+        """
+        Carga la página num en su propia pestaña (la 1 ya está en `page`) y extrae sus tarjetas.
+
+        Returns:
+            Lista de tarjetas ([] si la página no tiene resultados) o None si falló o sigue bloqueada
+        """
+        tab = page if num == 1 else await context.new_page()
+        try:
+            if tab is not page or attempt_counts.get(num):
+                if governor is not None:
+                    await governor.acquire()
+                await tab.goto(search_page_url(search_term, num), wait_until="domcontentloaded")
+                await waits.wait(tab, "search_results")
+            if await search_page_blocked(tab, governor, waits):
+                return None
+            if not await tab.query_selector(SEARCH_RESULT_SELECTOR):
+                return []
+            if capture is not None:
+                await capture.capture_page(tab, KIND_SEARCH, num)
+            return await extract_page_cards(tab, search_term, 1, max_products, fast_extract, debug and num == 1)
+        except Exception as e:
+            print(f"⚠️  Error cargando la página {num}: {e}", flush=True)
+            return None
+        finally:
+            if tab is not page:
+                await tab.close()
+
+    async def fetch_page(num):
+        """load_page con reintentos y backoff (sin ocupar pestaña); None si falla en todos los intentos"""
+        for attempt in range(1, SEARCH_PAGE_ATTEMPTS + 1):
+            async with semaphore:
+                cards = await load_page(num)
+            attempt_counts[num] = attempt
+            if cards is not None:
+                return cards
+            if attempt < SEARCH_PAGE_ATTEMPTS:
+                delay = SEARCH_PAGE_RETRY_DELAY * 2 ** (attempt - 1)
+                print(f"   🔁 Reintentando la página {num} en {delay:.0f}s "
+                      f"({attempt + 1}/{SEARCH_PAGE_ATTEMPTS})...", flush=True)
+                await asyncio.sleep(delay)
+        return None
+
+    pending = {}
+    truncated = False  # Una página falló en todos los intentos: la paginación queda a medias
+    try:
+        finished = False
+        while collected < max_products and not finished:
+            # Lanzar tantas páginas como parezcan necesarias (hasta page_concurrency) sin esperar al clic
+            batch = max(1, min(page_concurrency, math.ceil((max_products - collected) / per_page)))
+            numbers = list(range(page_num + 1, page_num + 1 + batch))
+            for num in numbers:
+                pending[num] = asyncio.create_task(fetch_page(num))
+            if len(numbers) > 1:
+                print(f"📄 Cargando páginas {numbers[0]}-{numbers[-1]} en paralelo...", flush=True)
+            else:
+                print(f"📄 Página {numbers[0]}...", flush=True)
+
+            for num in numbers:
+                cards = await pending.pop(num)
+                if cards is None:
+                    print(f"   ❌ La página {num} falló tras {SEARCH_PAGE_ATTEMPTS} intentos: "
+                          f"paginación interrumpida", flush=True)
+                    truncated = finished = True
+                    break
+                if not cards:
+                    print(f"   📍 La página {num} no tiene resultados: fin de la paginación", flush=True)
+                    finished = True
+                    break
+                if num == 1:
+                    per_page = max(1, len(cards))
+
+                page_products = []
+                for card in cards:
+                    if card is None or collected >= max_products:
+                        continue
+                    asin = card.get("asin")
+                    if asin and asin != "N/A" and asin in seen_asins:
+                        duplicates += 1
+                        continue
+                    seen_asins.add(asin)
+                    collected += 1
+                    card["position"] = collected
+                    page_products.append(card)
+
+                page_num = num
+                print(f"   Página {num}: {len(page_products)} productos nuevos "
+                      f"(total acumulado: {collected}/{max_products})", flush=True)
+                if checkpoint is not None:
+                    checkpoint.record_page(page_products, {"url": search_page_url(search_term, num),
+                                                           "page_num": num, "collected": collected})
+                yield page_products
+
+                if collected >= max_products:
+                    break
+    finally:
+        # Páginas lanzadas que ya no hacen falta (fin de resultados o objetivo alcanzado)
+        for task in pending.values():
+            task.cancel()
+        await asyncio.gather(*pending.values(), return_exceptions=True)
+
+    if duplicates:
+        print(f"   🔁 {duplicates} productos repetidos entre páginas descartados", flush=True)
+    if checkpoint is not None and not truncated:
+        checkpoint.mark_pagination_done()
+
+
+def iter_search_pages(context, page, search_term: str, max_products: int, fast_extract: bool = True, debug: bool = False,
+                      checkpoint: RunCheckpoint = None, waits: WaitEngine = None, parallel_pages: int = 0,
+                      governor: DomainGovernor = None, capture: CaptureStore = None):
+    """Paginación por clic en "siguiente" o, si parallel_pages > 0, por URL con varias páginas a la vez"""
+    if parallel_pages:
+        return iter_search_result_pages_by_url(context, page, search_term, max_products, fast_extract, debug,
+                                               checkpoint, waits, page_concurrency=parallel_pages, governor=governor,
+                                               capture=capture)
+    return iter_search_result_pages(page, search_term, max_products, fast_extract, debug, checkpoint, waits, governor,
+                                    capture)
+
+
+async def run_scrape_pipeline(context, page, search_term: str, max_products: int, detailed: bool,
+                              fast_extract: bool = True, debug: bool = False, on_product=None,
+                              limiter: AdaptiveLimiter = None, http_engine: HttpDetailEngine = None,
+                              detail_cache: DetailCache = None, checkpoint: RunCheckpoint = None,
+                              waits: WaitEngine = None, parallel_pages: int = 0, previous: PreviousExtraction = None,
+                              page_pool: PagePool = None, governor: DomainGovernor = None,
+                              retry_queue: RetryQueue = None, budget: ScrapeBudget = None,
+                              priority: str = PRIORITY_POSITION, capture: CaptureStore = None):
+    """
+    Ejecuta paginación, extracción básica y extracción de detalle como un pipeline
+    productor/consumidor con una cola acotada entre las etapas.
+    
+    La extracción de detalle empieza en cuanto se conocen las primeras URLs y cada
+    producto terminado se emite inmediatamente a on_product.
+    
+    Args:
+        context: Contexto del browser de Playwright
+        page: Página con la primera página de resultados ya cargada
+        search_term: Término de búsqueda
+        max_products: Número máximo de productos
+        detailed: Si es True, visita la página de detalle de cada producto
+        fast_extract: Extracción de tarjetas y de páginas de detalle con un único page.evaluate
+        debug: Modo depuración
+        on_product: Callback opcional llamado con cada producto terminado
+        limiter: AdaptiveLimiter que regula las páginas de detalle simultáneas
+        http_engine: HttpDetailEngine opcional para descargar detalles sin navegador
+        detail_cache: DetailCache opcional; solo se visitan los ASIN sin entrada vigente
+        checkpoint: RunCheckpoint opcional donde se guardan páginas y productos terminados
+        waits: WaitEngine donde se registran las esperas de navegación (opcional)
+        parallel_pages: Si es > 0, páginas de resultados que se cargan a la vez por URL
+        previous: PreviousExtraction opcional (modo refresco); solo se visitan los ASIN nuevos o cambiados
+        page_pool: PagePool opcional de pestañas de detalle reutilizables
+        governor: DomainGovernor opcional compartido que marca el ritmo de todas las navegaciones
+        retry_queue: RetryQueue con los reintentos y fallidos de las páginas de detalle (opcional)
+        budget: ScrapeBudget opcional; al agotarse se deja de paginar y de empezar visitas de detalle
+        priority: Orden de las visitas entre los productos en cola ("position", "reviews", "uncached");
+            en el pipeline solo se reordenan los productos ya paginados que esperan en la cola
+        capture: CaptureStore opcional donde se guarda el HTML de las páginas de resultados y de detalle
+    
+    Returns:
+        list de productos ordenados por posición
+    """
+    if limiter is None:
+        limiter = AdaptiveLimiter()
+    if retry_queue is None:
+        retry_queue = RetryQueue()
+    if budget is None:
+        budget = ScrapeBudget()
+    queue = asyncio.PriorityQueue(maxsize=limiter.max_limit * 2)
+    products = []
+    detail_tasks = set()
+    started = 0
+    queued = 0
+    
+    def is_known(product_data):
+        return details_known(product_data, previous, detail_cache)
+    
+    def emit(product_data):
+        products.append(product_data)
+        if on_product:
+            on_product(product_data)
+    
+    async def producer():
+        nonlocal queued
+        pages = iter_search_pages(context, page, search_term, max_products, fast_extract, debug, checkpoint, waits,
+                                  parallel_pages, governor, capture)
+        try:
+            async for page_products in pages:
+                for product_data in page_products:
+                    queued += 1
+                    await queue.put((priority_key(product_data, priority, is_known), queued, product_data))
+                if budget.expired():
+                    budget.stats["pagination_stopped"] = True
+                    print(f"⏳ Deadline alcanzado: se detiene la paginación", flush=True)
+                    break
+        except Exception as e:
+            print(f"⚠️  Error durante la paginación: {e}", flush=True)
+        finally:
+            await pages.aclose()
+            # Marca de fin con la prioridad más baja: sale de la cola después de todos los productos
+            await queue.put(((float("inf"),), queued + 1, None))
+    
+    async def detail_one(product_data, idx):
+        async def attempt(attempt_num):
+            # El consumidor ya reservó el hueco del primer intento; los reintentos esperan el suyo
+            if attempt_num > 1:
+                await limiter.acquire()
+                if budget.expired():
+                    await limiter.release()
+                    raise BudgetExhausted()
+            outcome = {}
+            start = time.perf_counter()
+            try:
+                if attempt_num == 1:
+                    print(f"   [{idx}/{max_products}] {product_data['title'][:40]}...", flush=True)
+                detailed_info = await fetch_product_details(context, product_data["url"], outcome, http_engine, waits,
+                                                            page_pool, governor, fast_extract, capture)
+            except Exception as e:
+                detailed_info = {}
+                outcome.update(kind=OUTCOME_ERROR, error=str(e))
+                print(f"    ⚠️ Error extrayendo detalles: {e}", flush=True)
+            finally:
+                await limiter.release(outcome.get("kind", OUTCOME_ERROR), time.perf_counter() - start)
+            return detailed_info, outcome
+        
+        try:
+            detailed_info, outcome = await retry_queue.run(product_data, attempt, budget)
+            merge_detailed_info(product_data, detailed_info)
+            cache_detailed_info(detail_cache, product_data, detailed_info, outcome)
+            if outcome.get("kind") != OUTCOME_OK:
+                product_data["details_missing"] = MISSING_FAILED
+            elif checkpoint is not None:
+                checkpoint.record_completed(product_data)
+        except BudgetExhausted:
+            # Sin tiempo para el siguiente intento: se guarda sin detalles y --resume lo completa
+            budget.skip(product_data)
+        except Exception as e:
+            print(f"    ⚠️ Error extrayendo detalles: {e}", flush=True)
+        finally:
+            emit(product_data)
+    
+    async def consumer():
+        nonlocal started
+        while True:
+            # Reservar hueco antes de sacar de la cola: así la cola hace de contrapresión
+            await limiter.acquire()
+            _, _, product_data = await queue.get()
+            if product_data is None:
+                await limiter.release()
+                break
+            
+            # Producto ya terminado en una ejecución anterior (--resume)
+            if detailed and checkpoint is not None and checkpoint.is_completed(product_data):
+                await limiter.release()
+                emit(checkpoint.completed[product_data["position"]])
+                continue
+            
+            if (not detailed or not product_data.get("url") or product_data["url"] == "N/A"
+                    or apply_previous_details(product_data, previous)
+                    or apply_cached_details(product_data, detail_cache)):
+                await limiter.release()
+                emit(product_data)
+                continue
+            
+            # Sin tiempo: el producto se guarda sin detalles
+            if budget.expired():
+                await limiter.release()
+                budget.skip(product_data)
+                emit(product_data)
+                continue
+            
+            started += 1
+            task = asyncio.create_task(detail_one(product_data, started))
+            detail_tasks.add(task)
+            task.add_done_callback(detail_tasks.discard)
+        
+        if detail_tasks:
+            await asyncio.gather(*list(detail_tasks), return_exceptions=True)
+    
+    await asyncio.gather(producer(), consumer())
+    
+    products.sort(key=lambda product_data: product_data.get("position", 0))
+    return products
+
+
+async def run_sharded_detail_phase(products: list, shards: int, detail_cache: DetailCache = None,
+                                   checkpoint: RunCheckpoint = None, previous: PreviousExtraction = None,
+                                   retry_queue: RetryQueue = None, budget: ScrapeBudget = None,
+                                   priority: str = PRIORITY_POSITION, network: NetworkRecorder = None,
+                                   **shard_options) -> int:
+    """
+    FASE 3 repartida en varios procesos (sharded_details.py).
+
+    Los productos ya terminados (checkpoint), sin cambios (refresco) o en caché se resuelven aquí; el resto
+    se reparte entre los shards y sus detalles se combinan por posición en cuanto
+    termina cada shard. La caché y el checkpoint solo se escriben desde este proceso.
+
+    Args:
+        products: Productos de la FASE 1 (se completan en el sitio)
+        shards: Número de procesos
+        detail_cache: DetailCache opcional por ASIN
+        checkpoint: RunCheckpoint opcional
+        previous: PreviousExtraction opcional (modo refresco)
+        retry_queue: RetryQueue opcional donde se recogen los fallidos de los shards (cada shard reintenta)
+        budget: ScrapeBudget opcional; los shards no empiezan visitas después del deadline
+        priority: Orden de las visitas dentro de cada shard ("position", "reviews", "uncached")
+        network: NetworkRecorder opcional donde se suman las peticiones de red de cada shard
+        **shard_options: Opciones de cada shard (headless, block_profile, http_details,
+            adaptive_concurrency, user_agent, max_rate, max_attempts, fast_extract)
+
+    Returns:
+        Número de productos con detalles
+    """
+    if budget is None:
+        budget = ScrapeBudget()
+    completed = 0
+    jobs = []
+    by_position = {}
+    ordered = order_by_priority(products, priority, lambda product_data: details_known(product_data, previous,
+                                                                                       detail_cache))
+    for product_data in ordered:
+        if not product_data.get("url") or product_data["url"] == "N/A":
+            continue
+        # Terminado en una ejecución anterior (--resume)
+        if checkpoint is not None and checkpoint.is_completed(product_data):
+            product_data.update(checkpoint.completed[product_data["position"]])
+            completed += 1
+            continue
+        if apply_previous_details(product_data, previous) or apply_cached_details(product_data, detail_cache):
+            completed += 1
+            continue
+        if budget.expired():
+            budget.skip(product_data)
+            continue
+        by_position[product_data["position"]] = product_data
+        jobs.append({"position": product_data["position"], "url": product_data["url"]})
+    
+    if not jobs:
+        return completed
+    
+    merged = set()
+    
+    def merge_shard(shard):
+        nonlocal completed
+        for result in sorted(shard["results"], key=lambda r: r["position"]):
+            merged.add(result["position"])
+            product_data = by_position[result["position"]]
+            if result["outcome"] == MISSING_DEADLINE:
+                budget.skip(product_data)
+                continue
+            merge_detailed_info(product_data, result["details"])
+            cache_detailed_info(detail_cache, product_data, result["details"], {"kind": result["outcome"]})
+            if result["outcome"] == OUTCOME_OK:
+                if checkpoint is not None:
+                    checkpoint.record_completed(product_data)
+                completed += 1
+            else:
+                product_data["details_missing"] = MISSING_FAILED
+        if retry_queue is not None:
+            for entry in shard.get("dead_letters", []):
+                product_data = by_position[entry["position"]]
+                retry_queue.add_dead_letter({**entry, "asin": product_data.get("asin"),
+                                             "title": product_data.get("title")})
+        if network is not None and shard.get("network"):
+            network.merge(shard["network"])
+    
+    print(f"   🧩 {len(jobs)} productos repartidos en {min(shards, len(jobs))} procesos", flush=True)
+    start = time.perf_counter()
+    stats = await run_sharded_details(jobs, shards, on_shard_done=merge_shard, deadline_at=budget.expires_at,
+                                      network_stats=network is not None, **shard_options)
+    print_shard_summary(stats, time.perf_counter() - start)
+    # Productos de shards que fallaron por completo: también van a la lista de fallidos
+    if retry_queue is not None:
+        for position, product_data in sorted(by_position.items()):
+            if position not in merged:
+                product_data["details_missing"] = MISSING_FAILED
+                retry_queue.add_dead_letter({
+                    "asin": product_data.get("asin"), "position": position, "url": product_data["url"],
+                    "title": product_data.get("title"), "attempts": 0, "error_type": "error",
+                    "history": [{"attempt": 0, "error_type": "error", "status": None, "error": "shard fallido"}],
+                    "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                })
+    return completed
+
+
+async def scrape_amazon_products(search_term: str, max_products: int = 50, debug: bool = False, detailed: bool = False, headless: bool = False, fast_extract: bool = True, block_profile: str = None, pool: BrowserPool = None, browser_endpoint: str = None, pipelined: bool = False, on_product=None, adaptive_concurrency: bool = True, http_details: bool = False, detail_cache: DetailCache = None, checkpoint: RunCheckpoint = None, limiter: AdaptiveLimiter = None, parallel_pages: int = 0, detail_shards: int = 0, previous: PreviousExtraction = None, governor: DomainGovernor = None, retry_queue: RetryQueue = None, deadline: float = None, priority: str = PRIORITY_POSITION, profile: BrowserProfile = None, capture: CaptureStore = None, network: NetworkRecorder = None, context_pages: int = DEFAULT_CONTEXT_PAGES, max_browser_mb: float = DEFAULT_MAX_BROWSER_MB):
     """
     Scraper de productos de Amazon con extracción paralela y asíncrona.
     
@@ -430,190 +1569,327 @@ async def scrape_amazon_products(search_term: str, max_products: int = 50, debug
         debug: Si es True, imprime información de depuración
         detailed: Si es True, visita cada producto para obtener más información (procesamiento paralelo)
         headless: Si es True, ejecuta el navegador sin ventana visible
+        fast_extract: Si es True, extrae todas las tarjetas de cada página de resultados, y cada
+            página de detalle, con un único page.evaluate en lugar de una consulta por campo
+        block_profile: Perfil de bloqueo de recursos ("lean", "aggressive"...) o None para cargar todo
+        pool: BrowserPool compartido del que tomar prestado un contexto caliente (opcional)
+        browser_endpoint: Endpoint CDP de un navegador ya arrancado al que conectarse (opcional)
+        pipelined: Si es True, pagina y extrae detalles a la vez (pipeline con colas acotadas)
+        on_product: Callback opcional llamado con cada producto terminado (solo en modo pipeline)
+        adaptive_concurrency: Si es True, la concurrencia de la FASE 3 se ajusta (AIMD) según
+            latencia y errores; si es False se mantiene fija en 5
+        http_details: Si es True, descarga las páginas de detalle por HTTP (httpx + selectolax)
+            y solo usa Playwright cuando la página necesita JavaScript
+        detail_cache: DetailCache opcional por ASIN; la FASE 3 solo visita fallos o entradas caducadas
+        checkpoint: RunCheckpoint opcional; guarda en disco cada página de resultados y cada
+            producto terminado, y si ya tiene progreso (--resume) se salta el trabajo completado
+        limiter: AdaptiveLimiter compartido entre varias búsquedas (límite global de páginas de
+            detalle, ej: batch_scrape.py); si no se indica se crea uno según adaptive_concurrency
+        parallel_pages: Si es > 0, la paginación construye las URLs &page=N y carga ese número de
+            páginas de resultados a la vez en pestañas separadas (ASIN repetidos descartados)
+        detail_shards: Si es > 1, la FASE 3 reparte las URLs de detalle en ese número de procesos,
+            cada uno con su propio navegador (no aplica al modo pipeline ni al limiter compartido)
+        previous: PreviousExtraction opcional (modo refresco); la FASE 3 solo visita los ASIN nuevos
+            o cuyo precio, valoración, reseñas... cambiaron, y el resto reutiliza sus detalles anteriores
+        governor: DomainGovernor de amazon.es compartido con el resto de trabajos; marca el ritmo de todas
+            las navegaciones y pausa/ralentiza el dominio al detectar páginas de robot check (opcional)
+        retry_queue: RetryQueue donde se reintentan (backoff exponencial con jitter) las páginas de detalle
+            fallidas y se anotan las que no se recuperan; main() la guarda junto a la extracción
+        deadline: Segundos disponibles para el scrape (None: sin límite); al agotarse se deja de paginar y
+            de empezar visitas de detalle, y se guardan los productos que falten marcados con "details_missing"
+        priority: Orden de la extracción de detalles: "position" (posición en la búsqueda), "reviews"
+            (más reseñas primero) o "uncached" (primero los que no están en caché ni en la extracción anterior)
+        profile: BrowserProfile opcional para el navegador propio (no aplica si se pasa un pool): cookies,
+            consentimiento y caché de disco de ejecuciones anteriores
+        capture: CaptureStore opcional (--capture); guarda el HTML de cada página de resultados y de detalle
+            para poder re-extraerlas sin red con reextract.py
+        network: NetworkRecorder opcional (--network-stats); anota cada petición del contexto (y de los
+            shards y el motor HTTP) con su tipo, host, bytes, estado y duración
+        context_pages: Páginas de detalle que sirve un contexto antes de sustituirlo por uno nuevo (0: sin límite)
+        max_browser_mb: RSS del navegador (MB) a partir del cual se sustituye el contexto de detalle (0: sin límite);
+            al renovarlo se espera a que terminen las visitas en marcha y la cola sigue en el contexto nuevo
     """
     products = []
+    budget = ScrapeBudget.from_seconds(deadline)
     
     print(f"🚀 Iniciando scraping para: {search_term}", flush=True)
     print(f"📦 Objetivo: {max_products} productos", flush=True)
     print(f"🖥️  Modo headless: {'Activado (sin ventana)' if headless else 'Desactivado (con ventana)'}", flush=True)
     print(f"⚡ Modo paralelo: {'Activado' if detailed else 'Desactivado (solo info básica)'}", flush=True)
+    if deadline is not None:
+        print(f"⏳ Deadline: {deadline:.0f}s | Prioridad de detalles: {priority}", flush=True)
     
-    async with async_playwright() as p:
-        print("🌐 Abriendo navegador...", flush=True)
-        browser = await p.chromium.launch(headless=headless)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        page = await context.new_page()
+    # Concurrencia de la FASE 3: adaptativa (AIMD) o fija en 5
+    if limiter is None:
+        limiter = AdaptiveLimiter() if adaptive_concurrency else AdaptiveLimiter(initial=5, min_limit=5, max_limit=5)
+    # Esperas por eventos (selector / URL) en lugar de pausas fijas, con registro de su duración
+    waits = WaitEngine(AMAZON)
+    if retry_queue is None:
+        retry_queue = RetryQueue()
+    
+    async with AsyncExitStack() as stack:
+        if pool is None:
+            # Sin pool compartido: navegador propio (o conexión CDP) solo para esta ejecución
+            print("🌐 Abriendo navegador...", flush=True)
+            pool = await stack.enter_async_context(
+                BrowserPool(max_browsers=1, headless=headless, launch_args=[], browser_endpoint=browser_endpoint,
+                            profile=profile)
+            )
+        context = await stack.enter_async_context(pool.context(user_agent=BROWSER_USER_AGENT))
         
-        # Navegar a Amazon
-        search_url = f"https://www.amazon.es/s?k={search_term.replace(' ', '+')}"
-        print(f"🔍 Navegando a Amazon.es...", flush=True)
-        await page.goto(search_url, wait_until="domcontentloaded")
-        print(f"✅ Página cargada, extrayendo productos...", flush=True)
-        await page.wait_for_timeout(2000)
+        # Modo lean: bloquear imágenes, fuentes, vídeos y trackers en todas las pestañas
+        blocker = None
+        if block_profile:
+            blocker = ResourceBlocker(block_profile)
+            await blocker.attach(context)
+        # Contabilidad de red por petición; el contexto vuelve al pool sin sus listeners
+        if network is not None:
+            network.attach(context)
+            stack.callback(network.detach)
         
-        page_num = 1
-        all_product_elements = []
+        # Motor HTTP para las páginas de detalle (con respaldo de Playwright)
+        http_engine = None
+        if detailed and http_details:
+            http_engine = await stack.enter_async_context(HttpDetailEngine(max_connections=limiter.max_limit * 2,
+                                                                                capture=capture, network=network))
         
-        # FASE 1: Recopilar todos los elementos de productos de todas las páginas
-        print(f"\n📋 FASE 1: Recopilando URLs de productos...", flush=True)
-        while len(all_product_elements) < max_products:
-            print(f"📄 Página {page_num}...", flush=True)
-            
-            # Esperar a que los productos se carguen
-            await page.wait_for_selector('[data-component-type="s-search-result"]', timeout=10000)
-            
-            # Extraer elementos de productos
-            product_elements = await page.query_selector_all('[data-component-type="s-search-result"]')
-            print(f"   Encontrados {len(product_elements)} productos", flush=True)
-            
-            # Añadir a la lista general
-            for element in product_elements:
-                if len(all_product_elements) >= max_products:
-                    break
-                all_product_elements.append(element)
-            
-            print(f"   Total acumulado: {len(all_product_elements)}/{max_products}", flush=True)
-            
-            # Verificar si necesitamos más productos y hay siguiente página
-            if len(all_product_elements) < max_products:
-                next_button = await page.query_selector("a.s-pagination-next")
-                if next_button:
-                    is_disabled = await next_button.get_attribute("aria-disabled")
-                    if is_disabled != "true":
-                        print(f"   ➡️  Navegando a página {page_num + 1}...", flush=True)
-                        await next_button.click()
-                        await page.wait_for_timeout(2000)
-                        page_num += 1
-                    else:
-                        print("   📍 No hay más páginas disponibles", flush=True)
-                        break
-                else:
-                    print("   📍 No se encontró botón de siguiente página", flush=True)
-                    break
-            else:
-                break
+        page = await context.new_page()
         
-        print(f"\n✅ FASE 1 completada: {len(all_product_elements)} productos encontrados", flush=True)
+        # Navegar a Amazon (al reanudar, iter_search_result_pages vuelve al cursor guardado)
+        if checkpoint is None or checkpoint.cursor is None:
+            print(f"🔍 Navegando a Amazon.es...", flush=True)
+            if governor is not None:
+                await governor.acquire()
+            load_start = time.perf_counter()
+            await page.goto(search_page_url(search_term), wait_until="domcontentloaded")
+            await waits.wait(page, "search_results")
+            load_seconds = time.perf_counter() - load_start
+            if pool.profile is not None:
+                pool.profile.record_first_load(load_seconds)
+            print(f"✅ Página cargada en {load_seconds:.2f}s, extrayendo productos...", flush=True)
         
-        # FASE 2: Extraer información básica en paralelo (batch processing)
-        print(f"\n⚡ FASE 2: Extrayendo información básica en paralelo...", flush=True)
+        # Pestañas de detalle reutilizables, tantas como el límite máximo de concurrencia, en un contexto propio
+        # que se renueva por páginas servidas o por memoria (se abre tras la primera página y copia sus cookies)
+        page_pool = None
+        if detailed and (pipelined or detail_shards <= 1):
+            async def setup_detail_context(detail_context):
+                if blocker:
+                    await blocker.attach(detail_context)
+                if network is not None:
+                    network.attach(detail_context)
+            
+            page_pool = RecyclingPagePool(pool, {"user_agent": BROWSER_USER_AGENT}, context,
+                                          max_pages=limiter.max_limit, max_context_pages=context_pages,
+                                          max_browser_mb=max_browser_mb, setup=setup_detail_context)
+            stack.push_async_callback(page_pool.close)
+            await page_pool.start()
         
-        # Procesar en lotes para no sobrecargar
-        batch_size = 10
-        products_data = []
+        if pipelined:
+            if detail_shards > 1:
+                print(f"⚠️  --shards no aplica al modo pipeline: detalles en este proceso", flush=True)
+            print(f"\n🚰 Modo pipeline: paginación, información básica y detalles en paralelo...", flush=True)
+            products = await run_scrape_pipeline(
+                context, page, search_term, max_products, detailed,
+                fast_extract=fast_extract, debug=debug, on_product=on_product, limiter=limiter,
+                http_engine=http_engine, detail_cache=detail_cache, checkpoint=checkpoint, waits=waits,
+                parallel_pages=parallel_pages, previous=previous, page_pool=page_pool, governor=governor,
+                retry_queue=retry_queue, budget=budget, priority=priority, capture=capture
+            )
+            print(f"\n✅ Pipeline completado: {len(products)} productos", flush=True)
+            if detailed:
+                retry_queue.print_summary()
+                limiter.print_summary()
+                page_pool.print_summary()
+            if http_engine:
+                http_engine.print_summary()
+            if detail_cache:
+                detail_cache.print_summary()
+            if previous is not None:
+                previous.print_summary()
+            if governor is not None:
+                governor.print_summary()
+            if capture is not None:
+                capture.print_summary()
+            budget.print_summary()
+            waits.print_summary()
+            if blocker:
+                blocker.print_summary()
+            if network is not None:
+                network.print_summary()
+            return products[:max_products]
         
-        for i in range(0, len(all_product_elements), batch_size):
-            batch = all_product_elements[i:i+batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (len(all_product_elements) + batch_size - 1) // batch_size
-            
-            print(f"   Lote {batch_num}/{total_batches} ({len(batch)} productos)...", flush=True)
-            
-            # Crear tareas para procesar este lote en paralelo
-            tasks = [
-                extract_product_basic_info(element, search_term, i + idx + 1, debug)
-                for idx, element in enumerate(batch)
-            ]
-            
-            # Ejecutar todas las tareas del lote en paralelo
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Filtrar resultados válidos
-            for result in batch_results:
-                if result and not isinstance(result, Exception):
-                    products_data.append(result)
-            
-            print(f"   ✓ Lote {batch_num} completado ({len([r for r in batch_results if r and not isinstance(r, Exception)])} válidos)", flush=True)
+        # FASE 1: Recorrer las páginas de resultados extrayendo la información básica de cada una
+        print(f"\n📋 FASE 1: Recopilando productos de las páginas de resultados...", flush=True)
+        pages = iter_search_pages(context, page, search_term, max_products, fast_extract, debug, checkpoint, waits,
+                                  parallel_pages, governor, capture)
+        try:
+            async for page_products in pages:
+                products.extend(page_products)
+                if budget.expired():
+                    budget.stats["pagination_stopped"] = True
+                    print(f"⏳ Deadline alcanzado: se deja de paginar con {len(products)} productos", flush=True)
+                    break
+        finally:
+            await pages.aclose()
         
-        products.extend(products_data)
-        print(f"\n✅ FASE 2 completada: {len(products)} productos con información básica", flush=True)
+        print(f"\n✅ FASE 1 completada: {len(products)} productos con información básica", flush=True)
         
         # FASE 3: Si modo detallado, extraer información adicional en paralelo
-        if detailed and products:
+        if detailed and products and detail_shards > 1:
+            print(f"\n🔍 FASE 3: Extrayendo información detallada en {detail_shards} procesos...", flush=True)
+            completed = await run_sharded_detail_phase(
+                products, detail_shards, detail_cache=detail_cache, checkpoint=checkpoint, previous=previous,
+                retry_queue=retry_queue, budget=budget, priority=priority, network=network,
+                max_attempts=retry_queue.max_attempts,
+                fast_extract=fast_extract, headless=headless,
+                block_profile=block_profile, http_details=http_details, adaptive_concurrency=adaptive_concurrency,
+                user_agent=BROWSER_USER_AGENT, max_rate=governor.max_rate if governor is not None else 0,
+                context_pages=context_pages, max_browser_mb=max_browser_mb,
+                capture_run=(search_term, capture.run_id) if capture is not None else None
+            )
+            print(f"\n✅ FASE 3 completada: {completed}/{len(products)} productos con información detallada", flush=True)
+            retry_queue.print_summary()
+            if detail_cache:
+                detail_cache.print_summary()
+            if previous is not None:
+                previous.print_summary()
+        elif detailed and products:
             print(f"\n🔍 FASE 3: Extrayendo información detallada en paralelo...", flush=True)
-            print(f"   Procesando {len(products)} productos con {len(products)//5 + 1} conexiones simultáneas", flush=True)
-            
-            # Crear tareas para extraer información detallada en paralelo
-            # Limitar concurrencia a 5 para no sobrecargar
-            semaphore = asyncio.Semaphore(5)
+            print(f"   Procesando {len(products)} productos con concurrencia adaptativa "
+                  f"(inicial {limiter.limit}, máx {limiter.max_limit})", flush=True)
             
             async def extract_with_limit(product_data, idx):
-                async with semaphore:
-                    if product_data.get("url") and product_data["url"] != "N/A":
-                        print(f"   [{idx+1}/{len(products)}] {product_data['title'][:40]}...", flush=True)
-                        detailed_info = await extract_detailed_product_info(context, product_data["url"])
-                        
-                        # Actualizar marca si se encontró en la página de detalle
-                        if detailed_info.get("brand") and detailed_info["brand"] != "N/A":
-                            product_data["brand"] = detailed_info["brand"]
-                        
-                        # Añadir el resto de información detallada
-                        product_data.update(detailed_info)
-                        return True
+                """
+                True si el producto tiene detalles, False si se agotaron los intentos, None si no tiene URL
+                y MISSING_DEADLINE si el deadline pasó antes de visitarlo
+                """
+                if not product_data.get("url") or product_data["url"] == "N/A":
+                    return None
+                # Terminado en una ejecución anterior (--resume)
+                if checkpoint is not None and checkpoint.is_completed(product_data):
+                    product_data.update(checkpoint.completed[product_data["position"]])
+                    return True
+                # Sin cambios desde la extracción anterior (refresco) o aciertos de caché: no hace falta visitar la página
+                if apply_previous_details(product_data, previous) or apply_cached_details(product_data, detail_cache):
+                    return True
+                
+                async def attempt(attempt_num):
+                    # Cada intento reserva su hueco: durante el backoff lo usan otros productos
+                    async with limiter.slot() as slot:
+                        if budget.expired():
+                            # Sin tiempo: el hueco se libera sin registrar ningún resultado
+                            slot["outcome"] = None
+                        else:
+                            if attempt_num == 1:
+                                print(f"   [{idx+1}/{len(products)}] {product_data['title'][:40]}...", flush=True)
+                            outcome = {}
+                            detailed_info = await fetch_product_details(context, product_data["url"], outcome,
+                                                                        http_engine, waits, page_pool, governor,
+                                                                        fast_extract, capture)
+                            slot["outcome"] = outcome["kind"]
+                            return detailed_info, outcome
+                    raise BudgetExhausted()
+                
+                try:
+                    detailed_info, outcome = await retry_queue.run(product_data, attempt, budget)
+                except BudgetExhausted:
+                    budget.skip(product_data)
+                    return MISSING_DEADLINE
+                merge_detailed_info(product_data, detailed_info)
+                cache_detailed_info(detail_cache, product_data, detailed_info, outcome)
+                if outcome["kind"] != OUTCOME_OK:
+                    product_data["details_missing"] = MISSING_FAILED
                     return False
+                if checkpoint is not None:
+                    checkpoint.record_completed(product_data)
+                return True
             
-            # Ejecutar todas las extracciones detalladas en paralelo (con límite de 5 simultáneas)
-            detail_tasks = [extract_with_limit(product, idx) for idx, product in enumerate(products)]
+            # Ejecutar todas las extracciones detalladas en paralelo (el limitador regula cuántas a la vez);
+            # las tareas se crean por orden de prioridad, que es el orden en que obtienen hueco
+            ordered = order_by_priority(products, priority, lambda product_data: details_known(product_data, previous,
+                                                                                               detail_cache))
+            detail_tasks = [extract_with_limit(product, idx) for idx, product in enumerate(ordered)]
             detail_results = await asyncio.gather(*detail_tasks, return_exceptions=True)
             
-            completed = sum(1 for r in detail_results if r and not isinstance(r, Exception))
-            print(f"\n✅ FASE 3 completada: {completed}/{len(products)} productos con información detallada", flush=True)
+            completed = sum(1 for r in detail_results if r is True)
+            failed = sum(1 for r in detail_results if r is False or isinstance(r, Exception))
+            skipped = sum(1 for r in detail_results if r == MISSING_DEADLINE)
+            for r in detail_results:
+                if isinstance(r, Exception):
+                    print(f"   ⚠️ Error inesperado en la FASE 3: {r}", flush=True)
+            print(f"\n✅ FASE 3 completada: {completed}/{len(products)} productos con información detallada"
+                  f"{f' ({failed} sin detalles tras los reintentos)' if failed else ''}"
+                  f"{f' ({skipped} sin visitar por el deadline)' if skipped else ''}", flush=True)
+            retry_queue.print_summary()
+            limiter.print_summary()
+            page_pool.print_summary()
+            if http_engine:
+                http_engine.print_summary()
+            if detail_cache:
+                detail_cache.print_summary()
+            if previous is not None:
+                previous.print_summary()
         
-        await browser.close()
+        if governor is not None:
+            governor.print_summary()
+        if capture is not None:
+            capture.print_summary()
+        budget.print_summary()
+        waits.print_summary()
+        if blocker:
+            blocker.print_summary()
+        if network is not None:
+            network.print_summary()
     
     return products[:max_products]
 
 
-def save_to_json(data: list, filename: str = "amazon_products.json"):
+def amazon_output_path(search_term: str) -> str:
+    """Ruta del fichero de extracción (JSON Lines) de un término de búsqueda"""
+    return f"data/extractions/amazon/amazon_{search_term.replace(' ', '_')}.jsonl"
+
+
+def save_to_json(data: list, filename: str = "amazon_products.jsonl", replace: bool = False,
+                 previous: PreviousExtraction = None):
     """
-    Guarda los datos en un archivo JSON, evitando duplicados.
-    Si el archivo existe, solo añade productos nuevos (por ASIN).
+    Guarda los datos en el almacén JSON Lines, evitando duplicados.
+    Solo se añaden al final los productos nuevos (por ASIN); el índice de ASIN
+    evita releer el fichero completo. Si existe el .json antiguo se importa.
+    Con replace=True (modo refresco) los productos que cambiaron se guardan como versión nueva;
+    los que solo cambiaron de posición o de URL de búsqueda no añaden otra línea. Con previous,
+    los productos cuya nueva visita de detalle falló conservan los detalles anteriores.
     """
-    from pathlib import Path
-    
-    filepath = Path(filename)
-    existing_data = []
-    existing_asins = set()
-    
-    # Leer datos existentes si el archivo existe
-    if filepath.exists():
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-                existing_asins = {item.get('asin') for item in existing_data if item.get('asin')}
-            print(f"📂 Archivo existente encontrado con {len(existing_data)} productos", flush=True)
-        except Exception as e:
-            print(f"⚠️  Error leyendo archivo existente: {e}", flush=True)
-    
-    # Filtrar productos nuevos (por ASIN)
-    new_products = []
-    duplicates = 0
-    
-    for product in data:
-        asin = product.get('asin')
-        if asin and asin != 'N/A' and asin not in existing_asins:
-            new_products.append(product)
-            existing_asins.add(asin)
-        else:
-            duplicates += 1
-    
-    # Combinar datos existentes + nuevos
-    combined_data = existing_data + new_products
-    
-    # Guardar
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(combined_data, f, ensure_ascii=False, indent=2)
+    if previous is not None:
+        previous.restore_failed(data)
+    store = ExtractionStore(filename)
+    added, duplicates = store.append(data, replace=replace, compare_fields=CONTENT_FIELDS if replace else None)
     
     # Reportar resultados
-    if new_products:
-        print(f"✅ {len(new_products)} productos nuevos añadidos", flush=True)
+    if added:
+        print(f"✅ {added} productos nuevos añadidos", flush=True)
     if duplicates > 0:
         print(f"⏭️  {duplicates} productos duplicados omitidos", flush=True)
     
-    print(f"💾 Total en archivo: {len(combined_data)} productos", flush=True)
-    print(f"📄 Guardado en: {filename}", flush=True)
+    print(f"💾 Total en archivo: {store.count()} productos", flush=True)
+    print(f"📄 Guardado en: {store.path}", flush=True)
+
+
+def get_detail_shards(argv: list = None) -> int:
+    """Procesos de la FASE 3 pedidos con --shards[=N] (un proceso por núcleo si no se indica N, 0 si no se pide)"""
+    argv = sys.argv if argv is None else argv
+    value = get_cli_option("shards", argv=argv)
+    if value and value.isdigit():
+        return int(value)
+    return (os.cpu_count() or 1) if "--shards" in argv else 0
+
+
+def get_parallel_pages(argv: list = None) -> int:
+    """Páginas de resultados simultáneas pedidas con --parallel-pages[=N] (0 si no se pide)"""
+    argv = sys.argv if argv is None else argv
+    value = get_cli_option("parallel-pages", argv=argv)
+    if value and value.isdigit():
+        return int(value)
+    return DEFAULT_PAGE_CONCURRENCY if "--parallel-pages" in argv else 0
 
 
 async def main():
@@ -621,14 +1897,45 @@ async def main():
     print("🛒 Amazon Product Scraper")
     print("=" * 50)
     
+    # Reanudar una ejecución anterior: término y parámetros salen del checkpoint
+    resume_run_id = get_cli_option("resume")
+    checkpoint = None
+    
     # Verificar si se pasa el término como argumento
-    if len(sys.argv) > 1:
-        search_term = sys.argv[1]
-        # Segundo argumento opcional: número de productos
-        iterations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ITERATIONS
-        detailed = True  # Modo detallado por defecto desde API
+    if resume_run_id or len(sys.argv) > 1:
+        if resume_run_id:
+            checkpoint = RunCheckpoint.load(resume_run_id)
+            checkpoint.print_resume_info()
+            search_term = checkpoint.search_term
+            iterations = checkpoint.params.get("max_products", DEFAULT_ITERATIONS)
+            detailed = checkpoint.params.get("detailed", True)
+        else:
+            search_term = sys.argv[1]
+            # Segundo argumento opcional: número de productos
+            iterations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ITERATIONS
+            detailed = True  # Modo detallado por defecto desde API
         debug = False
         headless_mode = "--headless" in sys.argv
+        fast_extract = "--legacy-extract" not in sys.argv
+        block_profile = get_block_profile()
+        browser_endpoint = get_cli_option("browser-endpoint")
+        pipelined = "--pipeline" in sys.argv
+        parallel_pages = get_parallel_pages()
+        detail_shards = get_detail_shards()
+        adaptive_concurrency = "--fixed-concurrency" not in sys.argv
+        http_details = "--http-details" in sys.argv
+        use_cache = "--cache" in sys.argv
+        cache_ttl_hours = float(get_cli_option("cache-ttl", 24))
+        refresh = "--refresh" in sys.argv
+        use_governor = "--no-governor" not in sys.argv
+        max_rate = float(get_cli_option("max-rate", DEFAULT_MAX_RATE))
+        max_attempts = int(get_cli_option("max-attempts", DEFAULT_MAX_ATTEMPTS))
+        deadline = get_deadline()
+        priority = get_priority()
+        profile = get_browser_profile("amazon")
+        capture_html = "--capture" in sys.argv
+        network_stats = "--network-stats" in sys.argv
+        context_pages, max_browser_mb = get_memory_limits()
         print(f"🖥️  Modo: {'Headless (sin ventana)' if headless_mode else 'Con ventana visible'}")
     else:
         # Solicitar término de búsqueda al usuario
@@ -651,17 +1958,83 @@ async def main():
         debug = debug_input in ['s', 'si', 'sí', 'y', 'yes']
         
         headless_mode = False  # Por defecto con ventana en modo interactivo
+        fast_extract = True
+        block_profile = None
+        browser_endpoint = None
+        pipelined = False
+        parallel_pages = 0
+        detail_shards = 0
+        adaptive_concurrency = True
+        http_details = False
+        use_cache = False
+        cache_ttl_hours = 24
+        refresh = False
+        use_governor = True
+        max_rate = DEFAULT_MAX_RATE
+        max_attempts = DEFAULT_MAX_ATTEMPTS
+        deadline = None
+        priority = PRIORITY_POSITION
+        profile = None
+        capture_html = False
+        network_stats = False
+        context_pages, max_browser_mb = DEFAULT_CONTEXT_PAGES, DEFAULT_MAX_BROWSER_MB
     
     if detailed:
         print("\n⏱️  AVISO: El modo detallado visita cada producto individualmente.")
         print(f"   Esto puede tardar varios minutos para {iterations} productos.\n")
     
+    # Caché de detalles por ASIN (opcional)
+    detail_cache = DetailCache(ttl_seconds=cache_ttl_hours * 3600) if use_cache and detailed else None
+    
+    # Modo refresco: solo se revisitan los productos nuevos o cuyo listado cambió
+    filename = amazon_output_path(search_term)
+    previous = PreviousExtraction.load(filename) if refresh and detailed else None
+    
+    # Ritmo de amazon.es compartido con el resto de scrapes en marcha (se pausa ante robot checks)
+    governor = DomainGovernor(AMAZON_DOMAIN, max_rate=max_rate) if use_governor else None
+    # Reintentos de las páginas de detalle; los que no se recuperan se guardan junto a la extracción
+    retry_queue = RetryQueue(max_attempts=max_attempts)
+    
+    # Checkpoint de la ejecución para poder reanudarla si se interrumpe
+    if checkpoint is None:
+        checkpoint = RunCheckpoint.create("amazon", search_term, {"max_products": iterations, "detailed": detailed})
+    print(f"🆔 Run ID: {checkpoint.run_id} (reanudar con: python main.py --resume {checkpoint.run_id})", flush=True)
+    # HTML de las páginas visitadas, para re-extraer sin red (reextract.py); al reanudar sigue en la misma ejecución
+    capture = CaptureStore("amazon", search_term, run_id=checkpoint.run_id) if capture_html else None
+    # Peticiones de red por tipo de página y host, guardadas junto a la extracción
+    network = NetworkRecorder("amazon") if network_stats else None
+    
     # Scraping
-    products = await scrape_amazon_products(search_term, max_products=iterations, debug=debug, detailed=detailed, headless=headless_mode)
+    try:
+        products = await scrape_amazon_products(search_term, max_products=iterations, debug=debug, detailed=detailed, headless=headless_mode, fast_extract=fast_extract, block_profile=block_profile, browser_endpoint=browser_endpoint, pipelined=pipelined, adaptive_concurrency=adaptive_concurrency, http_details=http_details, detail_cache=detail_cache, checkpoint=checkpoint, parallel_pages=parallel_pages, detail_shards=detail_shards, previous=previous, governor=governor, retry_queue=retry_queue, deadline=deadline, priority=priority, profile=profile, capture=capture, network=network, context_pages=context_pages, max_browser_mb=max_browser_mb)
+    except BaseException:
+        print(f"\n💾 Progreso guardado. Reanuda con: python main.py --resume {checkpoint.run_id}", flush=True)
+        raise
+    finally:
+        if detail_cache:
+            detail_cache.close()
+        if governor is not None:
+            governor.close()
+        if profile is not None:
+            profile.close()
+            profile.print_summary()
+        if capture is not None:
+            capture.close()
     
     # Guardar resultados
-    filename = f"data/extractions/amazon/amazon_{search_term.replace(' ', '_')}.json"
-    save_to_json(products, filename)
+    save_to_json(products, filename, replace=refresh, previous=previous)
+    if detailed:
+        retry_queue.save_dead_letters(filename)
+    if network is not None:
+        network.save(filename)
+    deadline_skipped = sum(1 for product in products if product.get("details_missing") == MISSING_DEADLINE)
+    if checkpoint.pagination_done and not deadline_skipped:
+        checkpoint.finish()
+    elif deadline_skipped:
+        print(f"⏳ {deadline_skipped} productos sin detalles por el deadline. "
+              f"Complétalos con: python main.py --resume {checkpoint.run_id}", flush=True)
+    else:
+        print(f"⚠️  Paginación incompleta. Reanuda con: python main.py --resume {checkpoint.run_id}", flush=True)
     
     print(f"\n✨ Scraping completado!")
     print(f"📊 Total de productos extraídos: {len(products)}")
@@ -0,0 +1,288 @@
+"""
+Renovación del contexto de detalle y vigilancia de memoria en ejecuciones largas
+
+Un contexto que sirve cientos de páginas de detalle hace crecer la memoria de
+Chromium (cachés del renderer, historial, objetos que no se liberan) hasta que
+las visitas empiezan a dar timeout. RecyclingPagePool sirve las pestañas de
+detalle desde un contexto propio tomado del BrowserPool y lo sustituye por uno
+nuevo cuando ha servido max_context_pages páginas o el RSS de los procesos del
+navegador (leído de /proc) pasa de max_browser_mb: deja de dar pestañas, espera
+a que terminen las visitas en marcha, cierra el contexto y abre otro con las
+cookies del contexto principal. Limitador, reintentos y tareas pendientes no se
+tocan: las visitas que esperaban siguen en el contexto nuevo.
+
+El RSS es el de los procesos hijos de este proceso (driver de Playwright y
+Chromium): con --browser-endpoint el navegador no es hijo y solo cuenta el
+umbral de páginas.
+"""
+import asyncio
+import os
+import time
+
+from browser_profile import MODE_PERSISTENT
+from page_pool import DEFAULT_MAX_USES, PagePool
+
+DEFAULT_CONTEXT_PAGES = 250  # Páginas de detalle que sirve un contexto antes de renovarlo
+DEFAULT_MAX_BROWSER_MB = 1500  # RSS del navegador a partir del cual se renueva el contexto
+DEFAULT_CHECK_INTERVAL = 5.0  # Segundos entre lecturas de /proc
+MIN_PAGES_BETWEEN_MEMORY_RECYCLES = 25  # Páginas mínimas entre renovaciones por memoria (se duplican si no baja)
+
+REASON_PAGES = "páginas"
+REASON_MEMORY = "memoria"
+
+
+def rss_kb(pid) -> int:
+    """RSS (KB) de un proceso ("self" para este), 0 si no existe o no se puede leer"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    return 0
+
+
+def children_rss_mb(root_pid: int = None) -> float:
+    """RSS (MB) de todos los descendientes de root_pid (por defecto este proceso)"""
+    root_pid = root_pid or os.getpid()
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # El nombre del proceso va entre paréntesis y puede contener espacios
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, PermissionError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    pending = list(children.get(root_pid, []))
+    while pending:
+        pid = pending.pop()
+        total_kb += rss_kb(pid)
+        pending.extend(children.get(pid, []))
+    return total_kb / 1024
+
+
+def browser_rss_mb() -> float:
+    """RSS (MB) del driver de Playwright y Chromium lanzados por este proceso (None fuera de Linux)"""
+    try:
+        return children_rss_mb()
+    except OSError:
+        return None
+
+
+class RecyclingPagePool(PagePool):
+    """Pool de pestañas de detalle con contexto propio que se renueva por páginas servidas o por memoria"""
+
+    def __init__(self, pool=None, context_options: dict = None, context=None, max_pages: int = 1,
+                 max_uses: int = DEFAULT_MAX_USES, max_context_pages: int = DEFAULT_CONTEXT_PAGES,
+                 max_browser_mb: float = DEFAULT_MAX_BROWSER_MB, setup=None,
+                 check_interval: float = DEFAULT_CHECK_INTERVAL):
+        """
+        Args:
+            pool: BrowserPool del que tomar los contextos de detalle (None: no se renueva, solo se mide la memoria)
+            context_options: Opciones de new_context de los contextos de detalle (user_agent, viewport...)
+            context: Contexto principal; da las cookies a cada contexto nuevo y es el de las pestañas
+                si no se renueva (sin pool, umbrales a 0 o perfil persistente)
+            max_pages: Pestañas abiertas a la vez como máximo (límite de concurrencia)
+            max_uses: Navegaciones que sirve una pestaña antes de reciclarse
+            max_context_pages: Páginas que sirve un contexto antes de renovarlo (0: sin límite)
+            max_browser_mb: RSS del navegador (MB) a partir del cual se renueva el contexto (0: sin límite)
+            setup: Corrutina setup(contexto) para preparar cada contexto nuevo (bloqueo de recursos,
+                contabilidad de red...)
+            check_interval: Segundos entre lecturas del RSS
+        """
+        super().__init__(context, max_pages, max_uses)
+        self.pool = pool
+        self.context_options = context_options or {}
+        self.main_context = context
+        self.max_context_pages = max_context_pages
+        self.max_browser_mb = max_browser_mb
+        self.setup = setup
+        self.check_interval = check_interval
+
+        self._manager = None  # Préstamo del contexto de detalle actual (pool.context)
+        self._in_use = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._swapped = asyncio.Event()
+        self._swapped.set()
+        self._recycling = False
+        self._last_check = 0.0
+        self._context_pages = 0
+        self._memory_min_pages = MIN_PAGES_BETWEEN_MEMORY_RECYCLES
+        self.memory = {"recycles": 0, "by_pages": 0, "by_memory": 0, "drain_seconds": 0.0,
+                       "longest_context_pages": 0, "initial_mb": None, "peak_mb": None, "last_mb": None}
+
+    @property
+    def recycling(self) -> bool:
+        return self.pool is not None and bool(self.max_context_pages or self.max_browser_mb)
+
+    async def start(self):
+        """Abre el contexto de detalle propio (si se renueva) y toma la primera medida de memoria"""
+        if self.recycling and self.pool.profile is not None and self.pool.profile.mode == MODE_PERSISTENT:
+            print("⚠️  El perfil persistente solo admite un contexto: el contexto de detalle no se renueva",
+                  flush=True)
+            self.pool = None
+        if self.recycling:
+            self.context = await self._open_context()
+        await self._sample_memory()
+        return self
+
+    async def _open_context(self):
+        manager = self.pool.context(**self.context_options)
+        context = await manager.__aenter__()
+        self._manager = manager
+        if self.main_context is not None:
+            try:
+                # Misma sesión que el contexto principal (idioma, consentimiento, código postal...)
+                await context.add_cookies(await self.main_context.cookies())
+            except Exception:
+                pass
+        if self.setup is not None:
+            await self.setup(context)
+        return context
+
+    async def _close_context(self):
+        if self._manager is None:
+            return
+        manager, self._manager = self._manager, None
+        # Un contexto que se renueva no vuelve a los ociosos del pool: se cierra
+        self.context.broken = True
+        try:
+            await manager.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+    async def _sample_memory(self):
+        self._last_check = time.monotonic()
+        mb = await asyncio.to_thread(browser_rss_mb)
+        if mb is None:
+            return
+        memory = self.memory
+        memory["last_mb"] = mb
+        if memory["initial_mb"] is None:
+            memory["initial_mb"] = mb
+        memory["peak_mb"] = max(memory["peak_mb"] or 0.0, mb)
+
+    async def _recycle_reason(self):
+        if time.monotonic() - self._last_check >= self.check_interval:
+            await self._sample_memory()
+        if not self.recycling:
+            return None
+        if self.max_context_pages and self._context_pages >= self.max_context_pages:
+            return REASON_PAGES
+        last_mb = self.memory["last_mb"]
+        if (self.max_browser_mb and last_mb is not None and last_mb >= self.max_browser_mb
+                and self._context_pages >= self._memory_min_pages):
+            return REASON_MEMORY
+        return None
+
+    async def _wait_for_turn(self):
+        """Espera a que termine una renovación en curso, o la hace si se ha pasado algún umbral"""
+        while True:
+            if self._recycling:
+                await self._swapped.wait()
+                continue
+            reason = await self._recycle_reason()
+            if self._recycling:
+                continue
+            if reason is not None:
+                await self._recycle(reason)
+            return
+
+    async def _recycle(self, reason: str):
+        self._recycling = True
+        self._swapped.clear()
+        try:
+            # Drenaje: las visitas en marcha terminan en el contexto actual
+            in_flight = self._in_use
+            start = time.perf_counter()
+            await self._drained.wait()
+            drain_seconds = time.perf_counter() - start
+            before_mb = self.memory["last_mb"]
+
+            await PagePool.close(self)
+            self._uses.clear()
+            await self._close_context()
+            self.context = await self._open_context()
+
+            served, self._context_pages = self._context_pages, 0
+            memory = self.memory
+            memory["recycles"] += 1
+            memory["by_pages" if reason == REASON_PAGES else "by_memory"] += 1
+            memory["drain_seconds"] += drain_seconds
+            memory["longest_context_pages"] = max(memory["longest_context_pages"], served)
+            await self._sample_memory()
+            if reason == REASON_MEMORY and memory["last_mb"] is not None:
+                # Si la memoria no baja con un contexto nuevo (otros contextos, fugas del navegador), se renueva
+                # cada vez con menos frecuencia en lugar de hacerlo en bucle
+                if memory["last_mb"] >= self.max_browser_mb:
+                    self._memory_min_pages *= 2
+                else:
+                    self._memory_min_pages = MIN_PAGES_BETWEEN_MEMORY_RECYCLES
+            memory_change = ""
+            if before_mb is not None and memory["last_mb"] is not None:
+                memory_change = f", navegador {before_mb:.0f} → {memory['last_mb']:.0f} MB"
+            print(f"♻️  Contexto de detalle renovado por {reason} tras {served} páginas{memory_change} "
+                  f"(esperadas {in_flight} visitas en {drain_seconds:.1f}s)", flush=True)
+        finally:
+            self._recycling = False
+            self._swapped.set()
+
+    async def acquire(self):
+        await self._wait_for_turn()
+        self._in_use += 1
+        self._drained.clear()
+        try:
+            page = await super().acquire()
+        except BaseException:
+            self._page_done()
+            raise
+        self._context_pages += 1
+        return page
+
+    async def release(self, page, failed: bool = False):
+        try:
+            await super().release(page, failed)
+        finally:
+            self._page_done()
+
+    def _page_done(self):
+        self._in_use -= 1
+        if self._in_use == 0:
+            self._drained.set()
+
+    async def close(self):
+        """Cierra las pestañas ociosas y el contexto de detalle propio (con una última medida de memoria)"""
+        await self._sample_memory()
+        await super().close()
+        await self._close_context()
+
+    def summary(self) -> dict:
+        """Estadísticas del pool de pestañas y de memoria (RSS del navegador en MB, renovaciones del contexto)"""
+        memory = self.memory
+        rounded = {key: round(memory[key], 1) if memory[key] is not None else None
+                   for key in ("initial_mb", "peak_mb", "last_mb", "drain_seconds")}
+        return {**super().summary(), "memory": {**memory, **rounded, "recycling": self.recycling,
+                                                "context_pages": self._context_pages,
+                                                "max_context_pages": self.max_context_pages,
+                                                "max_browser_mb": self.max_browser_mb}}
+
+    def print_summary(self):
+        """Imprime las estadísticas del pool de pestañas y de memoria del navegador"""
+        super().print_summary()
+        memory = self.summary()["memory"]
+        if memory["initial_mb"] is None:
+            return
+        if memory["recycling"]:
+            recycles = (f"{memory['recycles']} contextos de detalle renovados ({memory['by_pages']} por páginas, "
+                        f"{memory['by_memory']} por memoria, drenaje {memory['drain_seconds']:.1f}s)")
+        else:
+            recycles = "sin renovación del contexto"
+        print(f"🧠 Memoria del navegador: {memory['initial_mb']:.0f} MB al empezar, pico {memory['peak_mb']:.0f} MB, "
+              f"{memory['last_mb']:.0f} MB al final | {recycles}", flush=True)
@@ -0,0 +1,252 @@
+"""
+Contabilidad de red por petición de los contextos de Playwright
+
+Con --network-stats cada petición de las pestañas del contexto (y cada descarga
+del motor HTTP) se anota con su tipo de recurso, host, bytes transferidos,
+código de estado y duración. Al terminar, el resumen agrupado por tipo de
+página (resultados / detalle) y por host se guarda junto a la extracción,
+amazon_<término>.network.json, para decidir qué bloquear (resource_blocker.py)
+y qué cachear.
+
+El tipo de página sale de la URL de la pestaña que hace la petición (o de la
+propia URL en las navegaciones), así que no hace falta etiquetar las pestañas.
+"""
+import heapq
+import json
+import re
+from pathlib import Path
+from urllib.parse import urlparse
+
+from extraction_store import NETWORK_STATS_SUFFIX
+from html_capture import KIND_DETAIL, KIND_SEARCH
+
+KIND_OTHER = "other"
+
+# Patrones de URL de página → tipo de página, por sitio (el primero que coincide)
+PAGE_KIND_PATTERNS = {
+    "amazon": [
+        (re.compile(r"/(?:dp|gp/product)/"), KIND_DETAIL),
+        (re.compile(r"/s\?|/s/"), KIND_SEARCH),
+    ],
+    "corte_ingles": [
+        (re.compile(r"elcorteingles\.es/search"), KIND_SEARCH),
+        (re.compile(r"elcorteingles\.es/."), KIND_DETAIL),
+    ],
+}
+
+HEAVIEST_REQUESTS = 20  # Peticiones más pesadas que se conservan en el resumen
+TOP_HOSTS = 10  # Hosts por tipo de página en el resumen
+
+
+def network_stats_path(extraction_path) -> Path:
+    """Fichero de red junto a la extracción: amazon_x.jsonl → amazon_x.network.json"""
+    path = Path(extraction_path)
+    return path.with_name(path.name.split(".", 1)[0] + NETWORK_STATS_SUFFIX)
+
+
+def _empty_counters() -> dict:
+    return {"requests": 0, "failed": 0, "bytes": 0, "ms": 0.0, "ttfb_ms": 0.0, "statuses": {}}
+
+
+def _add_counters(total: dict, counters: dict):
+    for key in ("requests", "failed", "bytes", "ms", "ttfb_ms"):
+        total[key] += counters[key]
+    for status, count in counters["statuses"].items():
+        total["statuses"][status] = total["statuses"].get(status, 0) + count
+
+
+def _rounded(counters: dict) -> dict:
+    return {**counters, "ms": round(counters["ms"], 1), "ttfb_ms": round(counters["ttfb_ms"], 1),
+            "statuses": dict(sorted(counters["statuses"].items()))}
+
+
+class NetworkRecorder:
+    """Registro de peticiones (tipo, host, bytes, estado, duración) agrupado por tipo de página y host"""
+
+    def __init__(self, site: str = "amazon"):
+        """
+        Args:
+            site: Sitio scrapeado ("amazon", "corte_ingles"); decide cómo se reconoce el tipo de página
+        """
+        self.site = site
+        self.patterns = PAGE_KIND_PATTERNS.get(site, [])
+        self.entries = {}  # {(tipo de página, host, tipo de recurso): contadores}
+        self.heaviest = []  # Montículo de (bytes, url, tipo de página, tipo de recurso, ms)
+        self._contexts = []
+
+    def page_kind(self, url: str) -> str:
+        """Tipo de página (KIND_SEARCH, KIND_DETAIL u "other") de una URL"""
+        for pattern, kind in self.patterns:
+            if pattern.search(url or ""):
+                return kind
+        return KIND_OTHER
+
+    def attach(self, context):
+        """Empieza a anotar las peticiones de todas las pestañas de un contexto de Playwright"""
+        context.on("requestfinished", self._on_finished)
+        context.on("requestfailed", self._on_failed)
+        # Los contextos de detalle que se renuevan (memory_guard.py) se cierran a mitad de la ejecución:
+        # no se retienen hasta el final
+        context.on("close", self._on_close)
+        self._contexts.append(context)
+
+    def _on_close(self, context):
+        self._remove_listeners(context)
+        if context in self._contexts:
+            self._contexts.remove(context)
+
+    def _remove_listeners(self, context):
+        for event, handler in (("requestfinished", self._on_finished), ("requestfailed", self._on_failed),
+                               ("close", self._on_close)):
+            try:
+                context.remove_listener(event, handler)
+            except Exception:
+                pass
+
+    def detach(self):
+        """Deja de escuchar los contextos (un contexto del pool se reutiliza en otros trabajos)"""
+        for context in self._contexts:
+            self._remove_listeners(context)
+        self._contexts.clear()
+
+    def _request_kind(self, request) -> str:
+        # Las navegaciones se clasifican por su propia URL: la pestaña aún muestra la página anterior
+        try:
+            if request.is_navigation_request():
+                return self.page_kind(request.url)
+            return self.page_kind(request.frame.page.url)
+        except Exception:
+            # Peticiones de service workers: no pertenecen a ninguna pestaña
+            return KIND_OTHER
+
+    async def _on_finished(self, request):
+        kind = self._request_kind(request)
+        status = None
+        size = 0
+        try:
+            response = await request.response()
+            status = response.status if response is not None else None
+            sizes = await request.sizes()
+            size = max(0, sizes.get("responseBodySize", 0)) + max(0, sizes.get("responseHeadersSize", 0))
+        except Exception:
+            pass
+        self._record_request(request, kind, status, size, failed=False)
+
+    async def _on_failed(self, request):
+        # Abortadas por el bloqueo de recursos, timeouts, conexiones cortadas...
+        self._record_request(request, self._request_kind(request), None, 0, failed=True)
+
+    def _record_request(self, request, kind: str, status, size: int, failed: bool):
+        timing = request.timing or {}
+        ms = timing.get("responseEnd", -1)
+        ttfb_ms = -1
+        if timing.get("responseStart", -1) >= 0 and timing.get("requestStart", -1) >= 0:
+            ttfb_ms = timing["responseStart"] - timing["requestStart"]
+        self.record(request.url, kind, request.resource_type, status, size, max(0.0, ms), max(0.0, ttfb_ms),
+                    failed)
+
+    def record(self, url: str, kind: str, resource_type: str, status=None, size: int = 0, ms: float = 0.0,
+               ttfb_ms: float = 0.0, failed: bool = False):
+        """
+        Anota una petición.
+
+        Args:
+            url: URL pedida
+            kind: Tipo de página que la hizo (KIND_SEARCH, KIND_DETAIL u "other")
+            resource_type: Tipo de recurso ("document", "script", "image"...)
+            status: Código de estado HTTP (None si la petición falló)
+            size: Bytes recibidos (cabeceras y cuerpo)
+            ms: Duración de la petición (ms)
+            ttfb_ms: Tiempo hasta el primer byte de la respuesta (ms)
+            failed: Si la petición no obtuvo respuesta
+        """
+        host = urlparse(url).hostname or ""
+        counters = self.entries.setdefault((kind, host, resource_type), _empty_counters())
+        counters["requests"] += 1
+        counters["failed"] += int(failed)
+        counters["bytes"] += size
+        counters["ms"] += ms
+        counters["ttfb_ms"] += ttfb_ms
+        status_key = str(status) if status is not None else "failed"
+        counters["statuses"][status_key] = counters["statuses"].get(status_key, 0) + 1
+        self._keep_heaviest((size, url[:200], kind, resource_type, round(ms, 1)))
+
+    def _keep_heaviest(self, item: tuple):
+        if len(self.heaviest) < HEAVIEST_REQUESTS:
+            heapq.heappush(self.heaviest, item)
+        elif item[0] > self.heaviest[0][0]:
+            heapq.heapreplace(self.heaviest, item)
+
+    def export(self) -> dict:
+        """Registro serializable (para devolverlo desde los procesos de los shards)"""
+        return {"entries": [[kind, host, resource_type, counters]
+                            for (kind, host, resource_type), counters in self.entries.items()],
+                "heaviest": [list(item) for item in self.heaviest]}
+
+    def merge(self, exported: dict):
+        """Suma el registro exportado por otro proceso (shards de la FASE 3)"""
+        for kind, host, resource_type, counters in exported.get("entries", []):
+            _add_counters(self.entries.setdefault((kind, host, resource_type), _empty_counters()), counters)
+        for item in exported.get("heaviest", []):
+            self._keep_heaviest(tuple(item))
+
+    def summary(self) -> dict:
+        """Totales por tipo de página (tipos de recurso y hosts principales), por host y peticiones más pesadas"""
+        totals = _empty_counters()
+        by_kind = {}
+        by_host = {}
+        kind_hosts = {}
+        for (kind, host, resource_type), counters in self.entries.items():
+            _add_counters(totals, counters)
+            entry = by_kind.setdefault(kind, {**_empty_counters(), "by_resource_type": {}})
+            _add_counters(entry, counters)
+            _add_counters(entry["by_resource_type"].setdefault(resource_type, _empty_counters()), counters)
+            _add_counters(kind_hosts.setdefault(kind, {}).setdefault(host, _empty_counters()), counters)
+            _add_counters(by_host.setdefault(host, _empty_counters()), counters)
+
+        def by_bytes(groups: dict, limit: int = None) -> dict:
+            ordered = sorted(groups.items(), key=lambda item: (item[1]["bytes"], item[1]["requests"]), reverse=True)
+            return {name: _rounded(counters) for name, counters in ordered[:limit]}
+
+        return {
+            "site": self.site,
+            **_rounded(totals),
+            "by_kind": {kind: {**_rounded(entry), "by_resource_type": by_bytes(entry["by_resource_type"]),
+                               "top_hosts": by_bytes(kind_hosts[kind], TOP_HOSTS)}
+                        for kind, entry in sorted(by_kind.items())},
+            "by_host": by_bytes(by_host),
+            "heaviest": [{"bytes": size, "url": url, "kind": kind, "resource_type": resource_type, "ms": ms}
+                         for size, url, kind, resource_type, ms in sorted(self.heaviest, reverse=True)],
+        }
+
+    def save(self, extraction_path):
+        """
+        Guarda el resumen junto a la extracción (sustituye el de la ejecución anterior).
+
+        Returns:
+            Ruta del fichero, o None si no se anotó ninguna petición
+        """
+        if not self.entries:
+            return None
+        path = network_stats_path(extraction_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        print(f"📡 Estadísticas de red → {path}", flush=True)
+        return path
+
+    def print_summary(self):
+        """Imprime peticiones y bytes por tipo de página y los hosts que más descargan"""
+        if not self.entries:
+            return
+        summary = self.summary()
+        print(f"\n📡 Red: {summary['requests']} peticiones, {summary['bytes'] / 1_000_000:.1f} MB, "
+              f"{summary['failed']} fallidas o bloqueadas", flush=True)
+        for kind, entry in summary["by_kind"].items():
+            types = ", ".join(f"{resource_type} {counters['bytes'] / 1_000_000:.1f} MB"
+                              for resource_type, counters in list(entry["by_resource_type"].items())[:4])
+            print(f"   - {kind}: {entry['requests']} peticiones, {entry['bytes'] / 1_000_000:.1f} MB, "
+                  f"{entry['ms'] / 1000:.0f}s acumulados ({types})", flush=True)
+        hosts = ", ".join(f"{host or '?'} {counters['bytes'] / 1_000_000:.1f} MB"
+                          for host, counters in list(summary["by_host"].items())[:5])
+        print(f"   🌍 Hosts con más descarga: {hosts}", flush=True)
@@ -0,0 +1,110 @@
+"""
+Pool de pestañas reutilizables para las páginas de detalle
+
+En lugar de abrir y cerrar una pestaña por producto (creación del target,
+nuevo renderer y cierre), las páginas de detalle se sirven desde un pool del
+tamaño del límite de concurrencia. Entre usos cada pestaña se resetea
+(about:blank) y se recicla (se cierra y se crea otra) tras N navegaciones o
+si la visita terminó con error.
+"""
+import asyncio
+import time
+
+DEFAULT_MAX_USES = 25  # Navegaciones por pestaña antes de reciclarla
+
+
+class PagePool:
+    """Pestañas de un contexto reutilizadas entre productos"""
+
+    def __init__(self, context, max_pages: int, max_uses: int = DEFAULT_MAX_USES):
+        """
+        Args:
+            context: Contexto de Playwright donde se abren las pestañas
+            max_pages: Pestañas abiertas a la vez como máximo (límite de concurrencia)
+            max_uses: Navegaciones que sirve una pestaña antes de reciclarse
+        """
+        self.context = context
+        self.max_pages = max(1, max_pages)
+        self.max_uses = max(1, max_uses)
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        self._idle = []  # [(page, usos)]
+        self._uses = {}  # {id(page): usos}
+        self.stats = {"created": 0, "reuses": 0, "recycled_uses": 0, "recycled_errors": 0,
+                      "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    async def acquire(self):
+        """Devuelve una pestaña libre (reutilizada si hay alguna, nueva si no); espera si están todas en uso"""
+        start = time.perf_counter()
+        await self._semaphore.acquire()
+        waited = time.perf_counter() - start
+        self.stats["wait_seconds"] += waited
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+
+        while self._idle:
+            page = self._idle.pop()
+            if not page.is_closed():
+                self.stats["reuses"] += 1
+                return page
+            self._uses.pop(id(page), None)
+        try:
+            page = await self.context.new_page()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self.stats["created"] += 1
+        self._uses[id(page)] = 0
+        return page
+
+    async def release(self, page, failed: bool = False):
+        """
+        Devuelve la pestaña al pool.
+
+        Args:
+            page: Pestaña obtenida con acquire()
+            failed: Si es True (error, timeout, captcha...) la pestaña se cierra en lugar de reutilizarse
+        """
+        try:
+            uses = self._uses.get(id(page), 0) + 1
+            self._uses[id(page)] = uses
+            recycle = failed or uses >= self.max_uses or page.is_closed()
+            if not recycle:
+                try:
+                    # Reset: descarta el documento anterior (DOM, listeners, timers) mientras está ociosa
+                    await page.goto("about:blank")
+                    self._idle.append(page)
+                    return
+                except Exception:
+                    failed = True
+            self.stats["recycled_errors" if failed else "recycled_uses"] += 1
+            self._uses.pop(id(page), None)
+            try:
+                await page.close()
+            except Exception:
+                pass
+        finally:
+            self._semaphore.release()
+
+    async def close(self):
+        """Cierra las pestañas ociosas"""
+        idle, self._idle = self._idle, []
+        for page in idle:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+    def summary(self) -> dict:
+        """Pestañas creadas, reutilizaciones, reciclados y tiempo de espera por una pestaña libre"""
+        return {**self.stats, "wait_seconds": round(self.stats["wait_seconds"], 2),
+                "max_wait_seconds": round(self.stats["max_wait_seconds"], 2)}
+
+    def print_summary(self):
+        """Imprime las estadísticas del pool"""
+        summary = self.summary()
+        served = summary["created"] + summary["reuses"]
+        if not served:
+            return
+        print(f"\n🗂️  Pool de pestañas de detalle: {served} visitas con {summary['created']} pestañas creadas "
+              f"({summary['reuses']} reutilizaciones), recicladas {summary['recycled_uses']} por uso y "
+              f"{summary['recycled_errors']} por error, espera {summary['wait_seconds']:.1f}s "
+              f"(máx {summary['max_wait_seconds']:.2f}s)", flush=True)
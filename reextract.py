@@ -0,0 +1,331 @@
+"""
+Re-extracción offline de las páginas capturadas con --capture (sin red)
+
+Cuando se rompe un selector o se añade un campo no hace falta volver a
+scrapear: las páginas de resultados y de detalle guardadas por html_capture.py
+se vuelven a parsear (selectolax) en un pool de procesos y la extracción del
+término se reconstruye con los parsers actuales. Los productos cambiados se
+guardan como versión nueva en el mismo .jsonl (o en --output).
+
+Los productos de la captura sin página de detalle guardada (resueltos desde la
+caché o el modo refresco) conservan los detalles de la extracción existente.
+
+Uso:
+    python reextract.py "leche entera" [--run=RUN_ID] [--workers=N] [--products=N] [--output=fichero.jsonl]
+    python reextract.py "leche entera" --list    (ejecuciones capturadas del término)
+"""
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cli_options import get_cli_option
+from extraction_store import read_products
+from html_capture import KIND_DETAIL, KIND_SEARCH, CaptureStore, read_blob
+from http_detail_fetcher import HTMLParser, empty_details, parse_detail_tree
+from main import amazon_output_path, merge_detailed_info, save_to_json
+from search_card_selectors import (
+    CARD_SELECTORS, FREE_SHIPPING_TEXT, MAX_OPTIONS, SEARCH_RESULT_SELECTOR, absolute_url, is_brand_candidate,
+    is_brand_key
+)
+
+
+# Etiquetas que innerText no muestra y las que cortan la línea (display: block/list-item/table-*)
+HIDDEN_TAGS = {"script", "style", "noscript", "template", "head"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset", "figcaption", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "section",
+    "table", "tbody", "thead", "tfoot", "tr", "ul", "caption",
+}
+
+
+def _text_chunks(node, chunks: list):
+    """Recorre node y deja en chunks su texto y, como int, los saltos de línea de cada bloque"""
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == "-text":
+            chunks.append(re.sub(r"\s+", " ", child.text(deep=False)))
+        elif tag == "br":
+            chunks.append("\n")
+        elif tag in ("td", "th"):
+            chunks.append("\t")
+            _text_chunks(child, chunks)
+        elif tag not in HIDDEN_TAGS and not tag.startswith("-"):
+            breaks = 2 if tag == "p" else 1 if tag in BLOCK_TAGS else 0
+            chunks.append(breaks)
+            _text_chunks(child, chunks)
+            chunks.append(breaks)
+
+
+def _inner_text(node) -> str:
+    """
+    Texto visible aproximado de un nodo, como innerText en Chromium: los espacios
+    se colapsan, los bloques y <br> cortan la línea y script/style no cuentan.
+    Sin CSS no se sabe qué elementos ocultos hay ni su display real: se usa el
+    de la etiqueta.
+    """
+    if node is None:
+        return ""
+    chunks = []
+    _text_chunks(node, chunks)
+    lines, pending_breaks, current = [], 0, []
+    for chunk in chunks + [1]:
+        if not isinstance(chunk, int):
+            current.append(chunk)
+            continue
+        if not chunk:
+            continue
+        # Fin de bloque: sin espacios en los bordes de cada línea (las celdas de tabla van con tabulador)
+        line = re.sub(r" *([\t\n]) *", r"\1", re.sub(r" +", " ", "".join(current))).strip(" \t")
+        if line.strip():
+            if lines:
+                lines.append("\n" * pending_breaks)
+            lines.append(line)
+            pending_breaks = 0
+        pending_breaks = max(pending_breaks, chunk)
+        current = []
+    return "".join(lines)
+
+
+def parse_search_card(element, search_term: str, position: int):
+    """
+    Información básica de una tarjeta de resultados de Amazon, con los mismos selectores
+    (search_card_selectors.py), campos y reglas que EXTRACT_SEARCH_RESULTS_JS (None si la
+    tarjeta no tiene título).
+    """
+    def first(selector):
+        return element.css_first(selector)
+
+    def optional_text(selector):
+        node = first(selector)
+        return _inner_text(node) if node is not None else "N/A"
+
+    title = "N/A"
+    for selector in CARD_SELECTORS["title"]:
+        node = first(selector)
+        if node is not None:
+            title = _inner_text(node)
+            if title:
+                break
+
+    product_url = "N/A"
+    link = next((node for node in map(first, CARD_SELECTORS["link"]) if node is not None), None)
+    if link is not None:
+        product_url = absolute_url(link.attributes.get("href")) or "N/A"
+
+    price = "N/A"
+    price_node = first(CARD_SELECTORS["price"])
+    if price_node is not None:
+        price = _inner_text(price_node)
+    else:
+        whole = _inner_text(first(CARD_SELECTORS["price_whole"])).replace(",", ".")
+        fraction = _inner_text(first(CARD_SELECTORS["price_fraction"]))
+        if whole:
+            whole = whole.rstrip(".,")
+            price = f"{whole},{fraction}€" if fraction else f"{whole}€"
+
+    reviews_count = "0"
+    for selector in CARD_SELECTORS["reviews_count"]:
+        reviews_text = _inner_text(first(selector))
+        if re.search(r"[0-9]", reviews_text):
+            reviews_count = reviews_text
+            break
+
+    image = first(CARD_SELECTORS["image"])
+    image_url = (image.attributes.get("src") or "N/A") if image is not None else "N/A"
+
+    brand = "N/A"
+    additional_specs = {}
+    details_container = first(CARD_SELECTORS["specs_container"])
+    if details_container is not None:
+        for row in details_container.css(CARD_SELECTORS["specs_row"]):
+            row_text = _inner_text(row)
+            if ":" in row_text:
+                key, value = (part.strip() for part in row_text.split(":", 1))
+                if is_brand_key(key):
+                    brand = value
+                else:
+                    additional_specs[key] = value
+
+    if brand == "N/A":
+        for selector in CARD_SELECTORS["brand"]:
+            brand_text = _inner_text(first(selector))
+            if is_brand_candidate(brand_text):
+                brand = brand_text
+                break
+
+    has_prime = first(CARD_SELECTORS["prime"]) is not None
+    free_shipping = (first(CARD_SELECTORS["free_shipping"]) is not None
+                     or any(FREE_SHIPPING_TEXT in span.text().lower() for span in element.css("span")))
+
+    seller = "N/A"
+    seller_text = _inner_text(first(CARD_SELECTORS["seller"]))
+    if "de " in seller_text.lower():
+        seller = seller_text
+
+    options = [text for text in (_inner_text(node) for node in element.css(CARD_SELECTORS["options"])[:MAX_OPTIONS])
+               if text]
+
+    if title == "N/A":
+        return None
+    return {
+        "asin": element.attributes.get("data-asin") or "N/A",
+        "title": title or "N/A",
+        "brand": brand or "N/A",
+        "price": price or "N/A",
+        "original_price": optional_text(CARD_SELECTORS["original_price"]) or "N/A",
+        "discount": optional_text(CARD_SELECTORS["discount"]) or "N/A",
+        "rating": optional_text(CARD_SELECTORS["rating"]) or "N/A",
+        "reviews_count": reviews_count or "0",
+        "has_prime": has_prime,
+        "free_shipping": free_shipping,
+        "availability": optional_text(CARD_SELECTORS["availability"]) or "N/A",
+        "seller": seller or "N/A",
+        "options": options,
+        "additional_specs": additional_specs,
+        "url": product_url,
+        "image_url": image_url,
+        "search_term": search_term,
+        "position": position,
+    }
+
+
+def parse_search_results_html(html: str, search_term: str, start_position: int = 1) -> list:
+    """Tarjetas de una página de resultados (un dict, o None si no es válida, por tarjeta)"""
+    if HTMLParser is None:
+        raise ImportError("selectolax no está instalado: pip install selectolax")
+    tree = HTMLParser(html)
+    return [parse_search_card(element, search_term, start_position + idx)
+            for idx, element in enumerate(tree.css(SEARCH_RESULT_SELECTOR))]
+
+
+def parse_capture(task: tuple):
+    """Parsea una captura (se ejecuta en los procesos del pool): task = (tipo, ruta del blob, término)"""
+    kind, path, search_term = task
+    html = read_blob(path)
+    if kind == KIND_SEARCH:
+        return parse_search_results_html(html, search_term)
+    return parse_detail_tree(HTMLParser(html))
+
+
+def parse_all(tasks: list, workers: int) -> list:
+    """Parsea todas las capturas repartidas en `workers` procesos (en el orden de tasks)"""
+    if workers <= 1 or len(tasks) <= 1:
+        return [parse_capture(task) for task in tasks]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_capture, tasks, chunksize=chunksize))
+
+
+def rebuild_products(store: CaptureStore, search_term: str, run_id: str, workers: int, max_products: int = 0,
+                     existing: list = None) -> tuple:
+    """
+    Reconstruye los productos de una ejecución capturada.
+
+    Args:
+        store: CaptureStore con las capturas
+        search_term: Término de búsqueda
+        run_id: Ejecución cuyas páginas de resultados se re-parsean
+        workers: Procesos del pool de parseo
+        max_products: Productos como máximo (0: todos los de las páginas capturadas)
+        existing: Productos de la extracción actual; dan los detalles de los ASIN sin página de detalle capturada
+
+    Returns:
+        (productos, estadísticas)
+    """
+    start = time.perf_counter()
+    search_pages = store.search_pages(search_term, run_id)
+    search_results = parse_all([(KIND_SEARCH, str(store.blob_path(sha256)), search_term)
+                                for _, _, sha256 in search_pages], workers)
+
+    # Mismo criterio que la paginación: posiciones consecutivas y ASIN repetidos descartados
+    products = []
+    seen_asins = set()
+    for cards in search_results:
+        for card in cards:
+            if card is None or (max_products and len(products) >= max_products):
+                continue
+            asin = card["asin"]
+            if asin != "N/A" and asin in seen_asins:
+                continue
+            seen_asins.add(asin)
+            card["position"] = len(products) + 1
+            products.append(card)
+
+    captured = store.latest_details([product["asin"] for product in products if product["asin"] != "N/A"], run_id)
+    with_capture = [product for product in products if product["asin"] in captured]
+    details = parse_all([(KIND_DETAIL, str(store.blob_path(captured[product["asin"]][1])), search_term)
+                         for product in with_capture], workers)
+    for product, detailed_info in zip(with_capture, details):
+        merge_detailed_info(product, detailed_info)
+
+    # Sin página de detalle capturada: se conservan los detalles de la extracción existente
+    carried = 0
+    previous = {product.get("asin"): product for product in existing or []}
+    detail_keys = list(empty_details()) + ["details_missing"]
+    for product in products:
+        if product["asin"] in captured or product["asin"] not in previous:
+            continue
+        old = previous[product["asin"]]
+        if any(key in old for key in empty_details()):
+            merge_detailed_info(product, {key: old[key] for key in detail_keys if key in old})
+            carried += 1
+
+    elapsed = time.perf_counter() - start
+    pages = len(search_pages) + len(with_capture)
+    return products, {"search_pages": len(search_pages), "detail_pages": len(with_capture), "carried": carried,
+                      "seconds": elapsed, "pages_per_second": pages / elapsed if elapsed else 0.0}
+
+
+def print_runs(store: CaptureStore, search_term: str):
+    """Lista las ejecuciones capturadas de un término"""
+    runs = store.runs(search_term)
+    if not runs:
+        print(f"📭 No hay capturas de '{search_term}' (usa --capture al scrapear)")
+        return
+    print(f"📼 Ejecuciones capturadas de '{search_term}':")
+    for run_id, search_count, detail_count, started_at in runs:
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(started_at))
+        print(f"   {run_id}  {started}  {search_count} páginas de resultados, {detail_count} de detalle")
+
+
+def main():
+    """Función principal"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        print('📝 Uso: python reextract.py "leche entera" [--run=RUN_ID] [--workers=N] [--products=N] '
+              '[--output=fichero.jsonl] [--list]')
+        sys.exit(1)
+    if HTMLParser is None:
+        print("❌ La re-extracción necesita selectolax: pip install selectolax")
+        sys.exit(1)
+    search_term = args[0]
+    store = CaptureStore("amazon")
+    try:
+        if "--list" in sys.argv:
+            print_runs(store, search_term)
+            return
+        runs = [run for run in store.runs(search_term) if run[1]]
+        run_id = get_cli_option("run") or (runs[-1][0] if runs else None)
+        if run_id is None:
+            print_runs(store, search_term)
+            sys.exit(1)
+        workers = int(get_cli_option("workers", os.cpu_count() or 1))
+        max_products = int(get_cli_option("products", 0))
+        output = get_cli_option("output") or amazon_output_path(search_term)
+
+        print(f"🧪 Re-extrayendo '{search_term}' de la ejecución {run_id} con {workers} procesos...", flush=True)
+        existing = read_products(amazon_output_path(search_term))
+        products, stats = rebuild_products(store, search_term, run_id, workers, max_products, existing)
+    finally:
+        store.close()
+
+    print(f"✅ {len(products)} productos de {stats['search_pages']} páginas de resultados, "
+          f"{stats['detail_pages']} páginas de detalle re-parseadas y {stats['carried']} con los detalles de la "
+          f"extracción existente ({stats['seconds']:.1f}s, {stats['pages_per_second']:.0f} páginas/s)", flush=True)
+    save_to_json(products, output, replace=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Bloqueo de recursos innecesarios durante el scraping (modo "lean")
+
+Los scrapers solo leen el texto del DOM y los atributos src de las imágenes,
+así que imágenes, fuentes, vídeos y trackers de terceros se pueden abortar
+(o servir como respuesta vacía) desde el enrutado del contexto de Playwright.
+"""
+import time
+from urllib.parse import urlparse
+
+# Acciones posibles para cada petición
+ALLOW = "allow"
+ABORT = "abort"
+STUB = "stub"
+
+# Hosts de analítica/publicidad que nunca aportan datos a la extracción
+TRACKER_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "bat.bing.com",
+    "hotjar.com",
+    "criteo.com",
+    "criteo.net",
+    "scorecardresearch.com",
+    "tiktok.com",
+    "analytics.tiktok.com",
+    "adsrvr.org",
+    "taboola.com",
+    "outbrain.com",
+    "newrelic.com",
+    "nr-data.net",
+    # Telemetría y publicidad propias de Amazon
+    "fls-eu.amazon.es",
+    "unagi.amazon.es",
+    "unagi-eu.amazon.com",
+    "aax-eu.amazon.es",
+    "aax-eu-retail-direct.amazon-adsystem.com",
+    "amazon-adsystem.com",
+]
+
+# Perfiles predefinidos: reglas por tipo de recurso y por host
+BLOCK_PROFILES = {
+    "off": {
+        "resource_rules": {},
+        "host_rules": {},
+    },
+    "lean": {
+        "resource_rules": {
+            "image": ABORT,
+            "font": ABORT,
+            "media": ABORT,
+        },
+        "host_rules": {host: STUB for host in TRACKER_HOSTS},
+    },
+    "aggressive": {
+        "resource_rules": {
+            "image": ABORT,
+            "font": ABORT,
+            "media": ABORT,
+            "stylesheet": STUB,
+            "beacon": ABORT,
+            "ping": ABORT,
+            "texttrack": ABORT,
+            "manifest": ABORT,
+        },
+        "host_rules": {host: STUB for host in TRACKER_HOSTS},
+    },
+}
+
+# Cuerpos servidos cuando la acción es STUB (respuesta 200 vacía del tipo adecuado)
+STUB_RESPONSES = {
+    "script": ("application/javascript", ""),
+    "stylesheet": ("text/css", ""),
+    "xhr": ("application/json", "{}"),
+    "fetch": ("application/json", "{}"),
+    "document": ("text/html", "<html><body></body></html>"),
+}
+DEFAULT_STUB_RESPONSE = ("text/plain", "")
+
+# Tamaño medio aproximado (bytes) por tipo de recurso, para estimar el ahorro
+AVERAGE_RESOURCE_BYTES = {
+    "image": 35_000,
+    "font": 45_000,
+    "media": 400_000,
+    "script": 30_000,
+    "stylesheet": 20_000,
+    "xhr": 3_000,
+    "fetch": 3_000,
+    "document": 60_000,
+}
+DEFAULT_RESOURCE_BYTES = 5_000
+
+# Ancho de banda asumido (bytes/s) y latencia por petición para estimar el tiempo ahorrado
+DEFAULT_BANDWIDTH_BYTES_PER_SEC = 5_000_000
+DEFAULT_REQUEST_OVERHEAD_SEC = 0.02
+
+
+def _host_matches(hostname: str, rule_host: str) -> bool:
+    """True si hostname es rule_host o un subdominio suyo"""
+    return hostname == rule_host or hostname.endswith("." + rule_host)
+
+
+class ResourceBlocker:
+    """Enrutador de peticiones que aborta o simula recursos innecesarios"""
+
+    def __init__(self, profile: str = "lean", resource_rules: dict = None, host_rules: dict = None,
+                 bandwidth_bytes_per_sec: float = DEFAULT_BANDWIDTH_BYTES_PER_SEC,
+                 request_overhead_sec: float = DEFAULT_REQUEST_OVERHEAD_SEC):
+        """
+        Args:
+            profile: Perfil base ("off", "lean" o "aggressive")
+            resource_rules: Reglas adicionales {tipo_recurso: "abort"|"stub"|"allow"}
+            host_rules: Reglas adicionales {host: "abort"|"stub"|"allow"} (incluye subdominios)
+            bandwidth_bytes_per_sec: Ancho de banda asumido para estimar el tiempo ahorrado
+            request_overhead_sec: Latencia asumida por petición evitada
+        """
+        if profile not in BLOCK_PROFILES:
+            raise ValueError(f"Perfil de bloqueo desconocido: {profile} (opciones: {', '.join(BLOCK_PROFILES)})")
+
+        self.profile = profile
+        self.resource_rules = dict(BLOCK_PROFILES[profile]["resource_rules"])
+        self.resource_rules.update(resource_rules or {})
+        self.host_rules = dict(BLOCK_PROFILES[profile]["host_rules"])
+        self.host_rules.update(host_rules or {})
+        self.bandwidth_bytes_per_sec = bandwidth_bytes_per_sec
+        self.request_overhead_sec = request_overhead_sec
+
+        self.allowed = 0
+        self.blocked = {}  # {(acción, tipo): número de peticiones}
+        self.blocked_hosts = {}  # {host: número de peticiones}
+        self.started_at = time.time()
+
+    def decide(self, url: str, resource_type: str) -> str:
+        """Devuelve la acción (allow/abort/stub) para una petición"""
+        hostname = urlparse(url).hostname or ""
+        # Las reglas por host tienen prioridad sobre las reglas por tipo
+        for rule_host, action in self.host_rules.items():
+            if _host_matches(hostname, rule_host):
+                return action
+        return self.resource_rules.get(resource_type, ALLOW)
+
+    async def attach(self, context):
+        """Instala el enrutado en un contexto de Playwright (afecta a todas sus páginas)"""
+        if self.resource_rules or self.host_rules:
+            await context.route("**/*", self._handle_route)
+
+    async def _handle_route(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        action = self.decide(request.url, resource_type)
+
+        if action == ALLOW:
+            self.allowed += 1
+            await route.continue_()
+            return
+
+        key = (action, resource_type)
+        self.blocked[key] = self.blocked.get(key, 0) + 1
+        hostname = urlparse(request.url).hostname or ""
+        self.blocked_hosts[hostname] = self.blocked_hosts.get(hostname, 0) + 1
+
+        if action == STUB:
+            content_type, body = STUB_RESPONSES.get(resource_type, DEFAULT_STUB_RESPONSE)
+            await route.fulfill(status=200, content_type=content_type, body=body)
+        else:
+            await route.abort()
+
+    def summary(self) -> dict:
+        """Resumen del bloqueo con una estimación de bytes y tiempo ahorrados"""
+        by_type = {}
+        total_blocked = 0
+        bytes_saved = 0
+        for (action, resource_type), count in self.blocked.items():
+            entry = by_type.setdefault(resource_type, {"abort": 0, "stub": 0})
+            entry[action] += count
+            total_blocked += count
+            bytes_saved += count * AVERAGE_RESOURCE_BYTES.get(resource_type, DEFAULT_RESOURCE_BYTES)
+
+        time_saved = bytes_saved / self.bandwidth_bytes_per_sec + total_blocked * self.request_overhead_sec
+        top_hosts = sorted(self.blocked_hosts.items(), key=lambda item: item[1], reverse=True)[:10]
+
+        return {
+            "profile": self.profile,
+            "allowed_requests": self.allowed,
+            "blocked_requests": total_blocked,
+            "blocked_by_type": by_type,
+            "top_blocked_hosts": dict(top_hosts),
+            "estimated_bytes_saved": bytes_saved,
+            "estimated_seconds_saved": round(time_saved, 2),
+            "elapsed_seconds": round(time.time() - self.started_at, 2),
+        }
+
+    def print_summary(self):
+        """Imprime el resumen del bloqueo de recursos"""
+        summary = self.summary()
+        print(f"\n🪶 Modo lean ({summary['profile']}): {summary['blocked_requests']} peticiones bloqueadas, "
+              f"{summary['allowed_requests']} permitidas", flush=True)
+        for resource_type, counts in sorted(summary["blocked_by_type"].items()):
+            print(f"   - {resource_type}: {counts['abort']} abortadas, {counts['stub']} simuladas", flush=True)
+        print(f"   💾 Ahorro estimado: {summary['estimated_bytes_saved'] / 1_000_000:.1f} MB, "
+              f"~{summary['estimated_seconds_saved']:.1f} s de descarga", flush=True)
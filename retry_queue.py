@@ -0,0 +1,183 @@
+"""
+Reintentos por URL de las páginas de detalle, con backoff y lista de fallidos
+
+Cada producto cuya visita de detalle falla (timeout, robot check, 5xx, error de
+navegación...) se vuelve a intentar tras un backoff exponencial con jitter. La
+espera no ocupa hueco del limitador, así que los reintentos se intercalan con
+los primeros intentos del resto de productos en lugar de acumularse al final.
+Los productos que agotan los intentos, o que fallan de forma definitiva (404,
+410), pasan a la lista de fallidos (dead letters), que se guarda junto a la
+extracción: amazon_<término>.deadletter.json
+"""
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+
+from adaptive_concurrency import OUTCOME_BLOCKED, OUTCOME_ERROR, OUTCOME_HTTP_ERROR, OUTCOME_OK, OUTCOME_TIMEOUT
+from extraction_store import DEAD_LETTER_SUFFIX
+from scrape_budget import BudgetExhausted, ScrapeBudget
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 2.0  # Segundos antes del primer reintento (se duplica en cada uno)
+DEFAULT_MAX_DELAY = 60.0
+
+# Errores HTTP que no se arreglan reintentando (el producto ya no existe)
+PERMANENT_STATUSES = {404, 410}
+
+
+def classify_failure(outcome: dict) -> str:
+    """
+    Tipo de error de una visita fallida: "timeout", "blocked", "server_error",
+    "not_found", "http_error" o "error" (excepción de navegación/extracción).
+    """
+    kind = outcome.get("kind", OUTCOME_ERROR)
+    status = outcome.get("status")
+    if kind == OUTCOME_HTTP_ERROR:
+        if status in PERMANENT_STATUSES:
+            return "not_found"
+        return "server_error" if status and status >= 500 else "http_error"
+    if kind in (OUTCOME_TIMEOUT, OUTCOME_BLOCKED):
+        return kind
+    return "error"
+
+
+def is_retryable(error_type: str) -> bool:
+    return error_type != "not_found"
+
+
+def dead_letter_path(extraction_path) -> Path:
+    """Fichero de fallidos junto a la extracción: amazon_x.jsonl → amazon_x.deadletter.json"""
+    path = Path(extraction_path)
+    return path.with_name(path.name.split(".", 1)[0] + DEAD_LETTER_SUFFIX)
+
+
+class RetryQueue:
+    """Reintentos con backoff exponencial y jitter, y registro de los productos que no se recuperan"""
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        """
+        Args:
+            max_attempts: Intentos por URL (incluido el primero)
+            base_delay: Espera antes del primer reintento; se duplica en cada uno
+            max_delay: Espera máxima entre intentos
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letters = []
+        self.stats = {"attempts": 0, "retries": 0, "recovered": 0, "dead": 0, "backoff_seconds": 0.0}
+        self.errors = {}  # {tipo de error: nº de intentos fallidos}
+
+    def backoff(self, attempt: int) -> float:
+        """Espera tras el intento `attempt` fallido: exponencial con jitter (entre la mitad y el total)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def run(self, product_data: dict, attempt_fn, budget: ScrapeBudget = None):
+        """
+        Visita un producto hasta que salga bien o se agoten los intentos.
+
+        Args:
+            product_data: Producto (para identificarlo en la lista de fallidos)
+            attempt_fn: Corrutina attempt_fn(intento) → (detalles, outcome); debe reservar su
+                propio hueco del limitador en los reintentos (intento > 1)
+            budget: ScrapeBudget opcional; no se programan reintentos que acabarían después del deadline
+
+        Returns:
+            (detalles, outcome) del último intento; outcome["attempts"] lleva los intentos hechos
+
+        Raises:
+            BudgetExhausted: si el deadline pasó antes de un intento (attempt_fn lo lanza) o no deja
+                tiempo para el siguiente reintento. El producto no pasa a la lista de fallidos: el
+                llamador lo marca como sin detalles por el deadline y --resume lo completa
+        """
+        history = []
+        attempt = 1
+        while True:
+            self.stats["attempts"] += 1
+            try:
+                details, outcome = await attempt_fn(attempt)
+            except BudgetExhausted:
+                self.stats["attempts"] -= 1
+                raise
+            except Exception as e:
+                details, outcome = {}, {"kind": OUTCOME_ERROR, "error": str(e)}
+            outcome["attempts"] = attempt
+            if outcome.get("kind") == OUTCOME_OK:
+                if attempt > 1:
+                    self.stats["recovered"] += 1
+                return details, outcome
+
+            error_type = classify_failure(outcome)
+            self.errors[error_type] = self.errors.get(error_type, 0) + 1
+            history.append({"attempt": attempt, "error_type": error_type, "status": outcome.get("status"),
+                            "error": (outcome.get("error") or "")[:300]})
+            if not is_retryable(error_type) or attempt >= self.max_attempts:
+                self._dead_letter(product_data, history)
+                return details, outcome
+
+            delay = self.backoff(attempt)
+            if budget is not None and not budget.allows(delay):
+                raise BudgetExhausted()
+            self.stats["retries"] += 1
+            self.stats["backoff_seconds"] += delay
+            print(f"    🔁 Reintento {attempt + 1}/{self.max_attempts} en {delay:.1f}s ({error_type}): "
+                  f"{product_data.get('url', '')[:60]}", flush=True)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _dead_letter(self, product_data: dict, history: list):
+        self.stats["dead"] += 1
+        self.dead_letters.append({
+            "asin": product_data.get("asin"),
+            "position": product_data.get("position"),
+            "url": product_data.get("url"),
+            "title": product_data.get("title"),
+            "attempts": len(history),
+            "error_type": history[-1]["error_type"],
+            "history": history,
+            "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+
+    def add_dead_letter(self, entry: dict):
+        """Añade un fallido ya procesado en otro proceso (shards de la FASE 3)"""
+        self.stats["dead"] += 1
+        self.errors[entry["error_type"]] = self.errors.get(entry["error_type"], 0) + entry["attempts"]
+        self.dead_letters.append(entry)
+
+    def save_dead_letters(self, extraction_path):
+        """
+        Guarda los fallidos de esta ejecución junto a la extracción (o borra el fichero
+        de una ejecución anterior si esta vez no hubo ninguno).
+
+        Returns:
+            Ruta del fichero, o None si no hubo fallidos
+        """
+        path = dead_letter_path(extraction_path)
+        if not self.dead_letters:
+            path.unlink(missing_ok=True)
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(sorted(self.dead_letters, key=lambda entry: entry.get("position") or 0), f,
+                      ensure_ascii=False, indent=2)
+        print(f"🪦 {len(self.dead_letters)} productos sin detalles tras {self.max_attempts} intentos → {path}",
+              flush=True)
+        return path
+
+    def summary(self) -> dict:
+        """Intentos, reintentos, recuperados, fallidos y errores por tipo"""
+        return {**self.stats, "backoff_seconds": round(self.stats["backoff_seconds"], 1), "errors": dict(self.errors)}
+
+    def print_summary(self):
+        """Imprime las estadísticas de reintentos"""
+        summary = self.summary()
+        if not summary["attempts"] and not summary["dead"]:
+            return
+        errors = ", ".join(f"{kind}: {count}" for kind, count in sorted(summary["errors"].items())) or "ninguno"
+        print(f"\n🔁 Reintentos: {summary['attempts']} intentos, {summary['retries']} reintentos "
+              f"({summary['backoff_seconds']:.0f}s de backoff), {summary['recovered']} recuperados, "
+              f"{summary['dead']} fallidos definitivos | errores: {errors}", flush=True)
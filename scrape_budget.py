@@ -0,0 +1,115 @@
+"""
+Presupuesto de tiempo de un scrape y orden de prioridad de la extracción de detalles
+
+Con un deadline, la paginación deja de pedir páginas y la extracción de
+detalles deja de empezar visitas cuando se agota el tiempo; el scrape termina
+con normalidad y guarda lo que tiene, marcando los productos sin detalles
+("details_missing"). Para aprovechar el tiempo disponible, los detalles se
+extraen por orden de prioridad: posición en la búsqueda, número de reseñas o
+productos sin detalles conocidos (ni en caché ni en la extracción anterior) primero.
+"""
+import re
+import time
+
+PRIORITY_POSITION = "position"
+PRIORITY_REVIEWS = "reviews"
+PRIORITY_UNCACHED = "uncached"
+PRIORITIES = (PRIORITY_POSITION, PRIORITY_REVIEWS, PRIORITY_UNCACHED)
+
+# Valores de "details_missing" en los productos que se guardan sin detalles
+MISSING_DEADLINE = "deadline"  # No se llegó a visitar antes del deadline
+MISSING_FAILED = "failed"  # Se agotaron los reintentos (ver el .deadletter.json)
+
+
+class BudgetExhausted(Exception):
+    """El deadline pasó antes de empezar una visita"""
+
+
+class ScrapeBudget:
+    """Instante límite de un scrape (reloj de pared, válido también en los procesos de los shards)"""
+
+    def __init__(self, expires_at: float = None):
+        """
+        Args:
+            expires_at: time.time() en el que se agota el presupuesto (None: sin límite)
+        """
+        self.expires_at = expires_at
+        self.stats = {"skipped": 0, "pagination_stopped": False}
+
+    @classmethod
+    def from_seconds(cls, seconds: float = None) -> "ScrapeBudget":
+        """Presupuesto de `seconds` segundos a partir de ahora (None: sin límite)"""
+        return cls(time.time() + seconds if seconds is not None else None)
+
+    def remaining(self) -> float:
+        """Segundos que quedan (infinito si no hay deadline)"""
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def allows(self, seconds: float) -> bool:
+        """Si cabe una espera de `seconds` antes del deadline"""
+        return self.remaining() > seconds
+
+    def check(self):
+        """Lanza BudgetExhausted si el deadline ya pasó"""
+        if self.expired():
+            raise BudgetExhausted()
+
+    def skip(self, product_data: dict):
+        """Marca un producto que se queda sin detalles por el deadline"""
+        self.stats["skipped"] += 1
+        product_data["details_missing"] = MISSING_DEADLINE
+
+    def print_summary(self):
+        """Imprime cuántos productos dejó sin detalles el deadline"""
+        if self.expires_at is None:
+            return
+        if not self.expired():
+            print(f"\n⏳ Deadline: terminado con {self.remaining():.0f}s de margen", flush=True)
+            return
+        stopped = ", paginación detenida" if self.stats["pagination_stopped"] else ""
+        print(f"\n⏳ Deadline alcanzado: {self.stats['skipped']} productos guardados sin detalles{stopped}", flush=True)
+
+
+def parse_count(value) -> int:
+    """Número de reseñas de la tarjeta ("1.234", "(2,5 mil)", "3K", "1.5K"...) como entero (0 si no hay)"""
+    if not isinstance(value, str):
+        return int(value or 0)
+    # Con sufijo de miles el separador es decimal ("2,5 mil", "1.5K"); sin él, de miles ("1.234")
+    match = re.search(r"(\d[\d.,]*)\s*(mil|k)\b", value, re.IGNORECASE)
+    if match:
+        number = match.group(1).rstrip(".,").replace(",", ".")
+        integer, _, decimals = number.rpartition(".")
+        number = f"{integer.replace('.', '')}.{decimals}" if integer else decimals
+        return int(float(number) * 1000)
+    match = re.search(r"\d[\d.,]*", value)
+    if not match:
+        return 0
+    return int(re.sub(r"[.,]", "", match.group(0)))
+
+
+def priority_key(product_data: dict, priority: str = PRIORITY_POSITION, is_known=None) -> tuple:
+    """
+    Clave de orden (menor = antes) de un producto para la extracción de detalles.
+
+    Args:
+        product_data: Producto con la información básica
+        priority: "position", "reviews" (más reseñas primero) o "uncached"
+            (primero los que no tienen detalles conocidos)
+        is_known: Función producto → bool que indica si ya hay detalles (caché / extracción anterior)
+    """
+    position = product_data.get("position") or 0
+    if priority == PRIORITY_REVIEWS:
+        return -parse_count(product_data.get("reviews_count")), position
+    if priority == PRIORITY_UNCACHED and is_known is not None:
+        return (1 if is_known(product_data) else 0), position
+    return 0, position
+
+
+def order_by_priority(products: list, priority: str = PRIORITY_POSITION, is_known=None) -> list:
+    """Productos ordenados para la extracción de detalles (la lista original no se modifica)"""
+    return sorted(products, key=lambda product_data: priority_key(product_data, priority, is_known))
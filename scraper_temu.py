@@ -4,20 +4,36 @@ Script para scrapear productos de El Corte Inglés
 import json
 import asyncio
 import sys
-from playwright.async_api import async_playwright
 import re
+import time
+from contextlib import AsyncExitStack
 from pathlib import Path
 
+from browser_pool import BROWSER_ARGS, BrowserPool
+from browser_profile import BrowserProfile
+from checkpoint import RunCheckpoint
+from page_pool import PagePool
+from cli_options import (
+    get_block_profile, get_browser_profile, get_cli_option, get_deadline, get_memory_limits, get_priority
+)
+from memory_guard import DEFAULT_CONTEXT_PAGES, DEFAULT_MAX_BROWSER_MB, RecyclingPagePool
+from network_accounting import NetworkRecorder
+from resource_blocker import ResourceBlocker
+from scrape_budget import MISSING_DEADLINE, PRIORITY_POSITION, ScrapeBudget, order_by_priority
+from wait_strategy import CORTE_INGLES, WaitEngine
+
 DEFAULT_ITERATIONS = 50
 
 
-async def extract_detailed_product_info(context, product_url: str):
+async def extract_detailed_product_info(context, product_url: str, waits: WaitEngine = None, page_pool: PagePool = None):
     """
     Extrae información detallada visitando la página del producto en una nueva pestaña.
     
     Args:
         context: Contexto del browser de Playwright
         product_url: URL del producto
+        waits: WaitEngine donde se registran las esperas (opcional)
+        page_pool: PagePool opcional del que tomar una pestaña reutilizable en lugar de abrir una nueva
     
     Returns:
         dict con información detallada
@@ -33,15 +49,16 @@ async def extract_detailed_product_info(context, product_url: str):
         "color_options": []
     }
     
-    # Abrir en nueva página para no perder el contexto de la lista
-    detail_page = await context.new_page()
+    # Abrir en otra pestaña (del pool si lo hay) para no perder el contexto de la lista
+    detail_page = await page_pool.acquire() if page_pool is not None else await context.new_page()
+    failed = False
     
     try:
         print(f"    🔍 Visitando página de detalle...", flush=True)
         await detail_page.goto(product_url, timeout=20000, wait_until="domcontentloaded")
         
-        # Esperar a que cargue el contenido
-        await asyncio.sleep(2)
+        # Esperar a que cargue el contenido (título presente y DOM estable)
+        await (waits or WaitEngine(CORTE_INGLES)).wait(detail_page, "detail_loaded")
         
         # EXTRAER MARCA
         brand_selectors = [
@@ -125,14 +142,307 @@ async def extract_detailed_product_info(context, product_url: str):
         print(f"    ✅ Información detallada extraída", flush=True)
         
     except Exception as e:
+        failed = True
         print(f"    ⚠️ Error extrayendo detalles: {e}", flush=True)
     finally:
-        await detail_page.close()
+        # Devolver la pestaña al pool (se recicla si hubo error) o cerrarla
+        if page_pool is not None:
+            await page_pool.release(detail_page, failed=failed)
+        else:
+            await detail_page.close()
     
     return details
 
 
-async def scrape_corte_ingles(search_term: str, max_products: int = DEFAULT_ITERATIONS, detailed: bool = False, headless: bool = False):
+async def search_product_tiles(page, search_term: str, max_products: int, waits: WaitEngine = None,
+                               profile: BrowserProfile = None):
+    """
+    Lanza la búsqueda en El Corte Inglés y extrae la información básica de las
+    tarjetas de producto de la página de resultados. Si se indica un perfil, se
+    anota en él el tiempo de carga de la primera página.
+    
+    Returns:
+        list de dicts de producto (hasta max_products)
+    """
+    if waits is None:
+        waits = WaitEngine(CORTE_INGLES)
+    
+    # Construir URL de búsqueda para El Corte Inglés
+    search_url = f"https://www.elcorteingles.es/search/?term={search_term.replace(' ', '+')}"
+    
+    print(f"🌐 Navegando a: {search_url}", flush=True)
+    
+    load_start = time.perf_counter()
+    try:
+        await page.goto(search_url, timeout=60000, wait_until="domcontentloaded")
+    except Exception as nav_error:
+        print(f"⚠️ Error de navegación inicial: {nav_error}", flush=True)
+        print("🔄 Reintentando con timeout más largo...", flush=True)
+        await page.goto(search_url, timeout=90000, wait_until="networkidle")
+    
+    # Esperar a que aparezca el buscador
+    print("⏳ Esperando que aparezca el buscador...", flush=True)
+    await waits.wait(page, "search_box")
+    load_seconds = time.perf_counter() - load_start
+    if profile is not None:
+        profile.record_first_load(load_seconds)
+    print(f"✅ Página cargada en {load_seconds:.2f}s", flush=True)
+    
+    try:
+        # Esperar y escribir en el input de búsqueda
+        await page.wait_for_selector('input.search-bar__input', timeout=15000)
+        print(f"✏️  Escribiendo término de búsqueda: {search_term}", flush=True)
+        
+        # Limpiar y escribir en el input
+        await page.fill('input.search-bar__input', '')
+        await page.fill('input.search-bar__input', search_term)
+        
+        # Hacer clic en el botón de búsqueda
+        print(f"🔍 Haciendo clic en el botón de búsqueda...", flush=True)
+        await page.click('button.search-bar__button')
+        
+        # Esperar a que carguen los resultados
+        print(f"⏳ Esperando resultados de búsqueda...", flush=True)
+        await waits.wait(page, "search_results")
+        
+        # Hacer scroll para cargar productos lazy-loaded (cada paso espera a que el DOM deje de crecer)
+        print("📜 Cargando productos con scroll...", flush=True)
+        for i in range(6):
+            await page.evaluate("window.scrollBy(0, window.innerHeight)")
+            await waits.wait(page, "scroll_step")
+        
+        await page.evaluate("window.scrollTo(0, 0)")
+        
+    except Exception as search_error:
+        print(f"❌ Error al usar el buscador: {search_error}", flush=True)
+        print("🔄 Intentando continuar de todas formas...", flush=True)
+        await waits.wait(page, "search_fallback")
+    
+    return await extract_product_tiles(page, search_term, max_products)
+
+
+async def extract_product_tiles(page, search_term: str, max_products: int):
+    """
+    Extrae la información básica de las tarjetas de producto de una página de
+    resultados de El Corte Inglés ya cargada (con los productos lazy-loaded visibles).
+    
+    Returns:
+        list de dicts de producto (hasta max_products)
+    """
+    # Selectores para productos de El Corte Inglés
+    selectors_to_try = [
+        'article.product_tile',
+        '.product-item',
+        '[data-test="product-tile"]',
+        'article[class*="product"]',
+        'div.product-grid-item',
+        'a[href*="/p/"]'  # URLs de producto
+    ]
+    
+    product_elements = []
+    selector_used = None
+    
+    for selector in selectors_to_try:
+        try:
+            product_elements = await page.query_selector_all(selector)
+            if len(product_elements) > 0:
+                selector_used = selector
+                print(f"✅ Encontrados {len(product_elements)} productos con selector: {selector}", flush=True)
+                break
+        except:
+            continue
+    
+    if len(product_elements) == 0:
+        print("❌ No se encontraron productos.", flush=True)
+        # Guardar HTML para debug
+        html_content = await page.content()
+        debug_path = Path("data/extractions/corte_ingles/debug_page.html")
+        debug_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(debug_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        print(f"📄 HTML guardado en: {debug_path}", flush=True)
+    
+    products_data = []
+    
+    for idx, element in enumerate(product_elements):
+        if len(products_data) >= max_products:
+            break
+        
+        try:
+            # TÍTULO
+            title_selectors = [
+                'h3',
+                'h2',
+                '.product-title',
+                '[data-test="product-title"]',
+                'a[class*="title"]',
+                '.product-name'
+            ]
+            
+            title = "N/A"
+            for selector in title_selectors:
+                try:
+                    title_elem = await element.query_selector(selector)
+                    if title_elem:
+                        title_text = await title_elem.inner_text()
+                        if title_text and len(title_text) > 3:
+                            title = title_text.strip()
+                            break
+                except:
+                    continue
+            
+            if title == "N/A":
+                continue
+            
+            # PRECIO
+            price_selectors = [
+                '.price',
+                '[data-test="product-price"]',
+                '[class*="price"]',
+                'span[class*="amount"]',
+                '.product-price'
+            ]
+            
+            price = "N/A"
+            for selector in price_selectors:
+                try:
+                    price_elem = await element.query_selector(selector)
+                    if price_elem:
+                        price_text = await price_elem.inner_text()
+                        if price_text:
+                            price = price_text.strip()
+                            break
+                except:
+                    continue
+            
+            # RATING
+            rating_selectors = [
+                '[class*="rating"]',
+                '[data-test="product-rating"]',
+                '.stars',
+                '[class*="star"]'
+            ]
+            
+            rating = "N/A"
+            for selector in rating_selectors:
+                try:
+                    rating_elem = await element.query_selector(selector)
+                    if rating_elem:
+                        # Intentar obtener de atributo aria-label o similar
+                        rating_text = await rating_elem.get_attribute('aria-label')
+                        if not rating_text:
+                            rating_text = await rating_elem.inner_text()
+                        if rating_text:
+                            rating = rating_text.strip()
+                            break
+                except:
+                    continue
+            
+            # NÚMERO DE RESEÑAS
+            reviews_selectors = [
+                '[class*="review"]',
+                '[data-test="reviews-count"]',
+                '.reviews-count',
+                '[class*="opinion"]'
+            ]
+            
+            reviews_count = "0"
+            for selector in reviews_selectors:
+                try:
+                    reviews_elem = await element.query_selector(selector)
+                    if reviews_elem:
+                        reviews_text = await reviews_elem.inner_text()
+                        if reviews_text:
+                            reviews_count = reviews_text.strip()
+                            break
+                except:
+                    continue
+            
+            # URL DEL PRODUCTO
+            product_url = "N/A"
+            
+            # Intentar diferentes selectores para el link
+            link_selectors = [
+                'a[href*="/p/"]',
+                'a.product-link',
+                'a[class*="product"]',
+                'a[href]'
+            ]
+            
+            link_elem = None
+            for selector in link_selectors:
+                try:
+                    link_elem = await element.query_selector(selector)
+                    if link_elem:
+                        href = await link_elem.get_attribute("href")
+                        # Filtrar enlaces válidos (no javascript:void, no #)
+                        if href and not href.startswith('javascript:') and not href.startswith('#'):
+                            product_url = href
+                            break
+                except:
+                    continue
+            
+            if product_url != "N/A" and not product_url.startswith("http"):
+                product_url = f"https://www.elcorteingles.es{product_url}"
+            
+            # IMAGEN
+            image_elem = await element.query_selector('img')
+            image_url = "N/A"
+            if image_elem:
+                # Intentar src, data-src, srcset
+                image_url = await image_elem.get_attribute("src")
+                if not image_url or 'placeholder' in image_url:
+                    image_url = await image_elem.get_attribute("data-src")
+                if not image_url:
+                    srcset = await image_elem.get_attribute("srcset")
+                    if srcset:
+                        # Tomar la primera URL del srcset
+                        image_url = srcset.split(',')[0].split(' ')[0]
+            
+            if image_url and not image_url.startswith("http"):
+                if image_url.startswith("//"):
+                    image_url = f"https:{image_url}"
+                elif image_url.startswith("/"):
+                    image_url = f"https://www.elcorteingles.es{image_url}"
+            
+            # ID DEL PRODUCTO (extraer de URL)
+            product_id = "N/A"
+            if product_url != "N/A":
+                id_match = re.search(r'/p/([^/]+)', product_url)
+                if id_match:
+                    product_id = id_match.group(1)
+            
+            # MARCA (intentar extraer del título o de un elemento específico)
+            brand = "N/A"
+            brand_elem = await element.query_selector('[class*="brand"], [data-test="brand"]')
+            if brand_elem:
+                brand = await brand_elem.inner_text()
+            
+            product_data = {
+                "platform": "corte_ingles",
+                "product_id": product_id,
+                "title": title,
+                "brand": brand.strip() if brand != "N/A" else "N/A",
+                "price": price,
+                "rating": rating,
+                "reviews_count": reviews_count,
+                "url": product_url,
+                "image_url": image_url,
+                "search_term": search_term,
+                "position": len(products_data) + 1
+            }
+            
+            products_data.append(product_data)
+            print(f"  ✅ Producto {len(products_data)}: {title[:50]}...", flush=True)
+            
+        except Exception as e:
+            print(f"  ⚠️ Error en producto {idx + 1}: {e}", flush=True)
+            continue
+    
+    return products_data
+
+
+async def scrape_corte_ingles(search_term: str, max_products: int = DEFAULT_ITERATIONS, detailed: bool = False, headless: bool = False, block_profile: str = None, pool: BrowserPool = None, browser_endpoint: str = None, checkpoint: RunCheckpoint = None, deadline: float = None, priority: str = PRIORITY_POSITION, profile: BrowserProfile = None, network: NetworkRecorder = None, context_pages: int = DEFAULT_CONTEXT_PAGES, max_browser_mb: float = DEFAULT_MAX_BROWSER_MB):
     """
     Realiza scraping de productos en El Corte Inglés
     
@@ -141,324 +451,119 @@ async def scrape_corte_ingles(search_term: str, max_products: int = DEFAULT_ITER
         max_products: Número máximo de productos a scrapear
         detailed: Si es True, visita cada producto para obtener información detallada
         headless: Si es True, ejecuta el navegador sin ventana visible
+        block_profile: Perfil de bloqueo de recursos ("lean", "aggressive"...) o None para cargar todo
+        pool: BrowserPool compartido del que tomar prestado un contexto caliente (opcional)
+        browser_endpoint: Endpoint CDP de un navegador ya arrancado al que conectarse (opcional)
+        checkpoint: RunCheckpoint opcional; guarda los productos encontrados y cada detalle
+            terminado, y al reanudar (--resume) se salta la búsqueda y los detalles completados
+        deadline: Segundos disponibles (None: sin límite); al agotarse no se visitan más productos y
+            se guardan marcados con "details_missing"
+        priority: Orden de las visitas de detalle: "position" o "reviews" (más reseñas primero)
+        profile: BrowserProfile opcional para el navegador propio (no aplica si se pasa un pool): cookies,
+            consentimiento y caché de disco de ejecuciones anteriores
+        network: NetworkRecorder opcional (--network-stats); anota cada petición del contexto con su tipo,
+            host, bytes, estado y duración
+        context_pages: Páginas de detalle que sirve un contexto antes de sustituirlo por uno nuevo (0: sin límite)
+        max_browser_mb: RSS del navegador (MB) a partir del cual se sustituye el contexto de detalle (0: sin límite)
     
     Returns:
         list: Lista de productos scrapeados
     """
     products = []
+    budget = ScrapeBudget.from_seconds(deadline)
     
-    async with async_playwright() as p:
-        print("🌐 Iniciando navegador...", flush=True)
-        print(f"🖥️  Modo headless: {'Activado (sin ventana)' if headless else 'Desactivado (con ventana)'}", flush=True)
-        
-        try:
-            browser = await p.chromium.launch(
+    async with AsyncExitStack() as stack:
+        if pool is None:
+            # Sin pool compartido: navegador propio (o conexión CDP) solo para esta ejecución
+            print("🌐 Iniciando navegador...", flush=True)
+            print(f"🖥️  Modo headless: {'Activado (sin ventana)' if headless else 'Desactivado (con ventana)'}", flush=True)
+            pool = await stack.enter_async_context(BrowserPool(
+                max_browsers=1,
                 headless=headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-            )
-        except Exception as e:
-            print(f"❌ Error al iniciar navegador en modo {'headless' if headless else 'visible'}: {e}", flush=True)
-            print(f"🔄 Intentando con modo {'visible' if headless else 'headless'}...", flush=True)
-            browser = await p.chromium.launch(
-                headless=not headless,  # Invertir el modo
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-            )
+                launch_args=BROWSER_ARGS,
+                browser_endpoint=browser_endpoint,
+                launch_fallback=True,  # Si falla, reintentar con el modo headless invertido
+                profile=profile
+            ))
         
         # Configurar contexto
-        context = await browser.new_context(
+        context_options = dict(
             user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             viewport={"width": 1920, "height": 1080},
             locale='es-ES'
         )
+        context = await stack.enter_async_context(pool.context(**context_options))
         
-        page = await context.new_page()
+        # Modo lean: bloquear imágenes, fuentes, vídeos y trackers en todas las pestañas
+        blocker = None
+        if block_profile:
+            blocker = ResourceBlocker(block_profile)
+            await blocker.attach(context)
+        # Contabilidad de red por petición; el contexto vuelve al pool sin sus listeners
+        if network is not None:
+            network.attach(context)
+            stack.callback(network.detach)
         
-        # Construir URL de búsqueda para El Corte Inglés
-        search_url = f"https://www.elcorteingles.es/search/?term={search_term.replace(' ', '+')}"
+        page = await context.new_page()
+        # Esperas por eventos (selector / DOM estable) en lugar de pausas fijas
+        waits = WaitEngine(CORTE_INGLES)
+        page_pool = None
         
         print(f"🔍 Buscando: {search_term}", flush=True)
         print(f"🎯 Objetivo: {max_products} productos", flush=True)
         print(f"📊 Modo detallado: {'Activado' if detailed else 'Desactivado'}", flush=True)
         
         try:
-            print(f"🌐 Navegando a: {search_url}", flush=True)
-            
-            try:
-                await page.goto(search_url, timeout=60000, wait_until="domcontentloaded")
-            except Exception as nav_error:
-                print(f"⚠️ Error de navegación inicial: {nav_error}", flush=True)
-                print("🔄 Reintentando con timeout más largo...", flush=True)
-                await page.goto(search_url, timeout=90000, wait_until="networkidle")
-            
-            # Esperar a que aparezca el buscador
-            print("⏳ Esperando que aparezca el buscador...", flush=True)
-            await asyncio.sleep(3)
-            
-            try:
-                # Esperar y escribir en el input de búsqueda
-                await page.wait_for_selector('input.search-bar__input', timeout=15000)
-                print(f"✏️  Escribiendo término de búsqueda: {search_term}", flush=True)
-                
-                # Limpiar y escribir en el input
-                await page.fill('input.search-bar__input', '')
-                await page.fill('input.search-bar__input', search_term)
-                await asyncio.sleep(1)
-                
-                # Hacer clic en el botón de búsqueda
-                print(f"🔍 Haciendo clic en el botón de búsqueda...", flush=True)
-                await page.click('button.search-bar__button')
-                
-                # Esperar a que carguen los resultados
-                print(f"⏳ Esperando resultados de búsqueda...", flush=True)
-                await asyncio.sleep(5)
-                
-                # Hacer scroll para cargar productos lazy-loaded
-                print("📜 Cargando productos con scroll...", flush=True)
-                for i in range(6):
-                    await page.evaluate("window.scrollBy(0, window.innerHeight)")
-                    await asyncio.sleep(1)
-                
-                await page.evaluate("window.scrollTo(0, 0)")
-                await asyncio.sleep(1)
-                
-            except Exception as search_error:
-                print(f"❌ Error al usar el buscador: {search_error}", flush=True)
-                print("🔄 Intentando continuar de todas formas...", flush=True)
-                await asyncio.sleep(3)
-            
-            # Selectores para productos de El Corte Inglés
-            selectors_to_try = [
-                'article.product_tile',
-                '.product-item',
-                '[data-test="product-tile"]',
-                'article[class*="product"]',
-                'div.product-grid-item',
-                'a[href*="/p/"]'  # URLs de producto
-            ]
-            
-            product_elements = []
-            selector_used = None
-            
-            for selector in selectors_to_try:
-                try:
-                    product_elements = await page.query_selector_all(selector)
-                    if len(product_elements) > 0:
-                        selector_used = selector
-                        print(f"✅ Encontrados {len(product_elements)} productos con selector: {selector}", flush=True)
-                        break
-                except:
-                    continue
-            
-            if len(product_elements) == 0:
-                print("❌ No se encontraron productos.", flush=True)
-                # Guardar HTML para debug
-                html_content = await page.content()
-                debug_path = Path("data/extractions/corte_ingles/debug_page.html")
-                debug_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(debug_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                print(f"📄 HTML guardado en: {debug_path}", flush=True)
-            
-            products_data = []
-            
-            for idx, element in enumerate(product_elements):
-                if len(products_data) >= max_products:
-                    break
-                
-                try:
-                    # TÍTULO
-                    title_selectors = [
-                        'h3',
-                        'h2',
-                        '.product-title',
-                        '[data-test="product-title"]',
-                        'a[class*="title"]',
-                        '.product-name'
-                    ]
-                    
-                    title = "N/A"
-                    for selector in title_selectors:
-                        try:
-                            title_elem = await element.query_selector(selector)
-                            if title_elem:
-                                title_text = await title_elem.inner_text()
-                                if title_text and len(title_text) > 3:
-                                    title = title_text.strip()
-                                    break
-                        except:
-                            continue
-                    
-                    if title == "N/A":
-                        continue
-                    
-                    # PRECIO
-                    price_selectors = [
-                        '.price',
-                        '[data-test="product-price"]',
-                        '[class*="price"]',
-                        'span[class*="amount"]',
-                        '.product-price'
-                    ]
-                    
-                    price = "N/A"
-                    for selector in price_selectors:
-                        try:
-                            price_elem = await element.query_selector(selector)
-                            if price_elem:
-                                price_text = await price_elem.inner_text()
-                                if price_text:
-                                    price = price_text.strip()
-                                    break
-                        except:
-                            continue
-                    
-                    # RATING
-                    rating_selectors = [
-                        '[class*="rating"]',
-                        '[data-test="product-rating"]',
-                        '.stars',
-                        '[class*="star"]'
-                    ]
-                    
-                    rating = "N/A"
-                    for selector in rating_selectors:
-                        try:
-                            rating_elem = await element.query_selector(selector)
-                            if rating_elem:
-                                # Intentar obtener de atributo aria-label o similar
-                                rating_text = await rating_elem.get_attribute('aria-label')
-                                if not rating_text:
-                                    rating_text = await rating_elem.inner_text()
-                                if rating_text:
-                                    rating = rating_text.strip()
-                                    break
-                        except:
-                            continue
-                    
-                    # NÚMERO DE RESEÑAS
-                    reviews_selectors = [
-                        '[class*="review"]',
-                        '[data-test="reviews-count"]',
-                        '.reviews-count',
-                        '[class*="opinion"]'
-                    ]
-                    
-                    reviews_count = "0"
-                    for selector in reviews_selectors:
-                        try:
-                            reviews_elem = await element.query_selector(selector)
-                            if reviews_elem:
-                                reviews_text = await reviews_elem.inner_text()
-                                if reviews_text:
-                                    reviews_count = reviews_text.strip()
-                                    break
-                        except:
-                            continue
-                    
-                    # URL DEL PRODUCTO
-                    product_url = "N/A"
-                    
-                    # Intentar diferentes selectores para el link
-                    link_selectors = [
-                        'a[href*="/p/"]',
-                        'a.product-link',
-                        'a[class*="product"]',
-                        'a[href]'
-                    ]
-                    
-                    link_elem = None
-                    for selector in link_selectors:
-                        try:
-                            link_elem = await element.query_selector(selector)
-                            if link_elem:
-                                href = await link_elem.get_attribute("href")
-                                # Filtrar enlaces válidos (no javascript:void, no #)
-                                if href and not href.startswith('javascript:') and not href.startswith('#'):
-                                    product_url = href
-                                    break
-                        except:
-                            continue
-                    
-                    if product_url != "N/A" and not product_url.startswith("http"):
-                        product_url = f"https://www.elcorteingles.es{product_url}"
-                    
-                    # IMAGEN
-                    image_elem = await element.query_selector('img')
-                    image_url = "N/A"
-                    if image_elem:
-                        # Intentar src, data-src, srcset
-                        image_url = await image_elem.get_attribute("src")
-                        if not image_url or 'placeholder' in image_url:
-                            image_url = await image_elem.get_attribute("data-src")
-                        if not image_url:
-                            srcset = await image_elem.get_attribute("srcset")
-                            if srcset:
-                                # Tomar la primera URL del srcset
-                                image_url = srcset.split(',')[0].split(' ')[0]
-                    
-                    if image_url and not image_url.startswith("http"):
-                        if image_url.startswith("//"):
-                            image_url = f"https:{image_url}"
-                        elif image_url.startswith("/"):
-                            image_url = f"https://www.elcorteingles.es{image_url}"
-                    
-                    # ID DEL PRODUCTO (extraer de URL)
-                    product_id = "N/A"
-                    if product_url != "N/A":
-                        id_match = re.search(r'/p/([^/]+)', product_url)
-                        if id_match:
-                            product_id = id_match.group(1)
-                    
-                    # MARCA (intentar extraer del título o de un elemento específico)
-                    brand = "N/A"
-                    brand_elem = await element.query_selector('[class*="brand"], [data-test="brand"]')
-                    if brand_elem:
-                        brand = await brand_elem.inner_text()
-                    
-                    product_data = {
-                        "platform": "corte_ingles",
-                        "product_id": product_id,
-                        "title": title,
-                        "brand": brand.strip() if brand != "N/A" else "N/A",
-                        "price": price,
-                        "rating": rating,
-                        "reviews_count": reviews_count,
-                        "url": product_url,
-                        "image_url": image_url,
-                        "search_term": search_term,
-                        "position": len(products_data) + 1
-                    }
-                    
-                    products_data.append(product_data)
-                    print(f"  ✅ Producto {len(products_data)}: {title[:50]}...", flush=True)
-                    
-                except Exception as e:
-                    print(f"  ⚠️ Error en producto {idx + 1}: {e}", flush=True)
-                    continue
+            if checkpoint is not None and checkpoint.pagination_done:
+                # Reanudación: los productos de la búsqueda ya están en el checkpoint
+                products_data = [card for _, card in sorted(checkpoint.cards.items())]
+                print(f"♻️  {len(products_data)} productos recuperados del checkpoint", flush=True)
+            else:
+                products_data = await search_product_tiles(page, search_term, max_products, waits, pool.profile)
+                if checkpoint is not None and products_data:
+                    checkpoint.record_page(products_data, {"url": page.url, "page_num": 1, "collected": len(products_data)})
+                    checkpoint.mark_pagination_done()
             
             print(f"📦 Productos extraídos: {len(products_data)}", flush=True)
             
             # Si modo detallado, visitar cada producto
             if detailed and len(products_data) > 0:
                 print(f"🔍 Extrayendo información detallada de {len(products_data)} productos...", flush=True)
-                for idx, product_data in enumerate(products_data, 1):
+                
+                async def setup_detail_context(detail_context):
+                    if blocker:
+                        await blocker.attach(detail_context)
+                    if network is not None:
+                        network.attach(detail_context)
+                
+                # Los detalles se visitan de uno en uno: una única pestaña reutilizada, en un contexto propio
+                # (con las cookies de la búsqueda) que se renueva por páginas servidas o por memoria
+                page_pool = RecyclingPagePool(pool, context_options, context, max_pages=1,
+                                              max_context_pages=context_pages, max_browser_mb=max_browser_mb,
+                                              setup=setup_detail_context)
+                stack.push_async_callback(page_pool.close)
+                await page_pool.start()
+                for idx, product_data in enumerate(order_by_priority(products_data, priority), 1):
+                    # Terminado en una ejecución anterior (--resume)
+                    if checkpoint is not None and checkpoint.is_completed(product_data):
+                        product_data.update(checkpoint.completed[product_data["position"]])
+                        print(f"♻️  [{idx}/{len(products_data)}] Ya completado", flush=True)
+                        continue
+                    # Sin tiempo: el producto se guarda sin detalles
+                    if budget.expired():
+                        budget.skip(product_data)
+                        continue
                     if product_data.get("url") and product_data["url"] != "N/A":
                         print(f"🌐 [{idx}/{len(products_data)}] Visitando: {product_data['title'][:40]}...", flush=True)
-                        detailed_info = await extract_detailed_product_info(context, product_data["url"])
+                        detailed_info = await extract_detailed_product_info(context, product_data["url"], waits, page_pool)
                         
                         # Actualizar marca si se encontró
                         if detailed_info.get("brand") and detailed_info["brand"] != "N/A":
                             product_data["brand"] = detailed_info["brand"]
                         
                         product_data.update(detailed_info)
+                        if checkpoint is not None:
+                            checkpoint.record_completed(product_data)
                         print(f"✔️  [{idx}/{len(products_data)}] Completado", flush=True)
             
             # Añadir todos los productos
@@ -472,7 +577,14 @@ async def scrape_corte_ingles(search_term: str, max_products: int = DEFAULT_ITER
             traceback.print_exc()
         
         finally:
-            await browser.close()
+            budget.print_summary()
+            waits.print_summary()
+            if page_pool is not None:
+                page_pool.print_summary()
+            if blocker:
+                blocker.print_summary()
+            if network is not None:
+                network.print_summary()
     
     return products
 
@@ -497,26 +609,60 @@ def save_to_json(products, search_term):
 
 async def main():
     """Función principal"""
+    resume_run_id = get_cli_option("resume")
     if len(sys.argv) < 2:
         print("❌ Error: Debes proporcionar un término de búsqueda")
-        print("📝 Uso: python scraper_temu.py <término_búsqueda> [max_productos] [--detailed] [--headless]")
+        print("📝 Uso: python scraper_temu.py <término_búsqueda> [max_productos] [--detailed] [--headless] [--lean] [--deadline=10m] [--priority=reviews] [--profile[=NOMBRE]] [--network-stats] [--context-pages=N] [--max-browser-mb=N]")
         print("📝 Ejemplo: python scraper_temu.py 'cafe' 30 --detailed --headless")
+        print("📝 Reanudar: python scraper_temu.py --resume <run_id> [--headless]")
         sys.exit(1)
     
-    search_term = sys.argv[1]
-    max_products = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else DEFAULT_ITERATIONS
-    detailed = "--detailed" in sys.argv
+    if resume_run_id:
+        # Término y parámetros de la ejecución interrumpida
+        checkpoint = RunCheckpoint.load(resume_run_id)
+        checkpoint.print_resume_info()
+        search_term = checkpoint.search_term
+        max_products = checkpoint.params.get("max_products", DEFAULT_ITERATIONS)
+        detailed = checkpoint.params.get("detailed", False)
+    else:
+        search_term = sys.argv[1]
+        max_products = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else DEFAULT_ITERATIONS
+        detailed = "--detailed" in sys.argv
+        checkpoint = RunCheckpoint.create("corte_ingles", search_term, {"max_products": max_products, "detailed": detailed})
     headless_mode = "--headless" in sys.argv
+    block_profile = get_block_profile()
+    browser_endpoint = get_cli_option("browser-endpoint")
+    profile = get_browser_profile("corte_ingles")
+    # Peticiones de red por tipo de página y host, guardadas junto a la extracción
+    network = NetworkRecorder("corte_ingles") if "--network-stats" in sys.argv else None
+    context_pages, max_browser_mb = get_memory_limits()
     
     print("=" * 80)
     print("🛒 EL CORTE INGLÉS SCRAPER")
     print("=" * 80)
     print(f"🖥️  Modo: {'Headless (sin ventana)' if headless_mode else 'Con ventana visible'}")
+    print(f"🆔 Run ID: {checkpoint.run_id} (reanudar con: python scraper_temu.py --resume {checkpoint.run_id})")
     
-    products = await scrape_corte_ingles(search_term, max_products, detailed, headless_mode)
+    try:
+        products = await scrape_corte_ingles(search_term, max_products, detailed, headless_mode, block_profile=block_profile, browser_endpoint=browser_endpoint, checkpoint=checkpoint, deadline=get_deadline(), priority=get_priority(), profile=profile, network=network, context_pages=context_pages, max_browser_mb=max_browser_mb)
+    except BaseException:
+        print(f"\n💾 Progreso guardado. Reanuda con: python scraper_temu.py --resume {checkpoint.run_id}", flush=True)
+        raise
+    finally:
+        if profile is not None:
+            profile.close()
+            profile.print_summary()
     
     if products:
-        save_to_json(products, search_term)
+        filename = save_to_json(products, search_term)
+        if network is not None:
+            network.save(filename)
+        # Con productos sin detalles por el deadline, el checkpoint se conserva para completarlos
+        if any(product.get("details_missing") == MISSING_DEADLINE for product in products):
+            print(f"⏳ Productos sin detalles por el deadline. "
+                  f"Complétalos con: python scraper_temu.py --resume {checkpoint.run_id}", flush=True)
+        else:
+            checkpoint.finish()
         print("\n✅ Scraping completado exitosamente!")
     else:
         print("\n⚠️ No se encontraron productos")
@@ -0,0 +1,81 @@
+"""
+Selectores y reglas de las tarjetas de resultados de Amazon
+
+Única definición para los tres extractores de la información básica:
+EXTRACT_SEARCH_RESULTS_JS (dentro de Chromium, recibe CARD_SELECTORS como
+argumento), extract_product_basic_info (handles de Playwright) y
+parse_search_card de reextract.py (HTML capturado, sin red). Un campo nuevo o
+un selector que cambia se toca aquí una sola vez; test_reextract.py comprueba
+que el parser offline produce lo mismo que el script del navegador.
+"""
+import re
+
+SEARCH_RESULT_SELECTOR = '[data-component-type="s-search-result"]'
+AMAZON_BASE_URL = "https://www.amazon.es"
+
+# Selectores por campo. Las listas se prueban en orden y gana el primero con texto
+CARD_SELECTORS = {
+    "title": [
+        "h2 a span",
+        "h2 span",
+        ".a-size-medium.a-color-base.a-text-normal",
+        ".a-size-base-plus.a-color-base.a-text-normal",
+        "h2.a-size-mini a span",
+    ],
+    "link": ["h2 a", "a.a-link-normal"],
+    "price": ".a-price .a-offscreen",
+    "price_whole": ".a-price-whole",
+    "price_fraction": ".a-price-fraction",
+    "rating": ".a-icon-alt",
+    "reviews_count": [
+        "span.a-size-base.s-underline-text",
+        "span[aria-label*='valoraciones']",
+        ".a-size-base",
+    ],
+    "image": "img.s-image",
+    "specs_container": "div.a-section.a-spacing-small",
+    "specs_row": "div.a-row",
+    "brand": [
+        "h5 span.a-size-base.a-color-base",
+        "span.a-size-base-plus.a-color-base",
+        "div.a-row.a-size-base.a-color-secondary span.a-size-base.a-color-base",
+        ".s-line-clamp-1 .a-size-base-plus",
+        "span.a-color-base.puis-normal-weight-text",
+    ],
+    "prime": "i.a-icon-prime, span[aria-label='Amazon Prime']",
+    "free_shipping": "span[aria-label*='envío']",
+    "availability": ".a-size-base.a-color-price, .a-size-base.a-color-success",
+    "discount": ".s-coupon-unclipped, .savingPriceOverride",
+    "original_price": ".a-price.a-text-price .a-offscreen",
+    "seller": ".a-size-base.a-color-secondary",
+    "options": ".a-button-text",
+}
+
+# Envío gratis también por el texto de cualquier <span> de la tarjeta
+FREE_SHIPPING_TEXT = "envío gratis"
+# Lo mismo en una sola consulta de Playwright (:has-text no es CSS estándar)
+FREE_SHIPPING_QUERY = f"{CARD_SELECTORS['free_shipping']}, span:has-text('Envío GRATIS')"
+
+MAX_OPTIONS = 5  # Opciones de color/tamaño que se guardan por tarjeta
+MAX_BRAND_LENGTH = 50
+SPEC_BRAND_KEYS = ("brand", "marca")  # Filas "Clave: valor" de la tarjeta que dan la marca
+
+
+def absolute_url(href: str) -> str:
+    """URL del producto con el dominio de Amazon si el enlace es relativo"""
+    if href and not href.startswith("http"):
+        return AMAZON_BASE_URL + href
+    return href
+
+
+def is_brand_candidate(text: str) -> bool:
+    """
+    Si el texto de un selector de marca parece una marca: corto, no numérico,
+    sin precio ni número de valoraciones (misma regla que EXTRACT_SEARCH_RESULTS_JS)
+    """
+    return bool(text and len(text) < MAX_BRAND_LENGTH and not re.fullmatch(r"[0-9]+", re.sub(r"[.,]", "", text))
+                and "€" not in text and "valoraciones" not in text.lower())
+
+
+def is_brand_key(key: str) -> bool:
+    return any(brand_key in key.lower() for brand_key in SPEC_BRAND_KEYS)
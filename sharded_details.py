@@ -0,0 +1,209 @@
+"""
+Extracción de detalles repartida en varios procesos (shards)
+
+Un único proceso de Python atiende todas las pestañas de la FASE 3, así que el
+manejo de mensajes de Playwright y el trabajo en Python quedan limitados a un
+núcleo. Con --shards=N la lista de URLs de detalle se reparte en N procesos,
+cada uno con su propio Playwright, navegador y contexto; los resultados vuelven
+al proceso principal, que los combina por posición.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+
+from adaptive_concurrency import OUTCOME_ERROR, OUTCOME_OK, AdaptiveLimiter
+from memory_guard import DEFAULT_CONTEXT_PAGES, DEFAULT_MAX_BROWSER_MB, RecyclingPagePool
+from retry_queue import DEFAULT_MAX_ATTEMPTS, RetryQueue
+from scrape_budget import MISSING_DEADLINE, BudgetExhausted, ScrapeBudget
+
+
+def split_into_shards(items: list, shards: int) -> list:
+    """
+    Reparte los elementos en shards de forma intercalada (0, N, 2N... al primero),
+    para que cada shard reciba productos de todas las páginas y la carga quede equilibrada.
+    """
+    shards = max(1, min(shards, len(items)))
+    return [items[i::shards] for i in range(shards)]
+
+
+async def _extract_shard(shard_id: int, jobs: list, headless: bool, block_profile: str, http_details: bool,
+                         adaptive_concurrency: bool, user_agent: str, max_rate: float = 0,
+                         max_attempts: int = DEFAULT_MAX_ATTEMPTS, fast_extract: bool = True,
+                         deadline_at: float = None, capture_run: tuple = None, network_stats: bool = False,
+                         context_pages: int = DEFAULT_CONTEXT_PAGES,
+                         max_browser_mb: float = DEFAULT_MAX_BROWSER_MB) -> dict:
+    """Extrae los detalles de un shard con un navegador propio (se ejecuta en el proceso hijo)"""
+    # Import diferido: main importa este módulo y el hijo necesita sus funciones de extracción
+    from browser_pool import BrowserPool
+    from html_capture import CaptureStore
+    from http_detail_fetcher import HttpDetailEngine
+    from main import fetch_product_details
+    from network_accounting import NetworkRecorder
+    from resource_blocker import ResourceBlocker
+    from throughput_governor import AMAZON_DOMAIN, DomainGovernor
+    from wait_strategy import AMAZON, WaitEngine
+
+    limiter = AdaptiveLimiter() if adaptive_concurrency else AdaptiveLimiter(initial=5, min_limit=5, max_limit=5)
+    waits = WaitEngine(AMAZON)
+    # El ritmo de amazon.es se comparte con el proceso principal y el resto de shards (estado en SQLite)
+    governor = DomainGovernor(AMAZON_DOMAIN, max_rate=max_rate) if max_rate else None
+    retry_queue = RetryQueue(max_attempts=max_attempts)
+    budget = ScrapeBudget(deadline_at)
+    # Las capturas van al mismo índice y ejecución que las del proceso principal
+    capture = CaptureStore("amazon", *capture_run) if capture_run else None
+    # Las peticiones de red se devuelven al proceso principal, que las suma a las suyas
+    network = NetworkRecorder("amazon") if network_stats else None
+    results = []
+    start = time.perf_counter()
+
+    async with AsyncExitStack() as stack:
+        pool = await stack.enter_async_context(BrowserPool(max_browsers=1, headless=headless, launch_args=[]))
+        context = await stack.enter_async_context(pool.context(user_agent=user_agent))
+        blocker = ResourceBlocker(block_profile) if block_profile else None
+
+        async def setup_context(new_context):
+            if blocker is not None:
+                await blocker.attach(new_context)
+            if network is not None:
+                network.attach(new_context)
+
+        await setup_context(context)
+        if network is not None:
+            stack.callback(network.detach)
+        http_engine = None
+        if http_details:
+            http_engine = await stack.enter_async_context(HttpDetailEngine(max_connections=limiter.max_limit * 2,
+                                                                           capture=capture, network=network))
+        # Las pestañas van a un contexto que se renueva por páginas servidas o por la memoria de este navegador
+        page_pool = RecyclingPagePool(pool, {"user_agent": user_agent}, context, max_pages=limiter.max_limit,
+                                      max_context_pages=context_pages, max_browser_mb=max_browser_mb,
+                                      setup=setup_context)
+        stack.push_async_callback(page_pool.close)
+        await page_pool.start()
+        if governor is not None:
+            stack.callback(governor.close)
+        if capture is not None:
+            stack.callback(capture.close)
+
+        async def attempt(job, attempt_num):
+            async with limiter.slot() as slot:
+                if budget.expired():
+                    # Sin tiempo: el hueco se libera sin registrar ningún resultado
+                    slot["outcome"] = None
+                else:
+                    outcome = {}
+                    try:
+                        details = await fetch_product_details(context, job["url"], outcome, http_engine, waits,
+                                                              page_pool, governor, fast_extract, capture)
+                    except Exception as e:
+                        details, outcome = {}, {"kind": OUTCOME_ERROR, "error": str(e)}
+                    slot["outcome"] = outcome.get("kind", OUTCOME_ERROR)
+                    return details, outcome
+            raise BudgetExhausted()
+
+        async def extract(job):
+            try:
+                details, outcome = await retry_queue.run(job, lambda attempt_num: attempt(job, attempt_num), budget)
+            except BudgetExhausted:
+                # Sin tiempo para empezar la visita: el proceso principal lo marca sin detalles
+                details, outcome = {}, {"kind": MISSING_DEADLINE}
+            results.append({"position": job["position"], "details": details, "outcome": outcome["kind"]})
+            print(f"   [shard {shard_id}] {len(results)}/{len(jobs)} posición {job['position']}", flush=True)
+
+        await asyncio.gather(*[extract(job) for job in jobs])
+
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for result in results if result["outcome"] == OUTCOME_OK)
+    return {
+        "results": results,
+        "dead_letters": retry_queue.dead_letters,
+        "network": network.export() if network is not None else None,
+        "stats": {
+            "shard": shard_id,
+            "pid": os.getpid(),
+            "products": len(jobs),
+            "ok": ok,
+            "failed": len(results) - ok,
+            "retries": retry_queue.stats["retries"],
+            "recovered": retry_queue.stats["recovered"],
+            "seconds": round(elapsed, 2),
+            "products_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+            "final_limit": limiter.limit,
+            "waited_seconds": waits.summary()["waited_seconds"],
+            "page_reuses": page_pool.stats["reuses"],
+            "governor_wait_seconds": round(governor.stats["wait_seconds"], 2) if governor is not None else 0.0,
+            "captured": capture.stats["pages"] if capture is not None else 0,
+            "context_recycles": page_pool.memory["recycles"],
+            "peak_browser_mb": round(page_pool.memory["peak_mb"] or 0.0),
+        },
+    }
+
+
+def _run_shard(shard_id: int, jobs: list, options: dict) -> dict:
+    """Punto de entrada del proceso hijo"""
+    return asyncio.run(_extract_shard(shard_id, jobs, **options))
+
+
+async def run_sharded_details(jobs: list, shards: int, on_shard_done=None, **options) -> list:
+    """
+    Extrae los detalles de jobs repartidos en varios procesos.
+
+    Args:
+        jobs: Lista de {"position", "url"} a visitar
+        shards: Número de procesos
+        on_shard_done: Callback opcional llamado con el resultado de cada shard en cuanto
+            termina ({"results": [...], "dead_letters": [...], "network": {...}, "stats": {...}}), para
+            combinar resultados sin esperar al shard más lento
+        **options: headless, block_profile, http_details, adaptive_concurrency, user_agent,
+            max_rate (ritmo máximo del gobernador de amazon.es; 0 para no usarlo), max_attempts, fast_extract,
+            deadline_at (time.time() a partir del cual no se empiezan visitas),
+            capture_run ((término, run_id) para guardar el HTML de las páginas en el CaptureStore, o None),
+            network_stats (si es True cada shard devuelve sus peticiones de red en "network"),
+            context_pages y max_browser_mb (umbrales de renovación del contexto de detalle de cada shard)
+
+    Returns:
+        Estadísticas de cada shard (los shards que fallan por completo llevan "error")
+    """
+    shard_jobs = split_into_shards(jobs, shards)
+    loop = asyncio.get_running_loop()
+    # spawn: un fork de un proceso con un bucle asyncio y Playwright en marcha no es seguro
+    executor = ProcessPoolExecutor(max_workers=len(shard_jobs), mp_context=multiprocessing.get_context("spawn"))
+
+    async def run_one(shard_id, chunk):
+        try:
+            shard = await loop.run_in_executor(executor, _run_shard, shard_id, chunk, options)
+        except Exception as e:
+            print(f"❌ [shard {shard_id}] Error: {e}", flush=True)
+            return {"shard": shard_id, "products": len(chunk), "ok": 0, "failed": len(chunk), "error": str(e)}
+        if on_shard_done:
+            on_shard_done(shard)
+        return shard["stats"]
+
+    try:
+        stats = await asyncio.gather(*[run_one(shard_id, chunk) for shard_id, chunk in enumerate(shard_jobs, 1)])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return list(stats)
+
+
+def print_shard_summary(stats: list, elapsed: float):
+    """Imprime las estadísticas por shard y el total"""
+    total = sum(entry["products"] for entry in stats)
+    ok = sum(entry["ok"] for entry in stats)
+    print(f"\n🧩 Shards de detalle: {len(stats)} procesos, {ok}/{total} correctos en {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.2f} productos/s)", flush=True)
+    for entry in stats:
+        if "error" in entry:
+            print(f"   shard {entry['shard']}: ❌ {entry['products']} productos sin procesar ({entry['error']})",
+                  flush=True)
+            continue
+        print(f"   shard {entry['shard']} (pid {entry['pid']}): {entry['ok']}/{entry['products']} correctos, "
+              f"{entry['failed']} fallidos ({entry['retries']} reintentos, {entry['recovered']} recuperados), "
+              f"{entry['seconds']:.1f}s, {entry['products_per_second']:.2f} productos/s, "
+              f"concurrencia final {entry['final_limit']}, esperas {entry['waited_seconds']:.1f}s, "
+              f"{entry['page_reuses']} pestañas reutilizadas, gobernador {entry['governor_wait_seconds']:.1f}s, "
+              f"navegador hasta {entry['peak_browser_mb']} MB ({entry['context_recycles']} contextos renovados)",
+              flush=True)
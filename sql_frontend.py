@@ -13,8 +13,13 @@ import time
 import queue
 import re
 import base64
+from contextlib import ExitStack
 from datetime import datetime
 
+from browser_pool import BrowserService
+from extraction_store import count_products, find_extraction_file, list_extraction_files
+from throughput_governor import read_governor_states
+
 app = Flask(__name__)
 
 # Directorio para guardar gráficos
@@ -24,6 +29,10 @@ CHARTS_DIR.mkdir(parents=True, exist_ok=True)
 # Cola global para eventos de progreso
 progress_queues = {}
 
+# Navegadores Chromium calientes compartidos por todos los trabajos de scraping
+# (se arrancan bajo demanda con el primer scraping en modo headless)
+browser_service = BrowserService(max_browsers=int(os.environ.get('SCRAPER_BROWSER_POOL_SIZE', 2)))
+
 # Configuración de la base de datos
 DB_CONFIG = {
     'host': 'localhost',
@@ -267,6 +276,7 @@ def start_scraping():
     search_term = data.get('search_term', '').strip()
     num_products = data.get('num_products', 50)
     headless = data.get('headless', True)  # Por defecto en modo headless
+    block_profile = data.get('block_profile')  # 'lean', 'aggressive' o None (cargar todo)
     
     if not search_term:
         return jsonify({'success': False, 'error': 'Término de búsqueda vacío'})
@@ -306,6 +316,8 @@ def start_scraping():
             print(f"[ERROR] send_progress: {e}", flush=True)
     
     def run_scraper():
+        # Préstamo del navegador caliente, liberado al terminar el subproceso
+        browser_lease = ExitStack()
         try:
             # PASO 1: Scraping
             # Mapeo de plataformas a emojis y nombres
@@ -338,6 +350,16 @@ def start_scraping():
             if headless:
                 cmd_args.append('--headless')
             
+            # Agregar perfil de bloqueo de recursos si se ha pedido
+            if block_profile:
+                cmd_args.append(f'--block-profile={block_profile}')
+            
+            # Reutilizar un navegador caliente del servicio en lugar de arrancar Chromium en frío
+            if headless:
+                browser_endpoint = browser_lease.enter_context(browser_service.lease_endpoint())
+                if browser_endpoint:
+                    cmd_args.append(f'--browser-endpoint={browser_endpoint}')
+            
             result = subprocess.Popen(
                 cmd_args,
                 cwd=os.getcwd(),
@@ -428,6 +450,7 @@ def start_scraping():
                     send_progress(1, 'running', None, f'{line[:70]}...')
             
             result.wait()
+            browser_lease.close()
             
             if result.returncode != 0:
                 send_progress(1, 'error', 0, '❌ Error en el scraping')
@@ -440,16 +463,14 @@ def start_scraping():
             send_progress(2, 'running', 50, '💾 Verificando archivo JSON generado...')
             
             # Construir ruta según la plataforma
-            json_path = Path(f"data/extractions/{platform}/{platform}_{search_term.replace(' ', '_')}.json")
+            json_path = find_extraction_file(f"data/extractions/{platform}/{platform}_{search_term.replace(' ', '_')}")
             
-            if not json_path.exists():
+            if json_path is None:
                 send_progress(2, 'error', 0, '❌ Archivo JSON no encontrado')
                 return
             
-            # Leer y validar JSON
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                count = len(data)
+            # Leer y validar JSON (.jsonl: cuenta desde el índice de ASIN)
+            count = count_products(json_path)
             
             send_progress(2, 'completed', 100, f'✅ JSON creado: {count} productos guardados')
             time.sleep(0.5)
@@ -527,6 +548,8 @@ def start_scraping():
         except Exception as e:
             send_progress(0, 'error', 0, f'❌ Error general: {str(e)}')
             progress_queues[job_id].put({'complete': True})
+        finally:
+            browser_lease.close()
     
     # Ejecutar en background
     thread = threading.Thread(target=run_scraper)
@@ -576,6 +599,18 @@ def scrape_progress(job_id):
 
 
 
+@app.route('/scrape/browsers')
+def scrape_browsers():
+    """Estado del servicio de navegadores calientes"""
+    return jsonify(browser_service.summary())
+
+
+@app.route('/scrape/governor')
+def scrape_governor():
+    """Ritmo actual, pausa restante y bloqueos de cada dominio (compartido por todos los scrapes)"""
+    return jsonify({'domains': read_governor_states()})
+
+
 @app.route('/scrape/status')
 def scrape_status():
     """Verifica si hay archivos JSON disponibles"""
@@ -584,18 +619,16 @@ def scrape_status():
     if not data_path.exists():
         return jsonify({'files': []})
     
-    json_files = list(data_path.glob("*.json"))
+    json_files = list_extraction_files(data_path)
     files_info = []
     
     for file in json_files:
         try:
-            with open(file, 'r') as f:
-                data = json.load(f)
-                files_info.append({
-                    'name': file.stem,
-                    'count': len(data),
-                    'modified': file.stat().st_mtime
-                })
+            files_info.append({
+                'name': file.stem,
+                'count': count_products(file),
+                'modified': file.stat().st_mtime
+            })
         except:
             pass
     
@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
 """
-Test del sistema de deduplicación
+Test del sistema de deduplicación (almacén JSON Lines con índice de ASIN)
 """
 import json
+import tempfile
+from multiprocessing import Process
 from pathlib import Path
 
+from checkpoint import RunCheckpoint
+from extraction_store import ExtractionStore, count_products, read_products
+from main import save_to_json
+from scrape_budget import MISSING_DEADLINE, ScrapeBudget
+
+
+def append_range(path, start, end):
+    """Trabajo que añade productos al mismo término que otro proceso"""
+    store = ExtractionStore(path)
+    for i in range(start, end):
+        store.append([{"asin": f"C{i:03d}", "title": f"Producto concurrente {i}"}])
+
+
 # Datos de prueba
 test_data = [
     {"asin": "B001", "title": "Producto 1", "price": "10€"},
@@ -12,49 +27,119 @@ test_data = [
     {"asin": "B003", "title": "Producto 3", "price": "30€"},
 ]
 
-test_file = Path("data/extractions/amazon/test_dedup.json")
-test_file.parent.mkdir(parents=True, exist_ok=True)
 
-# Primera inserción
-print("📝 Primera inserción (3 productos nuevos)...")
-with open(test_file, 'w', encoding='utf-8') as f:
-    json.dump(test_data, f, ensure_ascii=False, indent=2)
+def run_checks(tmp_dir: Path):
+    # Un .json antiguo se importa en la primera escritura
+    legacy_file = tmp_dir / "test_dedup.json"
+    with open(legacy_file, 'w', encoding='utf-8') as f:
+        json.dump(test_data[:1], f, ensure_ascii=False, indent=2)
 
-print(f"✅ Creado: {len(test_data)} productos")
+    store = ExtractionStore(legacy_file)
+    test_file = store.path
+
+    # Primera inserción
+    print("📝 Primera inserción (1 importado + 2 nuevos, 1 duplicado)...")
+    added, duplicates = store.append(test_data)
+    assert (added, duplicates) == (2, 1), (added, duplicates)
+    assert not legacy_file.exists()
+    print(f"✅ Creado: {store.count()} productos")
+
+    # Segunda inserción (2 duplicados + 1 nuevo)
+    print("\n📝 Segunda inserción (2 duplicados + 1 nuevo)...")
+    new_data = [
+        {"asin": "B002", "title": "Producto 2 (duplicado)", "price": "20€"},  # Duplicado
+        {"asin": "B003", "title": "Producto 3 (duplicado)", "price": "30€"},  # Duplicado
+        {"asin": "B004", "title": "Producto 4 (nuevo)", "price": "40€"},      # Nuevo
+    ]
+    added, duplicates = store.append(new_data)
+    assert (added, duplicates) == (1, 2), (added, duplicates)
+    print(f"✅ {added} nuevos añadidos")
+    print(f"⏭️  {duplicates} duplicados omitidos")
+
+    # Línea a medio escribir (proceso interrumpido) + producto sin indexar
+    print("\n📝 Recuperación tras una escritura interrumpida...")
+    with open(test_file, 'ab') as f:
+        f.write(json.dumps({"asin": "B005", "title": "Sin indexar"}).encode() + b"\n")
+        f.write(b'{"asin": "B006", "tit')
+    assert count_products(test_file) == 5
+    added, duplicates = store.append([{"asin": "B005"}, {"asin": "B007", "title": "Producto 7"}])
+    assert (added, duplicates) == (1, 1), (added, duplicates)
+    assert [p["asin"] for p in read_products(test_file)] == ["B001", "B002", "B003", "B004", "B005", "B007"]
+
+    # Dos procesos escribiendo el mismo término a la vez
+    print("\n📝 Escrituras concurrentes desde 2 procesos...")
+    jobs = [Process(target=append_range, args=(test_file, 0, 40)),
+            Process(target=append_range, args=(test_file, 20, 60))]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    assert store.count() == 66, store.count()
+
+    # Reemplazo que solo cambia la posición (o campos fuera de compare_fields): sin línea nueva
+    print("\n📝 Reemplazos sin cambios de contenido...")
+    stored = next(p for p in read_products(test_file) if p["asin"] == "B004")
+    assert store.append([{**stored, "position": 99}], replace=True) == (0, 1)
+    assert store.append([{**stored, "url": "https://www.amazon.es/dp/B004?qid=2"}], replace=True,
+                        compare_fields=("title", "price")) == (0, 1)
+
+    # Versión nueva de un producto + compactación
+    print("\n📝 Reemplazo y compactación...")
+    store.append([{"asin": "B001", "title": "Producto 1 (actualizado)"}], replace=True)
+    before, after = store.compact()
+    assert after == 66 and before > after, (before, after)
+    final_data = read_products(test_file)
+    assert final_data[0]["title"] == "Producto 1 (actualizado)"
+    assert len({p["asin"] for p in final_data}) == len(final_data)
+    assert store.load_index() == ExtractionStore(test_file)._read_index()
+
+    print(f"\n✨ Verificación final: {len(final_data)} productos en archivo")
+    for p in final_data[:7]:
+        print(f"   - {p['asin']}: {p['title']}")
+
+
+
+def test_deduplication():
+    with tempfile.TemporaryDirectory() as tmp:
+        run_checks(Path(tmp))
 
-# Segunda inserción (2 duplicados + 1 nuevo)
-print("\n📝 Segunda inserción (2 duplicados + 1 nuevo)...")
-new_data = [
-    {"asin": "B002", "title": "Producto 2 (duplicado)", "price": "20€"},  # Duplicado
-    {"asin": "B003", "title": "Producto 3 (duplicado)", "price": "30€"},  # Duplicado
-    {"asin": "B004", "title": "Producto 4 (nuevo)", "price": "40€"},      # Nuevo
-]
 
-# Simular la función save_to_json
-existing_data = json.load(open(test_file, 'r'))
-existing_asins = {item['asin'] for item in existing_data}
+def test_resume_after_deadline():
+    """Los productos guardados sin detalles por el deadline se completan al reanudar con --resume"""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = Path(tmp) / "amazon_leche.jsonl"
+        cards = [{"asin": f"D00{i}", "title": f"Producto {i}", "position": i} for i in (1, 2, 3)]
 
-new_products = []
-duplicates = 0
+        # Primera ejecución: el deadline deja sin detalles los productos 2 y 3
+        checkpoint = RunCheckpoint.create("amazon", "leche", {"detailed": True}, directory=tmp)
+        checkpoint.record_page(cards, {"page_num": 1, "collected": 3})
+        checkpoint.mark_pagination_done()
+        budget = ScrapeBudget(expires_at=0)
+        first_run = [dict(cards[0], description="Con detalles")] + [dict(card) for card in cards[1:]]
+        checkpoint.record_completed(first_run[0])
+        for product in first_run[1:]:
+            budget.skip(product)
+        save_to_json(first_run, filename)
+        assert [p.get("details_missing") for p in read_products(filename)] == [None, MISSING_DEADLINE,
+                                                                              MISSING_DEADLINE]
 
-for product in new_data:
-    if product['asin'] not in existing_asins:
-        new_products.append(product)
-        existing_asins.add(product['asin'])
-    else:
-        duplicates += 1
+        # --resume: solo se visitan los pendientes y se guarda sin modo refresco
+        resumed = RunCheckpoint.load(checkpoint.run_id, directory=tmp)
+        assert [card["asin"] for card in resumed.pending_cards()] == ["D002", "D003"]
+        completed = [dict(card, description=f"Detalles de {card['asin']}") for card in resumed.pending_cards()]
+        save_to_json(list(resumed.completed.values()) + completed, filename)
 
-combined = existing_data + new_products
+        stored = {p["asin"]: p for p in read_products(filename)}
+        assert len(stored) == 3
+        assert all("details_missing" not in product for product in stored.values())
+        assert stored["D002"]["description"] == "Detalles de D002"
+        assert stored["D001"]["description"] == "Con detalles"
 
-with open(test_file, 'w', encoding='utf-8') as f:
-    json.dump(combined, f, ensure_ascii=False, indent=2)
+        # Un producto que sigue sin detalles no sustituye a la versión completa
+        save_to_json([dict(cards[1], details_missing=MISSING_DEADLINE)], filename)
+        assert "details_missing" not in {p["asin"]: p for p in read_products(filename)}["D002"]
 
-print(f"✅ {len(new_products)} nuevos añadidos")
-print(f"⏭️  {duplicates} duplicados omitidos")
-print(f"📊 Total: {len(combined)} productos")
 
-# Verificar
-final_data = json.load(open(test_file, 'r'))
-print(f"\n✨ Verificación final: {len(final_data)} productos en archivo")
-for p in final_data:
-    print(f"   - {p['asin']}: {p['title']}")
+if __name__ == "__main__":
+    test_deduplication()
+    test_resume_after_deadline()
@@ -0,0 +1,118 @@
+"""
+Prueba offline del motor HTTP de páginas de detalle (http_detail_fetcher.py)
+
+Levanta un servidor HTTP local con páginas de producto de ejemplo y comprueba
+que el parseo produce el dict `details` esperado y que las páginas que
+necesitan JavaScript devuelven None (respaldo de Playwright).
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_detail_fetcher import HttpDetailEngine
+
+PRODUCT_HTML = """
+<html><head><title>Amazon.es: Leche entera</title></head><body>
+<div id="productOverview_feature_div"><table>
+  <tr><td class="a-span3"><span>Marca</span></td><td class="a-span9"><span>Central Lechera</span></td></tr>
+  <tr><td class="a-span3"><span>Formato</span></td><td class="a-span9"><span>Brik 1 L</span></td></tr>
+</table></div>
+<div id="feature-bullets"><ul>
+  <li><span class="a-list-item"> Leche entera de vaca de origen nacional </span></li>
+  <li><span class="a-list-item">Corta</span></li>
+  <li><span class="a-list-item">Rica en calcio y vitamina D</span></li>
+</ul></div>
+<table id="productDetails_techSpec_section_1">
+  <tr><th>Peso del producto</th><td>1,03 kg</td></tr>
+  <tr><th>Dimensiones del producto</th><td>6 x 9 x 19 cm</td></tr>
+</table>
+<div id="productDescription"><p>Leche entera UHT.</p></div>
+<div id="nutritionalInfoAndIngredients_feature_div">
+  <table><tr id="nic-eu-nutrition-facts-energy"><td><span>Energía</span></td><td><span>270 kJ</span></td></tr></table>
+  <table id="nic-eu-nutrition-facts-nutrients"><tbody>
+    <tr><td><span>-</span><span>Grasas</span></td><td><span>3,6 g</span></td></tr>
+    <tr><td><span>Proteínas</span></td><td><span>3,1 g</span></td></tr>
+  </tbody></table>
+</div>
+<div id="ingredients_feature_div"><div class="a-section">Leche entera de vaca.</div></div>
+</body></html>
+"""
+
+JS_ONLY_HTML = "<html><head><title>Cargando</title></head><body><div id='app'></div><script>render()</script></body></html>"
+
+CAPTCHA_HTML = "<html><head><title>Robot Check</title></head><body><form action='/errors/validateCaptcha'></form></body></html>"
+
+PAGES = {
+    "/dp/B000TEST01": (200, PRODUCT_HTML),
+    "/dp/B000JSONLY": (200, JS_ONLY_HTML),
+    "/dp/B000CAPTCH": (200, CAPTCHA_HTML),
+    "/dp/B000SERVER": (503, "Service Unavailable"),
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Sirve las páginas de ejemplo"""
+
+    def do_GET(self):
+        status, body = PAGES.get(self.path, (404, "Not found"))
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server():
+    """Arranca el servidor de fixtures en un puerto libre y devuelve (servidor, url_base)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def run_checks(base_url: str):
+    async with HttpDetailEngine(max_connections=10) as engine:
+        outcome = {}
+        details = await engine.fetch_details(f"{base_url}/dp/B000TEST01", outcome)
+        assert outcome["kind"] == "ok" and outcome["status"] == 200
+        assert details["brand"] == "Central Lechera"
+        assert details["product_overview"] == {"Marca": "Central Lechera", "Formato": "Brik 1 L"}
+        assert details["features"] == ["Leche entera de vaca de origen nacional", "Rica en calcio y vitamina D"]
+        assert details["weight"] == "1,03 kg"
+        assert details["dimensions"] == "6 x 9 x 19 cm"
+        assert details["description"] == "Leche entera UHT."
+        assert details["nutrition_facts"] == {"Energía": "270 kJ", "Grasas": "3,6 g", "Proteínas": "3,1 g"}
+        assert details["ingredients"] == "Leche entera de vaca."
+
+        # Páginas que deben recurrir al navegador
+        assert await engine.fetch_details(f"{base_url}/dp/B000JSONLY") is None
+        outcome = {}
+        assert await engine.fetch_details(f"{base_url}/dp/B000CAPTCH", outcome) is None
+        assert outcome["kind"] == "blocked"
+        outcome = {}
+        assert await engine.fetch_details(f"{base_url}/dp/B000SERVER", outcome) is None
+        assert outcome["kind"] == "blocked" and outcome["status"] == 503
+
+        # Rendimiento orientativo: páginas de detalle por segundo en un solo núcleo
+        num_pages = 200
+        start = time.perf_counter()
+        await asyncio.gather(*[engine.fetch_details(f"{base_url}/dp/B000TEST01") for _ in range(num_pages)])
+        elapsed = time.perf_counter() - start
+        print(f"⚡ {num_pages} páginas en {elapsed:.2f}s ({num_pages / elapsed:.0f} páginas/s)")
+
+
+def test_http_detail_engine():
+    server, base_url = start_fixture_server()
+    try:
+        asyncio.run(run_checks(base_url))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_http_detail_engine()
+    print("✅ Motor HTTP de detalles: todas las comprobaciones OK")
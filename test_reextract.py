@@ -0,0 +1,128 @@
+"""
+Prueba offline de las capturas de HTML (html_capture.py) y la re-extracción (reextract.py)
+
+Guarda en un almacén temporal dos páginas de resultados sintéticas (con un
+producto repetido entre ellas, como los patrocinados) y una página de detalle,
+y comprueba que la re-extracción en un pool de procesos reconstruye los mismos
+productos que la extracción en el navegador, sin red.
+
+Con fixtures de capture_fixtures.py y su referencia de bench_replay.py
+(golden/extract_products_from_page.json, salida de EXTRACT_SEARCH_RESULTS_JS),
+comprueba además que el parser offline produce exactamente lo mismo.
+"""
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from bench_basic_extraction import build_card_html
+from bench_replay import GOLDEN_DIR, diff_products
+from capture_fixtures import FIXTURES_DIR
+from html_capture import KIND_DETAIL, KIND_SEARCH, CaptureStore
+from http_detail_fetcher import HTMLParser
+from reextract import _inner_text, parse_search_results_html, rebuild_products
+from wait_strategy import AMAZON
+from test_http_detail_engine import PRODUCT_HTML
+
+SEARCH_TERM = "leche entera"
+
+
+def results_page(indexes) -> str:
+    cards = "\n".join(build_card_html(idx) for idx in indexes)
+    return f"<html><body><div class='s-main-slot'>{cards}</div><script>track()</script></body></html>"
+
+
+async def capture_fixtures(store: CaptureStore):
+    await store.capture_html("https://www.amazon.es/s?k=leche+entera", KIND_SEARCH, results_page([1, 2, 3]), 1)
+    await store.capture_html("https://www.amazon.es/s?k=leche+entera&page=2", KIND_SEARCH, results_page([3, 4]), 2)
+    for _ in range(2):
+        # Misma página capturada dos veces: un único blob
+        await store.capture_html("https://www.amazon.es/dp/B0BENCH0002", KIND_DETAIL, PRODUCT_HTML)
+
+
+def test_reextract():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CaptureStore("amazon", SEARCH_TERM, run_id="run_test", root=tmp)
+        try:
+            asyncio.run(capture_fixtures(store))
+            assert store.stats["pages"] == 4 and store.stats["duplicates"] == 1
+            assert len(list(Path(tmp, "amazon", "blobs").glob("*/*.html.gz"))) == 3
+            assert store.runs(SEARCH_TERM)[0][:3] == ("run_test", 2, 2)
+
+            existing = [{"asin": "B0BENCH0004", "description": "Guardada antes", "features": ["a"]}]
+            products, stats = rebuild_products(store, SEARCH_TERM, "run_test", workers=2, existing=existing)
+        finally:
+            store.close()
+
+    assert [product["asin"] for product in products] == ["B0BENCH0001", "B0BENCH0002", "B0BENCH0003",
+                                                          "B0BENCH0004"]
+    assert [product["position"] for product in products] == [1, 2, 3, 4]
+    first = products[0]
+    assert first["title"] == "Producto de prueba número 1"
+    assert first["url"] == "https://www.amazon.es/dp/B0BENCH0001"
+    assert first["brand"] == "Marca1" and first["additional_specs"] == {"Color": "Negro"}
+    assert first["price"] == "11,99€" and first["original_price"] == "21,99€"
+    assert first["rating"] == "4,1 de 5 estrellas" and first["reviews_count"] == "1013"
+    assert first["has_prime"] is False and products[1]["has_prime"] is True
+    assert first["free_shipping"] is True and first["availability"] == "En stock"
+    assert first["seller"] == "Vendido por Tienda de prueba" and first["options"] == ["Negro", "Blanco"]
+    assert first["discount"] == "N/A" and products[2]["discount"] == "Ahorra 5% con cupón"
+    assert first["search_term"] == SEARCH_TERM
+
+    # Detalles de la página capturada y, sin captura, de la extracción existente
+    assert products[1]["brand"] == "Central Lechera"
+    assert products[1]["nutrition_facts"]
+    assert products[3]["description"] == "Guardada antes"
+    assert "description" not in first
+    assert stats["search_pages"] == 2 and stats["detail_pages"] == 1 and stats["carried"] == 1
+    print(f"🧪 {stats['search_pages'] + stats['detail_pages']} páginas re-parseadas en {stats['seconds']:.2f}s")
+
+
+def test_inner_text_like_browser():
+    """Saltos de línea y espacios como innerText (reglas de la especificación HTML)"""
+    def inner_text(html):
+        return _inner_text(HTMLParser(html).css_first("#n"))
+
+    assert inner_text("<div id='n'>  Hola \n <b>mundo</b> <script>track()</script></div>") == "Hola mundo"
+    assert inner_text("<div id='n'>Marca: <span>Central</span><div>Lechera</div>fin</div>") == \
+        "Marca: Central\nLechera\nfin"
+    assert inner_text("<div id='n'><p>uno</p><p>dos</p></div>") == "uno\n\ndos"
+    assert inner_text("<div id='n'>x<br>y</div>") == "x\ny"
+    assert inner_text("<table id='n'><tr><td>A</td> <td>B</td></tr><tr><td>C</td></tr></table>") == "A\tB\nC"
+    assert inner_text("<span id='n'>1.234<span class='a-price-decimal'>,</span></span>") == "1.234,"
+
+
+def check_browser_goldens() -> int:
+    """Compara el parser offline con cada golden de EXTRACT_SEARCH_RESULTS_JS (devuelve los fixtures comprobados)"""
+    checked = 0
+    for manifest_path in sorted(Path(FIXTURES_DIR, AMAZON).glob("*/manifest.json")):
+        golden_path = manifest_path.parent / GOLDEN_DIR / "extract_products_from_page.json"
+        if not golden_path.exists():
+            continue
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        golden = json.loads(golden_path.read_text(encoding="utf-8"))
+        html = (manifest_path.parent / manifest["search_page"]).read_text(encoding="utf-8")
+        parsed = [product for product in parse_search_results_html(html, manifest["search_term"]) if product]
+        diffs = diff_products(golden, parsed)
+        assert not diffs, f"{manifest_path.parent}: {len(diffs)} diferencias, ej: {diffs[:5]}"
+        checked += 1
+    return checked
+
+
+MISSING_GOLDEN = (f"Sin fixtures con referencia en {FIXTURES_DIR}/{AMAZON} (capture_fixtures.py + "
+                  f"bench_replay.py --update-golden): paridad con el navegador no comprobada")
+
+
+def test_search_parser_matches_browser_golden():
+    if not check_browser_goldens():
+        pytest.skip(MISSING_GOLDEN)
+
+
+if __name__ == "__main__":
+    test_reextract()
+    test_inner_text_like_browser()
+    if not check_browser_goldens():
+        print(f"⚠️ {MISSING_GOLDEN}")
+    print("✅ Capturas y re-extracción: todas las comprobaciones OK")
@@ -0,0 +1,41 @@
+"""
+Prueba del número de reseñas de las tarjetas (scrape_budget.parse_count), que
+ordena los detalles con --priority=reviews
+"""
+from scrape_budget import PRIORITY_REVIEWS, order_by_priority, parse_count
+
+CASES = {
+    "1.234": 1234,
+    "(1.234)": 1234,
+    "12,345": 12345,
+    "87": 87,
+    "(2,5 mil)": 2500,
+    "2 mil": 2000,
+    "3K": 3000,
+    "1.5K": 1500,
+    "1,5k+": 1500,
+    "(12K)": 12000,
+    "1.234 valoraciones (kilo)": 1234,
+    "sin valoraciones": 0,
+    "": 0,
+    None: 0,
+    57: 57,
+}
+
+
+def test_parse_count():
+    for value, expected in CASES.items():
+        assert parse_count(value) == expected, (value, parse_count(value), expected)
+
+
+def test_order_by_reviews():
+    products = [{"position": 1, "reviews_count": "87"}, {"position": 2, "reviews_count": "1.5K"},
+                {"position": 3, "reviews_count": "(1.234)"}, {"position": 4}]
+    ordered = order_by_priority(products, PRIORITY_REVIEWS)
+    assert [product["position"] for product in ordered] == [2, 3, 1, 4]
+
+
+if __name__ == "__main__":
+    test_parse_count()
+    test_order_by_reviews()
+    print("✅ Número de reseñas: todas las comprobaciones OK")
@@ -0,0 +1,264 @@
+"""
+Gobernador de ritmo por dominio, compartido entre trabajos (SQLite)
+
+Todas las navegaciones a un dominio (páginas de resultados y de detalle) pasan
+por un token bucket cuyo estado vive en un fichero SQLite, así que lo comparten
+todos los scrapes que se estén ejecutando a la vez: términos de batch_scrape.py,
+procesos de main.py lanzados desde el frontend y shards de la FASE 3.
+
+Cuando un trabajo ve una página de bloqueo (robot check / captcha), el ritmo del
+dominio se reduce a la mitad y se pausan todos los trabajos durante un tiempo
+que crece con los bloqueos seguidos. Tras la pausa el ritmo vuelve a subir poco a
+poco con cada respuesta correcta: prima el ritmo sostenido frente a las ráfagas.
+"""
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+
+from adaptive_concurrency import OUTCOME_BLOCKED, OUTCOME_OK
+
+DEFAULT_STATE_PATH = "data/cache/governor.sqlite"
+AMAZON_DOMAIN = "amazon.es"
+CORTE_INGLES_DOMAIN = "elcorteingles.es"
+
+DEFAULT_MAX_RATE = 4.0  # Peticiones/s por dominio como máximo
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_BURST = 4  # Tokens acumulables: ráfaga máxima tras un periodo de inactividad
+DECREASE_FACTOR = 0.5  # Ritmo tras un bloqueo
+RAMP_STEP = 0.05  # Peticiones/s recuperadas por cada respuesta correcta
+BASE_PAUSE_SECONDS = 30  # Pausa tras el primer bloqueo; se duplica con cada bloqueo seguido
+MAX_PAUSE_SECONDS = 300
+RECOVERY_SECONDS = 900  # Sin bloqueos en este tiempo, el ritmo vuelve al máximo
+POLL_SECONDS = 1.0  # Cada cuánto se vuelve a mirar el estado compartido mientras se espera
+LOCK_TIMEOUT = 0.05  # Espera máxima (s) por el bloqueo de SQLite: se hace dentro del bucle de eventos
+LOCKED_POLL_SECONDS = 0.05  # Espera antes de volver a intentarlo si otro trabajo tiene el fichero bloqueado
+
+BUSY = object()  # _update: otro proceso tiene el fichero bloqueado, no se ha leído ni cambiado nada
+
+
+class DomainGovernor:
+    """Token bucket por dominio con pausa y recuperación tras páginas de bloqueo"""
+
+    def __init__(self, domain: str, max_rate: float = DEFAULT_MAX_RATE, min_rate: float = DEFAULT_MIN_RATE,
+                 burst: int = DEFAULT_BURST, path: str = DEFAULT_STATE_PATH):
+        """
+        Args:
+            domain: Dominio gobernado (ej: "amazon.es"); los trabajos con el mismo dominio comparten ritmo
+            max_rate: Peticiones por segundo como máximo
+            min_rate: Peticiones por segundo a las que se puede bajar tras bloqueos
+            burst: Tokens que se pueden acumular
+            path: Fichero SQLite con el estado compartido
+        """
+        self.domain = domain
+        self.max_rate = max(max_rate, min_rate)
+        self.min_rate = min_rate
+        self.burst = max(1, burst)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stats = {"requests": 0, "blocks": 0, "pauses": 0, "wait_seconds": 0.0, "min_rate": self.max_rate,
+                      "lock_waits": 0}
+        self._pending = []  # Resultados de report() aún sin aplicar porque el fichero estaba bloqueado
+        self._last_status = None
+
+        # Transacciones explícitas (BEGIN IMMEDIATE) para que tomar un token sea atómico entre procesos
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                rate REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                paused_until REAL NOT NULL DEFAULT 0,
+                consecutive_blocks INTEGER NOT NULL DEFAULT 0,
+                last_block_at REAL NOT NULL DEFAULT 0,
+                blocks INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Tras crear la tabla, timeout corto: con el fichero bloqueado por otro trabajo no se espera aquí
+        # (pararía el bucle de eventos con todas las pestañas en vuelo) sino con asyncio.sleep en acquire
+        self.conn.execute(f"PRAGMA busy_timeout = {int(LOCK_TIMEOUT * 1000)}")
+
+    def _update(self, change):
+        """
+        Lee el estado del dominio, aplica los resultados pendientes de report() y change(state, now)
+        y lo guarda en una sola transacción.
+
+        Returns:
+            Lo que devuelva change, o BUSY si otro trabajo tiene el fichero bloqueado
+        """
+        now = time.time()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            self.stats["lock_waits"] += 1
+            return BUSY
+        pending, self._pending = self._pending, []
+        try:
+            row = self.conn.execute(
+                "SELECT rate, tokens, updated_at, paused_until, consecutive_blocks, last_block_at, blocks "
+                "FROM domains WHERE domain = ?", (self.domain,)
+            ).fetchone()
+            if row is None:
+                row = (self.max_rate, float(self.burst), now, 0.0, 0, 0.0, 0)
+            state = dict(zip(("rate", "tokens", "updated_at", "paused_until", "consecutive_blocks",
+                              "last_block_at", "blocks"), row))
+
+            # Rellenar el bucket con el tiempo transcurrido y aplicar los límites de este trabajo
+            state["rate"] = min(max(state["rate"], self.min_rate), self.max_rate)
+            if state["last_block_at"] and now - state["last_block_at"] > RECOVERY_SECONDS:
+                state["rate"] = self.max_rate
+            elapsed = max(0.0, now - state["updated_at"])
+            state["tokens"] = min(float(self.burst), state["tokens"] + elapsed * state["rate"])
+            state["updated_at"] = now
+
+            pauses = [self._apply_outcome(state, now, outcome) for outcome in pending]
+            result = change(state, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO domains (domain, rate, tokens, updated_at, paused_until, consecutive_blocks, "
+                "last_block_at, blocks) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.domain, state["rate"], state["tokens"], state["updated_at"], state["paused_until"],
+                 state["consecutive_blocks"], state["last_block_at"], state["blocks"])
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self._pending = pending + self._pending
+            raise
+        self.stats["min_rate"] = min(self.stats["min_rate"], state["rate"])
+        self._last_status = self._status(state, now)
+        for pause in pauses:
+            if pause:
+                self.stats["pauses"] += 1
+                print(f"🛑 Página de bloqueo en {self.domain}: pausa de {pause:.0f}s para todos los trabajos, "
+                      f"ritmo reducido a {state['rate']:.2f} peticiones/s", flush=True)
+        return result
+
+    def _take_token(self) -> float:
+        """Toma un token si hay; si no, devuelve los segundos hasta el siguiente (o hasta el fin de la pausa)"""
+        def take(state, now):
+            if state["paused_until"] > now:
+                return state["paused_until"] - now
+            if state["tokens"] >= 1:
+                state["tokens"] -= 1
+                return 0.0
+            return (1 - state["tokens"]) / state["rate"]
+        return self._update(take)
+
+    async def acquire(self):
+        """Espera hasta poder hacer una petición al dominio (token disponible y sin pausa)"""
+        start = time.perf_counter()
+        while True:
+            wait = self._take_token()
+            if wait is BUSY:
+                await asyncio.sleep(LOCKED_POLL_SECONDS)
+                continue
+            if wait <= 0:
+                break
+            # Esperas cortas: una pausa decidida por otro trabajo se ve en la siguiente comprobación
+            await asyncio.sleep(min(wait, POLL_SECONDS))
+        self.stats["requests"] += 1
+        self.stats["wait_seconds"] += time.perf_counter() - start
+
+    def report(self, outcome: str):
+        """
+        Registra el resultado de una petición: un bloqueo reduce el ritmo y pausa el dominio,
+        una respuesta correcta lo sube un poco. El resto de errores no cambian el ritmo.
+
+        Si otro trabajo tiene el fichero bloqueado, el resultado se aplica en la siguiente
+        actualización (el próximo acquire) en lugar de esperar.
+        """
+        if outcome not in (OUTCOME_BLOCKED, OUTCOME_OK):
+            return
+        if outcome == OUTCOME_BLOCKED:
+            self.stats["blocks"] += 1
+        self._pending.append(outcome)
+        self._update(lambda state, now: None)
+
+    def _apply_outcome(self, state, now, outcome: str) -> float:
+        if outcome == OUTCOME_BLOCKED:
+            return self._on_block(state, now)
+        self._on_ok(state, now)
+        return 0.0
+
+    def _on_block(self, state, now) -> float:
+        state["blocks"] += 1
+        # Las pestañas que estaban en vuelo durante la pausa no vuelven a reducir el ritmo
+        if state["paused_until"] > now:
+            return 0.0
+        state["consecutive_blocks"] += 1
+        state["rate"] = max(self.min_rate, state["rate"] * DECREASE_FACTOR)
+        state["tokens"] = 0.0
+        state["last_block_at"] = now
+        pause = min(MAX_PAUSE_SECONDS, BASE_PAUSE_SECONDS * 2 ** (state["consecutive_blocks"] - 1))
+        state["paused_until"] = now + pause
+        return pause
+
+    def _on_ok(self, state, now):
+        state["consecutive_blocks"] = 0
+        state["rate"] = min(self.max_rate, state["rate"] + RAMP_STEP)
+
+    def current_rate(self) -> float:
+        """Ritmo actual del dominio (peticiones/s), compartido por todos los trabajos"""
+        return self.status()["rate"]
+
+    def status(self) -> dict:
+        """
+        Estado compartido del dominio: ritmo actual, pausa restante y bloqueos (el último
+        que vio este trabajo si otro tiene el fichero bloqueado)
+        """
+        status = self._update(self._status)
+        if status is BUSY:
+            return self._last_status or {"domain": self.domain, "rate": self.max_rate, "max_rate": self.max_rate,
+                                         "paused_seconds": 0.0, "consecutive_blocks": 0, "blocks": 0}
+        return status
+
+    def _status(self, state, now) -> dict:
+        return {
+            "domain": self.domain,
+            "rate": round(state["rate"], 3),
+            "max_rate": self.max_rate,
+            "paused_seconds": round(max(0.0, state["paused_until"] - now), 1),
+            "consecutive_blocks": state["consecutive_blocks"],
+            "blocks": state["blocks"],
+        }
+
+    def summary(self) -> dict:
+        """Peticiones de este trabajo, tiempo esperando al gobernador y estado actual del dominio"""
+        return {**self.stats, "wait_seconds": round(self.stats["wait_seconds"], 2),
+                "min_rate": round(self.stats["min_rate"], 3), "status": self.status()}
+
+    def print_summary(self):
+        """Imprime las estadísticas del gobernador"""
+        summary = self.summary()
+        if not summary["requests"]:
+            return
+        status = summary["status"]
+        print(f"\n🚦 Gobernador {self.domain}: {summary['requests']} peticiones, espera {summary['wait_seconds']:.1f}s, "
+              f"{summary['blocks']} bloqueos ({summary['pauses']} pausas), ritmo mínimo {summary['min_rate']:.2f}/s, "
+              f"ritmo actual {status['rate']:.2f}/{status['max_rate']:.2f} peticiones/s", flush=True)
+
+    def close(self):
+        self.conn.close()
+
+
+def read_governor_states(path: str = DEFAULT_STATE_PATH) -> list:
+    """Estado de todos los dominios gobernados (para el frontend), sin modificarlo"""
+    if not Path(path).exists():
+        return []
+    conn = sqlite3.connect(str(path), timeout=30)
+    try:
+        rows = conn.execute(
+            "SELECT domain, rate, paused_until, consecutive_blocks, blocks FROM domains ORDER BY domain"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+    now = time.time()
+    return [{"domain": domain, "rate": round(rate, 3), "paused_seconds": round(max(0.0, paused_until - now), 1),
+             "consecutive_blocks": consecutive_blocks, "blocks": blocks}
+            for domain, rate, paused_until, consecutive_blocks, blocks in rows]
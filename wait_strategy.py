@@ -0,0 +1,207 @@
+"""
+Esperas por eventos en lugar de pausas fijas
+
+Cada sitio define sus pasos de espera (resultados cargados, siguiente página,
+página de detalle lista...) como una lista de condiciones: URL distinta de la
+anterior, selector presente, red en reposo o DOM estable durante un tiempo.
+El paso termina en cuanto se cumplen sus condiciones o se agota su timeout,
+y se registra cuánto duró realmente frente a la pausa fija que sustituye.
+"""
+import time
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Condición "elemento de la página anterior desaparecido" (paginación por pushState/AJAX)
+DETACHED_JS = "(element) => !element.isConnected"
+
+# Condición "DOM estable": el número de elementos no cambia durante quietMs
+DOM_STABLE_JS = """
+({quietMs}) => {
+    const size = document.getElementsByTagName("*").length;
+    const now = performance.now();
+    if (window.__waitDomSize !== size) {
+        window.__waitDomSize = size;
+        window.__waitDomSince = now;
+        return false;
+    }
+    return now - window.__waitDomSince >= quietMs;
+}
+"""
+
+AMAZON = "amazon"
+CORTE_INGLES = "corte_ingles"
+
+CORTE_INGLES_TILE_SELECTOR = (
+    'article.product_tile, .product-item, [data-test="product-tile"], '
+    'article[class*="product"], div.product-grid-item, a[href*="/p/"]'
+)
+
+# Pasos de espera por sitio. Claves de cada paso:
+#   url_change: esperar a que la URL cambie respecto a previous_url (navegación por clic)
+#   detach_previous: esperar a que previous_element (tomado antes del clic) deje de estar en el DOM
+#   selector / state: esperar a un selector ("attached" o "visible")
+#   network_idle: esperar a que no haya peticiones en curso
+#   dom_stable_ms: esperar a que el DOM deje de crecer durante N ms
+#   timeout_ms: tiempo máximo del paso completo
+#   replaces_ms: pausa fija que sustituye (para calcular el tiempo recuperado)
+SITE_WAIT_STEPS = {
+    AMAZON: {
+        "search_results": {
+            "selector": '[data-component-type="s-search-result"]',
+            "state": "attached",
+            "timeout_ms": 10000,
+            "replaces_ms": 2000,
+        },
+        "next_page": {
+            "url_change": True,
+            "detach_previous": True,
+            "selector": '[data-component-type="s-search-result"]',
+            "state": "attached",
+            "timeout_ms": 10000,
+            "replaces_ms": 2000,
+        },
+        "nutrition_expanded": {
+            "selector": "#nic-eu-nutrition-facts-energy, #nic-eu-nutrition-facts-nutrients",
+            "state": "attached",
+            "timeout_ms": 1500,
+            "replaces_ms": 1000,
+        },
+    },
+    CORTE_INGLES: {
+        "search_box": {
+            "selector": "input.search-bar__input",
+            "state": "visible",
+            "timeout_ms": 15000,
+            "replaces_ms": 3000,
+        },
+        "search_results": {
+            "selector": CORTE_INGLES_TILE_SELECTOR,
+            "state": "attached",
+            "dom_stable_ms": 500,
+            "timeout_ms": 10000,
+            "replaces_ms": 5000,
+        },
+        "search_fallback": {
+            "dom_stable_ms": 500,
+            "timeout_ms": 5000,
+            "replaces_ms": 3000,
+        },
+        "scroll_step": {
+            "dom_stable_ms": 300,
+            "timeout_ms": 1500,
+            "replaces_ms": 1000,
+        },
+        "detail_loaded": {
+            "selector": "h1",
+            "state": "attached",
+            "dom_stable_ms": 400,
+            "timeout_ms": 5000,
+            "replaces_ms": 2000,
+        },
+    },
+}
+
+
+class WaitEngine:
+    """Ejecuta los pasos de espera de un sitio y registra su duración real"""
+
+    def __init__(self, site: str, steps: dict = None):
+        """
+        Args:
+            site: Sitio cuyos pasos se usan (AMAZON, CORTE_INGLES)
+            steps: Pasos adicionales o que sustituyen a los predefinidos
+        """
+        self.site = site
+        self.steps = dict(SITE_WAIT_STEPS.get(site, {}), **(steps or {}))
+        self.stats = {}  # {paso: {"count", "seconds", "max", "timeouts", "replaced"}}
+
+    async def wait(self, page, step_name: str, previous_url: str = None, previous_element=None) -> float:
+        """
+        Espera a que la página cumpla las condiciones del paso.
+
+        Agotar el timeout no es un error (igual que una pausa fija): se registra
+        y el llamador continúa con lo que haya cargado.
+
+        Args:
+            page: Página de Playwright
+            step_name: Nombre del paso en SITE_WAIT_STEPS
+            previous_url: URL antes del clic, para los pasos con url_change
+            previous_element: ElementHandle de la página anterior, para los pasos con detach_previous
+                (la URL cambia con pushState antes de que se sustituyan los resultados)
+
+        Returns:
+            Segundos esperados
+        """
+        step = self.steps[step_name]
+        timeout_ms = step.get("timeout_ms", 10000)
+        start = time.perf_counter()
+        timed_out = False
+
+        def remaining_ms():
+            return max(1, timeout_ms - (time.perf_counter() - start) * 1000)
+
+        try:
+            if step.get("url_change") and previous_url:
+                await page.wait_for_url(lambda url: url != previous_url, timeout=remaining_ms(),
+                                        wait_until="domcontentloaded")
+            if step.get("detach_previous") and previous_element is not None:
+                try:
+                    await page.wait_for_function(DETACHED_JS, arg=previous_element, polling=100,
+                                                 timeout=remaining_ms())
+                except PlaywrightTimeoutError:
+                    raise
+                except Exception:
+                    # Navegación completa: el handle pertenece a un documento que ya no existe
+                    pass
+            if step.get("selector"):
+                await page.wait_for_selector(step["selector"], state=step.get("state", "attached"),
+                                             timeout=remaining_ms())
+            if step.get("network_idle"):
+                await page.wait_for_load_state("networkidle", timeout=remaining_ms())
+            if step.get("dom_stable_ms"):
+                await page.evaluate("() => { delete window.__waitDomSize; }")
+                await page.wait_for_function(DOM_STABLE_JS, arg={"quietMs": step["dom_stable_ms"]},
+                                             polling=100, timeout=remaining_ms())
+        except Exception:
+            # Timeout (o página cerrada/navegando): se continúa como con la pausa fija
+            timed_out = True
+
+        elapsed = time.perf_counter() - start
+        self._record(step_name, elapsed, timed_out, step.get("replaces_ms", 0) / 1000)
+        return elapsed
+
+    def _record(self, step_name: str, elapsed: float, timed_out: bool, replaced: float):
+        entry = self.stats.setdefault(step_name, {"count": 0, "seconds": 0.0, "max": 0.0, "timeouts": 0,
+                                                  "replaced": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += elapsed
+        entry["max"] = max(entry["max"], elapsed)
+        entry["replaced"] += replaced
+        if timed_out:
+            entry["timeouts"] += 1
+
+    def summary(self) -> dict:
+        """Duración de las esperas por paso y tiempo recuperado frente a las pausas fijas"""
+        waited = sum(entry["seconds"] for entry in self.stats.values())
+        replaced = sum(entry["replaced"] for entry in self.stats.values())
+        return {
+            "site": self.site,
+            "steps": {name: dict(entry) for name, entry in self.stats.items()},
+            "waited_seconds": round(waited, 2),
+            "fixed_seconds": round(replaced, 2),
+            "recovered_seconds": round(replaced - waited, 2),
+        }
+
+    def print_summary(self):
+        """Imprime las esperas reales por paso"""
+        if not self.stats:
+            return
+        summary = self.summary()
+        print(f"\n⏱️  Esperas por eventos ({self.site}): {summary['waited_seconds']:.1f}s reales frente a "
+              f"{summary['fixed_seconds']:.1f}s de pausas fijas "
+              f"({summary['recovered_seconds']:+.1f}s recuperados)", flush=True)
+        for name, entry in summary["steps"].items():
+            average = entry["seconds"] / entry["count"]
+            timeouts = f", {entry['timeouts']} timeouts" if entry["timeouts"] else ""
+            print(f"   {name}: {entry['count']} esperas, media {average:.2f}s, máx {entry['max']:.2f}s{timeouts}",
+                  flush=True)